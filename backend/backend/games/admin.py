@@ -2,6 +2,9 @@ from django.contrib import admin
 
 from favourites.models import FavoriteGame
 
+from .models import AppDetails
+
 # Register your models here.
 
 admin.site.register(FavoriteGame)
+admin.site.register(AppDetails)
@@ -0,0 +1,175 @@
+"""
+Cross-user cache of Steam Store game details, keyed by AppID.
+
+Details are the same for every user who owns a game, so they are fetched once and
+shared through two tiers:
+
+    default cache (Redis)   details for APP_DETAILS_CACHE_TTL, AppIDs without store
+                            data ("success": false) for APP_DETAILS_NEGATIVE_TTL so
+                            they are not requested on every page
+    AppDetails table        details for APP_DETAILS_DB_TTL, survives cache evictions
+                            and restarts and refills the cache on a hit
+
+get_many looks up a whole library in one cache round trip and one query for the
+cache misses. Hits and misses of each tier are counted in process and added to
+shared counters in the cache at most every APP_DETAILS_STATS_FLUSH_INTERVAL
+seconds, so counting costs no round trips per lookup, see stats.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import AppDetails
+
+logger = logging.getLogger(__name__)
+
+APP_DETAILS_CACHE_TTL = int(os.getenv("APP_DETAILS_CACHE_TTL", str(24 * 60 * 60)))
+APP_DETAILS_DB_TTL = int(os.getenv("APP_DETAILS_DB_TTL", str(7 * 24 * 60 * 60)))
+APP_DETAILS_NEGATIVE_TTL = int(os.getenv("APP_DETAILS_NEGATIVE_TTL", str(60 * 60)))
+APP_DETAILS_STATS_FLUSH_INTERVAL = float(os.getenv("APP_DETAILS_STATS_FLUSH_INTERVAL", "60"))
+
+CACHE_KEY_PREFIX = "steam-app-details:"
+STATS_KEY_PREFIX = "steam-app-details-stats:"
+STATS_COUNTERS = ("cache_hits", "db_hits", "negative_hits", "misses")
+# Cached in place of the details of an AppID the store has no data for
+NEGATIVE = {}
+
+
+def _cache_key(appid):
+    return f"{CACHE_KEY_PREFIX}{appid}"
+
+
+# Counts of this process not yet added to the shared counters
+_pending_counts = dict.fromkeys(STATS_COUNTERS, 0)
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _count(counts):
+    with _pending_lock:
+        for name, n in counts.items():
+            _pending_counts[name] += n
+        due = time.monotonic() - _last_flush >= APP_DETAILS_STATS_FLUSH_INTERVAL
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """Add the counts of this process to the shared counters in the cache."""
+    global _last_flush
+    with _pending_lock:
+        counts = {name: n for name, n in _pending_counts.items() if n}
+        _pending_counts.update(dict.fromkeys(STATS_COUNTERS, 0))
+        _last_flush = time.monotonic()
+    for name, n in counts.items():
+        key = f"{STATS_KEY_PREFIX}{name}"
+        try:
+            cache.incr(key, n)
+        except ValueError:
+            # First count of this counter
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, n)
+
+
+def get_many(appids):
+    """
+    Look up the cached details of many games.
+
+    Args:
+        appids (list): Steam AppIDs of the games
+
+    Returns:
+        dict: Details (short_description, header_image) by AppID for the cached games,
+            None for AppIDs the store recently had no data for. Games not in the dict
+            have to be fetched.
+    """
+    appids = list(dict.fromkeys(appids))
+    if not appids:
+        return {}
+
+    cached = cache.get_many([_cache_key(appid) for appid in appids])
+    details = {}
+    for appid in appids:
+        entry = cached.get(_cache_key(appid))
+        if entry is not None:
+            details[appid] = entry or None
+    cache_hits = len(details)
+    negative_hits = sum(entry is None for entry in details.values())
+
+    missing = [appid for appid in appids if appid not in details]
+    db_hits = {}
+    if missing:
+        fresh_since = timezone.now() - timedelta(seconds=APP_DETAILS_DB_TTL)
+        for row in AppDetails.objects.filter(appid__in=missing, fetched_at__gte=fresh_since):
+            db_hits[row.appid] = {"short_description": row.short_description, "header_image": row.header_image}
+        if db_hits:
+            cache.set_many({_cache_key(appid): entry for appid, entry in db_hits.items()}, APP_DETAILS_CACHE_TTL)
+        details.update(db_hits)
+
+    counts = {
+        "cache_hits": cache_hits - negative_hits,
+        "db_hits": len(db_hits),
+        "negative_hits": negative_hits,
+        "misses": len(appids) - len(details),
+    }
+    _count(counts)
+    logger.info(
+        f"App details cache: {len(details)}/{len(appids)} hits "
+        f"(cache {counts['cache_hits']}, database {counts['db_hits']}, negative {counts['negative_hits']})"
+    )
+    return details
+
+
+def set_many(details):
+    """
+    Store fetched game details in both tiers.
+
+    Args:
+        details (dict): Details (short_description, header_image) by AppID, None for
+            AppIDs the store has no data for, which are only cached for APP_DETAILS_NEGATIVE_TTL.
+            Failed API calls must be left out, they are not cached at all.
+    """
+    found = {appid: entry for appid, entry in details.items() if entry is not None}
+    failed = [appid for appid, entry in details.items() if entry is None]
+
+    if found:
+        cache.set_many({_cache_key(appid): entry for appid, entry in found.items()}, APP_DETAILS_CACHE_TTL)
+        fetched_at = timezone.now()
+        AppDetails.objects.bulk_create(
+            [AppDetails(appid=appid, fetched_at=fetched_at, **entry) for appid, entry in found.items()],
+            update_conflicts=True,
+            unique_fields=["appid"],
+            update_fields=["short_description", "header_image", "fetched_at"],
+        )
+    if failed:
+        cache.set_many({_cache_key(appid): NEGATIVE for appid in failed}, APP_DETAILS_NEGATIVE_TTL)
+
+
+def stats():
+    """
+    Hit and miss counts of all lookups since the counters were last reset. Counts of
+    other processes are included up to their last flush.
+
+    Returns:
+        dict: cache_hits, db_hits, negative_hits, misses and hit_ratio, the share of
+            looked up games that needed no Store API request
+    """
+    flush_stats()
+    keys = {name: f"{STATS_KEY_PREFIX}{name}" for name in STATS_COUNTERS}
+    values = cache.get_many(keys.values())
+    counts = {name: values.get(key, 0) for name, key in keys.items()}
+    lookups = sum(counts.values())
+    counts["hit_ratio"] = round((lookups - counts["misses"]) / lookups, 4) if lookups else None
+    return counts
+
+
+def reset_stats():
+    with _pending_lock:
+        _pending_counts.update(dict.fromkeys(STATS_COUNTERS, 0))
+    cache.delete_many([f"{STATS_KEY_PREFIX}{name}" for name in STATS_COUNTERS])
@@ -0,0 +1,14 @@
+from django.db import models
+from django.utils import timezone
+
+
+class AppDetails(models.Model):
+    """Steam Store details of a game, the database tier of games.app_details."""
+
+    appid = models.IntegerField(primary_key=True)
+    short_description = models.TextField()
+    header_image = models.URLField(max_length=255)
+    fetched_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"App details ({self.appid})"
@@ -1,11 +1,111 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
 import pytest
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 
+from games import app_details
+from games.models import AppDetails
+from games.views import get_steam_games_details, get_user_games_data
+from main.http_client import HTTP_RETRIES
+
 User = get_user_model()
 
 
+class FakeSteamStore(ThreadingHTTPServer):
+    """
+    Local stand-in for the Steam Web and Store APIs.
+
+    Serves owned_games from GetOwnedGames and a description per AppID from appdetails,
+    sleeping delays[appid] seconds first, answering 500 for AppIDs in failing and
+    "success": false for AppIDs in unlisted.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSteamStoreHandler)
+        self.owned_games = []
+        self.delays = {}
+        self.failing = set()
+        self.unlisted = set()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class FakeSteamStoreHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        store = self.server
+        url = urlparse(self.path)
+        if url.path.endswith("/GetOwnedGames/v0001/"):
+            return self._send(200, {"response": {"games": store.owned_games}})
+
+        appid = int(parse_qs(url.query)["appids"][0])
+        with store.lock:
+            store.requests += 1
+            store.in_flight += 1
+            store.max_in_flight = max(store.max_in_flight, store.in_flight)
+        try:
+            time.sleep(store.delays.get(appid, 0))
+            if appid in store.failing:
+                return self._send(500, {})
+            if appid in store.unlisted:
+                return self._send(200, {str(appid): {"success": False}})
+            data = {"short_description": f"Description {appid}", "header_image": f"https://img/{appid}.jpg"}
+            self._send(200, {str(appid): {"success": True, "data": data}})
+        finally:
+            with store.lock:
+                store.in_flight -= 1
+
+    def _send(self, status_code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            # The client gave up after its deadline
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    app_details.reset_stats()
+
+
+@pytest.fixture
+def steam_store(mocker):
+    store = FakeSteamStore()
+    thread = threading.Thread(target=store.serve_forever, daemon=True)
+    thread.start()
+    mocker.patch("games.views.STEAM_STORE_URL", f"{store.url}/api/appdetails")
+    mocker.patch("games.views.STEAM_OWNED_GAMES_URL", f"{store.url}/IPlayerService/GetOwnedGames/v0001/")
+    yield store
+    store.shutdown()
+    store.server_close()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -19,7 +119,7 @@ def user():
 @pytest.mark.django_db
 def test_user_games_view(api_client, user, mocker):
     mocker.patch(
-        "requests.get",
+        "main.http_client.get",
         return_value=mocker.Mock(
             status_code=200, json=lambda: {"response": {"games": [{"appid": 1, "name": "Game 1"}]}}
         ),
@@ -36,13 +136,13 @@ def test_user_games_view(api_client, user, mocker):
 def test_get_recommendations(api_client, user, mocker):
     mocker.patch("games.views.get_user_games_data", return_value=[{"name": "Game 1", "appid": 1}])
     mocker.patch(
-        "requests.post",
+        "main.http_client.post",
         return_value=mocker.Mock(
             status_code=200, json=lambda: {"recommendations": [{"name": "Rec Game", "appid": 2}]}
         ),
     )
     mocker.patch(
-        "games.views.get_steam_game_details", return_value={"short_description": "desc", "header_image": "url"}
+        "games.views.fetch_steam_game_details", return_value={"short_description": "desc", "header_image": "url"}
     )
     api_client.force_authenticate(user=user)
     url = reverse("get-recs")
@@ -64,7 +164,7 @@ def test_get_recommendations_no_games(api_client, user, mocker):
 def test_get_recommendations_no_recommendations(api_client, user, mocker):
     mocker.patch("games.views.get_user_games_data", return_value=[{"name": "Game 1", "appid": 1}])
     mocker.patch(
-        "requests.post",
+        "main.http_client.post",
         return_value=mocker.Mock(status_code=200, json=lambda: {"recommendations": []}),
     )
     api_client.force_authenticate(user=user)
@@ -72,3 +172,167 @@ def test_get_recommendations_no_recommendations(api_client, user, mocker):
     response = api_client.post(url)
     assert response.status_code == 200
     assert response.data == []
+
+
+@pytest.mark.django_db
+def test_game_details_are_fetched_concurrently(steam_store):
+    appids = list(range(1, 41))
+    steam_store.delays = {appid: 0.2 for appid in appids}
+
+    start = time.monotonic()
+    details = get_steam_games_details(appids, max_workers=10, deadline=5)
+    elapsed = time.monotonic() - start
+
+    # 40 requests of 0.2 s take 8 s one after another
+    assert elapsed < 2
+    assert steam_store.max_in_flight <= 10
+    assert steam_store.requests == 40
+    assert details[7] == {"short_description": "Description 7", "header_image": "https://img/7.jpg"}
+
+
+@pytest.mark.django_db
+def test_game_details_deadline_returns_partial_results(steam_store):
+    steam_store.delays = {2: 3, 4: 3}
+
+    start = time.monotonic()
+    details = get_steam_games_details([1, 2, 3, 4], max_workers=4, deadline=0.5)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5
+    assert details[1]["short_description"] == "Description 1"
+    assert details[3]["short_description"] == "Description 3"
+    assert details[2] == {
+        "short_description": "No description available",
+        "header_image": "https://steamcdn-a.akamaihd.net/steam/apps/2/header.jpg",
+    }
+    assert details[4]["short_description"] == "No description available"
+
+
+@pytest.mark.django_db
+def test_game_details_fall_back_on_store_errors(steam_store):
+    steam_store.failing = {2}
+
+    details = get_steam_games_details([1, 2, 1], deadline=5)
+
+    # The failing call is retried
+    assert steam_store.requests == 2 + HTTP_RETRIES
+    assert details[1]["short_description"] == "Description 1"
+    assert details[2]["short_description"] == "No description available"
+
+
+@pytest.mark.django_db
+def test_user_games_data_with_details_respects_deadline(steam_store, mocker):
+    steam_store.owned_games = [{"appid": appid, "name": f"Game {appid}"} for appid in range(1, 101)]
+    steam_store.delays = {appid: 0.1 for appid in range(1, 101)}
+    steam_store.delays[50] = 5
+    mocker.patch("games.views.STEAM_DETAILS_DEADLINE", 1.5)
+    mocker.patch("games.views.STEAM_DETAILS_WORKERS", 20)
+
+    start = time.monotonic()
+    games = get_user_games_data("123456789", include_details=True)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 3
+    assert [game["appid"] for game in games] == list(range(1, 101))
+    assert games[0] == {
+        "name": "Game 1",
+        "appid": 1,
+        "short_description": "Description 1",
+        "header_image": "https://img/1.jpg",
+    }
+    assert games[49]["short_description"] == "No description available"
+
+
+@pytest.mark.django_db
+def test_game_details_are_shared_through_the_cache(steam_store):
+    get_steam_games_details([1, 2, 3], deadline=5)
+    details = get_steam_games_details([2, 3, 4], deadline=5)
+
+    assert steam_store.requests == 4
+    assert details[3]["short_description"] == "Description 3"
+    assert details[4]["short_description"] == "Description 4"
+    stats = app_details.stats()
+    assert stats["cache_hits"] == 2
+    assert stats["misses"] == 4
+    assert stats["hit_ratio"] == pytest.approx(2 / 6, abs=1e-4)
+
+
+@pytest.mark.django_db
+def test_game_details_lookups_count_without_extra_round_trips(steam_store, mocker):
+    get_steam_games_details([1, 2], deadline=5)
+    incr = mocker.spy(cache, "incr")
+
+    get_steam_games_details([1, 2], deadline=5)
+    assert incr.call_count == 0
+
+    # Flushed once the interval has passed
+    mocker.patch("games.app_details.APP_DETAILS_STATS_FLUSH_INTERVAL", 0)
+    get_steam_games_details([1, 2], deadline=5)
+    assert incr.call_count > 0
+    assert cache.get(f"{app_details.STATS_KEY_PREFIX}cache_hits") == 4
+
+
+@pytest.mark.django_db
+def test_game_details_database_tier_refills_the_cache(steam_store):
+    get_steam_games_details([1, 2], deadline=5)
+    cache.clear()
+
+    details = get_steam_games_details([1, 2], deadline=5)
+    assert steam_store.requests == 2
+    assert details[1] == {"short_description": "Description 1", "header_image": "https://img/1.jpg"}
+    assert app_details.stats()["db_hits"] == 2
+
+    get_steam_games_details([1, 2], deadline=5)
+    assert app_details.stats()["cache_hits"] == 2
+
+
+@pytest.mark.django_db
+def test_game_details_stale_database_rows_are_fetched_again(steam_store):
+    get_steam_games_details([1], deadline=5)
+    cache.clear()
+    stale = AppDetails.objects.get(appid=1)
+    stale.fetched_at -= timedelta(seconds=app_details.APP_DETAILS_DB_TTL + 1)
+    stale.short_description = "Old description"
+    stale.save()
+
+    details = get_steam_games_details([1], deadline=5)
+
+    assert steam_store.requests == 2
+    assert details[1]["short_description"] == "Description 1"
+    assert AppDetails.objects.get(appid=1).short_description == "Description 1"
+
+
+@pytest.mark.django_db
+def test_game_details_without_store_data_are_cached_negatively(steam_store):
+    steam_store.unlisted = {2}
+
+    get_steam_games_details([1, 2], deadline=5)
+    details = get_steam_games_details([1, 2], deadline=5)
+
+    assert steam_store.requests == 2
+    assert details[2]["short_description"] == "No description available"
+    assert app_details.stats()["negative_hits"] == 1
+    assert not AppDetails.objects.filter(appid=2).exists()
+
+
+@pytest.mark.django_db
+def test_game_details_failures_are_not_cached(steam_store):
+    steam_store.failing = {2}
+
+    details = get_steam_games_details([1, 2], deadline=5)
+    assert details[2]["short_description"] == "No description available"
+    assert list(app_details.get_many([1, 2])) == [1]
+
+    steam_store.failing = set()
+    details = get_steam_games_details([1, 2], deadline=5)
+    # The failing call is retried, then fetched again once the store recovers
+    assert steam_store.requests == 2 + HTTP_RETRIES + 1
+    assert details[2]["short_description"] == "Description 2"
+
+
+@pytest.mark.django_db
+def test_game_details_missed_by_the_deadline_are_not_cached(steam_store):
+    steam_store.delays = {2: 1}
+
+    get_steam_games_details([1, 2], deadline=0.3)
+    assert list(app_details.get_many([1, 2])) == [1]
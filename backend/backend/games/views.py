@@ -1,5 +1,7 @@
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import requests
 from django.conf import settings
@@ -10,15 +12,25 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from main import http_client
+from . import app_details
 from .serializers import RecommendationSerializer
 from rest_framework.pagination import PageNumberPagination
 
 STEAM_OPENID_URL = "https://steamcommunity.com/openid/login"
+STEAM_OWNED_GAMES_URL = "http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
+STEAM_STORE_URL = "https://store.steampowered.com/api/appdetails"
 
 logger = logging.getLogger(__name__)
 
 FASTAPI_URL = os.getenv("FASTAPI_URL", "http://localhost:8080/recommend/")
 
+# Store API requests in flight at once when fetching details of many games
+STEAM_DETAILS_WORKERS = int(os.getenv("STEAM_DETAILS_WORKERS", "16"))
+# Seconds allowed for fetching the details of all games; games not fetched by then get fallback details
+STEAM_DETAILS_DEADLINE = float(os.getenv("STEAM_DETAILS_DEADLINE", "8"))
+STEAM_DETAILS_TIMEOUT = 10
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
@@ -70,9 +82,9 @@ class UserGamesView(APIView):
             )
 
 
-def get_steam_game_details(appid):
+def fallback_game_details(appid):
     """
-    Fetch game details from Steam Store API.
+    Details used when the Steam Store API has none for a game.
 
     Args:
         appid (int): The Steam AppID of the game
@@ -80,31 +92,136 @@ def get_steam_game_details(appid):
     Returns:
         dict: A dictionary containing game details (short_description, header_image)
     """
-    try:
-        store_response = requests.get(
-            "https://store.steampowered.com/api/appdetails",
-            params={"appids": appid},
-            timeout=10,
-        )
-        if store_response.status_code == 200:
-            store_data = store_response.json().get(str(appid), {}).get("data", {})
-            return {
-                "short_description": store_data.get("short_description", "No description available"),
-                "header_image": store_data.get(
-                    "header_image",
-                    f"https://steamcdn-a.akamaihd.net/steam/apps/{appid}/header.jpg",
-                ),
-            }
-    except (requests.exceptions.RequestException, ValueError) as e:
-        logger.warning(f"Failed to fetch game details for appid {appid}: {str(e)}")
-
-    # Fallback values if API call fails
     return {
         "short_description": "No description available",
         "header_image": f"https://steamcdn-a.akamaihd.net/steam/apps/{appid}/header.jpg",
     }
 
 
+def fetch_steam_game_details(appid, timeout=STEAM_DETAILS_TIMEOUT):
+    """
+    Fetch game details from Steam Store API.
+
+    Args:
+        appid (int): The Steam AppID of the game
+        timeout (float): Request timeout in seconds
+
+    Returns:
+        dict: A dictionary containing game details (short_description, header_image),
+            or None if the store answered that it has no data for the game
+
+    Raises:
+        requests.exceptions.RequestException: If the API call fails, e.g. rate limited,
+            a server error or a timeout, so the failure is not cached as missing data
+        ValueError: If the response is not JSON
+    """
+    store_response = http_client.get(
+        STEAM_STORE_URL,
+        params={"appids": appid},
+        timeout=timeout,
+    )
+    if store_response.status_code != 200:
+        raise requests.exceptions.HTTPError(f"Status code {store_response.status_code}", response=store_response)
+    entry = store_response.json().get(str(appid)) or {}
+    store_data = entry.get("data")
+    if entry.get("success") and store_data:
+        return {
+            "short_description": store_data.get("short_description", "No description available"),
+            "header_image": store_data.get(
+                "header_image",
+                f"https://steamcdn-a.akamaihd.net/steam/apps/{appid}/header.jpg",
+            ),
+        }
+    logger.warning(f"No game details for appid {appid}: The store has no data for it")
+    return None
+
+
+def get_steam_game_details(appid):
+    """
+    Get the details of a game from the shared cache or the Steam Store API.
+
+    Args:
+        appid (int): The Steam AppID of the game
+
+    Returns:
+        dict: A dictionary containing game details (short_description, header_image)
+    """
+    return get_steam_games_details([appid])[appid]
+
+
+def get_steam_games_details(appids, max_workers=None, deadline=None):
+    """
+    Get the details of many games, from the shared cache (see games.app_details) or
+    fetched from the Steam Store API concurrently.
+
+    At most max_workers requests are in flight at once. Games whose details are not
+    fetched within the deadline get fallback details, so a slow store costs at most
+    the deadline instead of one timeout per game. Fetched details and AppIDs the store
+    has no data for are stored in the cache; failed calls, e.g. rate limited or timed
+    out, and games missed by the deadline are not, so they are fetched again next time.
+
+    Args:
+        appids (list): Steam AppIDs of the games
+        max_workers (int): Concurrent requests, defaults to STEAM_DETAILS_WORKERS
+        deadline (float): Seconds allowed for all games, defaults to STEAM_DETAILS_DEADLINE
+
+    Returns:
+        dict: Game details (short_description, header_image) by AppID
+    """
+    appids = list(dict.fromkeys(appids))
+    if not appids:
+        return {}
+    details = app_details.get_many(appids)
+    missing = [appid for appid in appids if appid not in details]
+    if missing:
+        fetched = fetch_steam_games_details(missing, max_workers, deadline)
+        app_details.set_many(fetched)
+        details.update(fetched)
+    return {appid: details.get(appid) or fallback_game_details(appid) for appid in appids}
+
+
+def fetch_steam_games_details(appids, max_workers=None, deadline=None):
+    """
+    Fetch the details of many games from the Steam Store API concurrently.
+
+    Args:
+        appids (list): Steam AppIDs of the games, without duplicates
+        max_workers (int): Concurrent requests, defaults to STEAM_DETAILS_WORKERS
+        deadline (float): Seconds allowed for all games, defaults to STEAM_DETAILS_DEADLINE
+
+    Returns:
+        dict: Game details by AppID, None for games the store has no data for. Games
+            the API call failed on or not fetched within the deadline are left out.
+    """
+    max_workers = max_workers or STEAM_DETAILS_WORKERS
+    deadline = STEAM_DETAILS_DEADLINE if deadline is None else deadline
+    # No single request may outlive the deadline
+    timeout = min(STEAM_DETAILS_TIMEOUT, deadline)
+
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(appids)))
+    futures = {appid: executor.submit(fetch_steam_game_details, appid, timeout) for appid in appids}
+    _, pending = wait(futures.values(), timeout=deadline)
+    # Drop the queued requests and leave the running ones to their own timeout
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    if pending:
+        logger.warning(
+            f"Fetched details of {len(appids) - len(pending)} of {len(appids)} games within the "
+            f"{deadline:.1f} s deadline, using fallback details for the rest"
+        )
+    details = {}
+    for appid, future in futures.items():
+        if future in pending:
+            continue
+        if future.exception() is not None:
+            logger.warning(f"Failed to fetch game details for appid {appid}: {str(future.exception())}")
+        else:
+            details[appid] = future.result()
+    logger.info(f"Fetched details of {len(appids)} games in {time.monotonic() - start:.2f} seconds")
+    return details
+
+
 def get_user_games_data(steam_id, include_details=False):
     """
     Fetch user's owned games from Steam API.
@@ -117,8 +234,8 @@ def get_user_games_data(steam_id, include_details=False):
         list: A list of dictionaries containing game information
     """
     try:
-        response = requests.get(
-            "http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/",
+        response = http_client.get(
+            STEAM_OWNED_GAMES_URL,
             params={
                 "key": settings.STEAM_API_KEY,
                 "steamid": steam_id,
@@ -134,18 +251,11 @@ def get_user_games_data(steam_id, include_details=False):
             if not include_details:
                 return [{"name": game["name"], "appid": game["appid"]} for game in user_games_data]
 
-            # Include details if requested
-            result = []
-            for game in user_games_data:
-                game_info = {"name": game["name"], "appid": game["appid"]}
-
-                # Get additional details from Steam Store API
-                details = get_steam_game_details(game["appid"])
-                game_info.update(details)
-
-                result.append(game_info)
-
-            return result
+            # Include details from the Steam Store API if requested
+            details = get_steam_games_details([game["appid"] for game in user_games_data])
+            return [
+                {"name": game["name"], "appid": game["appid"], **details[game["appid"]]} for game in user_games_data
+            ]
 
         logger.warning(f"Failed to fetch games for user {steam_id}: Status code {response.status_code}")
     except requests.exceptions.RequestException as e:
@@ -204,7 +314,7 @@ class RecommendGames(APIView):
         """
         try:
             logger.info(f"Requesting recommendations for user {steam_id} with {len(owned_game_names)} games")
-            response = requests.post(FASTAPI_URL, json={"game_names": owned_game_names}, timeout=30)
+            response = http_client.post(FASTAPI_URL, json={"game_names": owned_game_names}, timeout=30)
 
             if response.status_code != 200:
                 logger.error(f"FastAPI returned non-200 status code: {response.status_code}")
@@ -261,12 +371,10 @@ class RecommendGames(APIView):
         Returns:
             list: Enriched recommendations
         """
-        for game in recommendations:
-            appid = game.get("appid")
-            if appid:
-                if "short_description" not in game or not game["short_description"]:
-                    details = get_steam_game_details(appid)
-                    game.update(details)
+        missing = [game for game in recommendations if game.get("appid") and not game.get("short_description")]
+        details = get_steam_games_details([game["appid"] for game in missing])
+        for game in missing:
+            game.update(details[game["appid"]])
 
         logger.info(f"Successfully retrieved {len(recommendations)} recommendations for user {steam_id}")
         return recommendations
@@ -0,0 +1,158 @@
+"""
+Shared HTTP client for the Steam APIs and the model service.
+
+All outgoing calls go through one requests Session, so connections are kept alive
+and reused from a pool per host instead of paying a TCP and TLS handshake per call.
+Idempotent calls (GET and the like, not POST) are retried with exponential backoff
+on connection errors and 429/5xx responses. A Retry-After header is ignored, since
+the store may ask for longer waits than any caller's deadline. The latency of every call is recorded
+per host, see stats.
+
+Use it like the requests module:
+
+    from main import http_client
+
+    response = http_client.get(url, params=params, timeout=10)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Hosts whose connection pools are kept
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+# Connections kept alive per host, at least games.views.STEAM_DETAILS_WORKERS
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+# Retries of an idempotent call, waiting HTTP_RETRY_BACKOFF * 2 ** (retry - 1) seconds from the second one
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.3"))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Latest calls per host the latency percentiles are computed from
+LATENCY_WINDOW = 1000
+
+
+class HostStats:
+    """Call counts and latencies of one host."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def percentile_ms(self, q):
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return round(latencies[min(int(len(latencies) * q / 100), len(latencies) - 1)] * 1000, 1)
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_ms": round(self.total_seconds * 1000 / self.requests, 1) if self.requests else None,
+            "p50_ms": self.percentile_ms(50),
+            "p95_ms": self.percentile_ms(95),
+        }
+
+
+class HTTPClient:
+    """A pooled, keep-alive requests Session with retries and per-host latency stats."""
+
+    def __init__(
+        self,
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        retries=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+    ):
+        """
+        Args:
+            pool_connections (int): Hosts whose connection pools are kept
+            pool_maxsize (int): Connections kept alive per host
+            retries (int): Retries of an idempotent call
+            backoff_factor (float): Base of the exponential wait between retries, in seconds
+        """
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False,
+            # Keep to the backoff, a Retry-After wait has no upper limit
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the shared session.
+
+        Args:
+            method (str): HTTP method
+            url (str): URL of the request
+            **kwargs: Passed on to requests.Session.request, e.g. params, json, timeout
+
+        Returns:
+            requests.Response: The response, after retries
+        """
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats.setdefault(host, HostStats())
+                stats.requests += 1
+                stats.errors += failed
+                stats.total_seconds += elapsed
+                stats.latencies.append(elapsed)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """
+        Returns:
+            dict: requests, errors (failed calls and 5xx responses), mean_ms, p50_ms and
+                p95_ms of the calls to each host, by host
+        """
+        with self._lock:
+            return {host: stats.summary() for host, stats in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+
+client = HTTPClient()
+
+
+def get(url, **kwargs):
+    return client.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return client.post(url, **kwargs)
+
+
+def stats():
+    return client.stats()
@@ -1,7 +1,73 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
+from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 
+from main import http_client
+from main.http_client import HTTPClient
+
+
+class FlakyServer(ThreadingHTTPServer):
+    """
+    Answers 503 to the first failures requests, with a Retry-After header if retry_after
+    is set, then 200, and records the client ports.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, failures=0):
+        super().__init__(("127.0.0.1", 0), FlakyHandler)
+        self.failures = failures
+        self.retry_after = None
+        self.requests = 0
+        self.client_ports = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/"
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.client_ports.add(self.client_address[1])
+            failing = server.requests <= server.failures
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        body = b"{}"
+        self.send_response(503 if failing else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if failing and server.retry_after is not None:
+            self.send_header("Retry-After", str(server.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_server(request):
+    server = FlakyServer(getattr(request, "param", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
 
 @pytest.mark.django_db
 def test_main_view_returns_api_info():
@@ -28,3 +94,85 @@ def test_main_view_links_are_absolute():
     data = response.json()
     for endpoint_url in data["endpoints"].values():
         assert endpoint_url.startswith("http"), f"Endpoint URL is not absolute: {endpoint_url}"
+
+
+@pytest.mark.django_db
+def test_stats_view_is_staff_only():
+    client = APIClient()
+    url = reverse("stats")
+    assert client.get(url).status_code == 403
+
+    client.force_authenticate(get_user_model().objects.create_user(username="player", password="testpass"))
+    assert client.get(url).status_code == 403
+
+
+@pytest.mark.django_db
+def test_stats_view_reports_app_details_cache_stats():
+    admin = get_user_model().objects.create_user(username="admin", password="testpass", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+
+    response = client.get(reverse("stats"))
+
+    assert response.status_code == 200
+    assert set(response.json()["app_details"]) == {"cache_hits", "db_hits", "negative_hits", "misses", "hit_ratio"}
+
+
+@pytest.mark.django_db
+def test_stats_view_reports_http_client_latency(flaky_server):
+    admin = get_user_model().objects.create_user(username="admin", password="testpass", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    http_client.get(flaky_server.url, timeout=5)
+
+    response = client.get(reverse("stats"))
+
+    host_stats = response.json()["http_client"][f"127.0.0.1:{flaky_server.server_port}"]
+    assert host_stats["requests"] == 1
+    assert host_stats["errors"] == 0
+
+
+def test_http_client_reuses_connections(flaky_server):
+    client = HTTPClient()
+    for _ in range(5):
+        assert client.get(flaky_server.url, timeout=5).status_code == 200
+    assert flaky_server.requests == 5
+    assert len(flaky_server.client_ports) == 1
+
+
+@pytest.mark.parametrize("flaky_server", [2], indirect=True)
+def test_http_client_retries_idempotent_calls(flaky_server):
+    client = HTTPClient(retries=2, backoff_factor=0)
+    assert client.get(flaky_server.url, timeout=5).status_code == 200
+    assert flaky_server.requests == 3
+
+
+@pytest.mark.parametrize("flaky_server", [1], indirect=True)
+def test_http_client_ignores_retry_after(flaky_server):
+    flaky_server.retry_after = 30
+    client = HTTPClient(retries=1, backoff_factor=0)
+
+    start = time.monotonic()
+    assert client.get(flaky_server.url, timeout=5).status_code == 200
+    assert time.monotonic() - start < 5
+    assert flaky_server.requests == 2
+
+
+@pytest.mark.parametrize("flaky_server", [1], indirect=True)
+def test_http_client_does_not_retry_post(flaky_server):
+    client = HTTPClient(retries=2, backoff_factor=0)
+    assert client.post(flaky_server.url, json={}, timeout=5).status_code == 503
+    assert flaky_server.requests == 1
+
+
+@pytest.mark.parametrize("flaky_server", [1], indirect=True)
+def test_http_client_records_latency_per_host(flaky_server):
+    client = HTTPClient(retries=0)
+    client.get(flaky_server.url, timeout=5)
+    client.get(flaky_server.url, timeout=5)
+
+    host_stats = client.stats()[f"127.0.0.1:{flaky_server.server_port}"]
+    assert host_stats["requests"] == 2
+    assert host_stats["errors"] == 1
+    assert host_stats["mean_ms"] > 0
+    assert host_stats["p50_ms"] <= host_stats["p95_ms"]
@@ -1,7 +1,10 @@
 from django.urls import include, path
 
+from .views import StatsView
+
 urlpatterns = [
     path("user/", include("users.urls")),
     path("games/", include("games.urls")),
     path("favourites/", include("favourites.urls")),
+    path("stats/", StatsView.as_view(), name="stats"),
 ]
@@ -1,9 +1,12 @@
 import logging
 import os
 from django.urls import reverse
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from dotenv import load_dotenv
+from games import app_details
+from main import http_client
 
 load_dotenv()
 
@@ -38,6 +41,7 @@ class MainView(APIView):
             "get-recs": request.build_absolute_uri(reverse("get-recs")),
             "check-auth": request.build_absolute_uri(reverse("check-auth")),
             "csrf": request.build_absolute_uri(reverse("csrf")),
+            "stats": request.build_absolute_uri(reverse("stats")),
         }
 
         descriptions = {
@@ -48,6 +52,7 @@ class MainView(APIView):
             "get-recs": "Gets game recommendations based on the user's library",
             "check-auth": "Checks if the user is authenticated",
             "csrf": "Gets a CSRF token for form submissions",
+            "stats": "Gets cache and outgoing call statistics, staff users only",
         }
 
         response_data = {
@@ -58,3 +63,26 @@ class MainView(APIView):
         }
 
         return Response(response_data)
+
+
+class StatsView(APIView):
+    """
+    Cache and outgoing call statistics for operators, staff users only.
+
+    Reports the hit and miss counts of the shared game details cache (see
+    games.app_details.stats) since the counters were last reset, and the latency
+    of outgoing API calls per host (see main.http_client.stats) in the worker
+    process that answers.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Get the current statistics.
+
+        Returns:
+            Response: A dictionary with the app_details cache counters and the
+                http_client latency per host
+        """
+        return Response({"app_details": app_details.stats(), "http_client": http_client.stats()})
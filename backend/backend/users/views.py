@@ -11,6 +11,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from users.models import CustomUser
+from main import http_client
 from main.decorators import user_not_authenticated
 from dotenv import load_dotenv
 
@@ -119,7 +120,7 @@ def get_steam_username(steam_id):
         "steamids": steam_id,
     }
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = http_client.get(url, params=params, timeout=10)
         if response.status_code == 200:
             data = response.json()
             if "response" in data and "players" in data["response"] and data["response"]["players"]:
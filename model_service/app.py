@@ -1,243 +1,845 @@
-from collections import defaultdict
-from typing import Dict, List
-import gc
-import joblib
+from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
+import hmac
+import logging
 import numpy as np
-import pandas as pd
-import random
+import os
+import threading
 import time
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from sklearn.metrics.pairwise import cosine_similarity
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from artifacts import (
+    list_segments,
+    list_versions,
+    parse_segmented_version,
+    publish_legacy_model_dir,
+    publish_version,
+    resolve_bundle_dir,
+    segmented_version,
+    version_dir,
+)
+from batching import create_micro_batcher
+from genre_filter import filters_digest
+from history import MAX_RECENT_GAMES, create_history_store, games_digest
+from inference import InferenceQueueFull, create_inference_executor
+from metrics import (
+    SIZE_BUCKETS,
+    MetricsRegistry,
+    StageTimer,
+    gc_collections,
+    read_process_memory,
+    server_timing_header,
+)
+from model_state import ModelState
+from pool_cache import CandidatePool, create_pool_cache, parse_pool_key, pool_key
+from retrieval import exact_top_k
+from sampling import sample_diverse, weighted_sample
+from vector_store import DEFAULT_TOP_N
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.getenv("MODEL_DIR", "./model")
+
+CANDIDATE_INDEX = os.getenv("CANDIDATE_INDEX", "exact")
+CANDIDATE_INDEX_N_PROBE = int(os.getenv("CANDIDATE_INDEX_N_PROBE", "16"))
+
+CATALOG_PRECISION = os.getenv("CATALOG_PRECISION", "float32")
+CATALOG_TOP_N = int(os.getenv("CATALOG_TOP_N", str(DEFAULT_TOP_N)))
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+
+# Number of model versions kept loaded, so requests still holding the previous
+# version after a reload don't have to open it again
+LOADED_VERSIONS = 2
+
+
+def load_model_state(version=None, verify=False):
+    """
+    Load a model version from the registry in MODEL_DIR.
 
-MODEL_DIR = "./model"
-df = pd.read_csv(f"{MODEL_DIR}/games_may2024_cleaned.csv")
-tfidf = joblib.load(f"{MODEL_DIR}/tfidf.pkl")
-rf_model = joblib.load(f"{MODEL_DIR}/random_forest.pkl")
-label_encoder = joblib.load(f"{MODEL_DIR}/label_encoder.pkl")
+    Without a version, loads the one the registry currently points to with all its
+    segments. Converts a legacy model directory (CSV and compressed pickles) into a
+    registry version first if the directory holds no bundle yet; with several
+    workers, one converts and the others wait for its version.
 
-random.seed(None)
+    Args:
+        version (str): Version to load, defaults to the current one; version+n loads
+            the first n segments with it
+        verify (bool): Check the sha256 of every bundle file before using it
 
-recent_recommendations: Dict[str, Dict[int, float]] = defaultdict(dict)
-MAX_RECENT_GAMES = 20
-RECOMMENDATION_COOLDOWN = 3 * 24 * 60 * 60
+    Returns:
+        ModelState: The loaded model version
+    """
+    n_segments = None
+    if version is not None:
+        version, n_segments = parse_segmented_version(version)
+    if version is None:
+        version, bundle_dir = resolve_bundle_dir(MODEL_DIR)
+        if version is None:
+            logger.warning(f"No artifact bundle in {MODEL_DIR}, converting legacy model files")
+            version, bundle_dir = publish_legacy_model_dir(MODEL_DIR)
+    elif version == "bundle":
+        bundle_dir = f"{MODEL_DIR}/bundle"
+    else:
+        bundle_dir = version_dir(MODEL_DIR, version)
+
+    return ModelState(
+        bundle_dir,
+        version,
+        candidate_index=CANDIDATE_INDEX,
+        n_probe=CANDIDATE_INDEX_N_PROBE,
+        precision=CATALOG_PRECISION,
+        top_n=CATALOG_TOP_N,
+        verify=verify,
+        n_segments=n_segments,
+    )
+
+
+model_state = load_model_state()
+loaded_model_states = {model_state.version: model_state}
+model_states_lock = threading.Lock()
+reload_lock = asyncio.Lock()
+failed_versions = set()
+
+
+def get_model_state(version):
+    """
+    Get a loaded model version, loading it on first use. Inference jobs carry the
+    version they were accepted under, so a reload never changes a running request,
+    and process-pool workers pick up new versions on their own.
 
-app = FastAPI()
+    Args:
+        version (str): Version name
 
+    Returns:
+        ModelState: The model version
+    """
+    state = loaded_model_states.get(version)
+    if state is not None:
+        return state
+
+    with model_states_lock:
+        state = loaded_model_states.get(version)
+        if state is None:
+            state = load_model_state(version)
+            remember_model_state(state)
+    return state
+
+
+def remember_model_state(state):
+    """Keep a state loaded and drop the oldest ones beyond LOADED_VERSIONS."""
+    loaded_model_states[state.version] = state
+    while len(loaded_model_states) > LOADED_VERSIONS:
+        del loaded_model_states[next(iter(loaded_model_states))]
+
+
+history_store = create_history_store()
+
+inference_executor = create_inference_executor()
+pool_cache = create_pool_cache()
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+metrics = MetricsRegistry()
+request_counter = metrics.counter(
+    "gyg_recommend_requests_total", "Recommendation requests by response status", ["status"]
+)
+request_latency = metrics.histogram("gyg_recommend_duration_seconds", "Time spent handling /recommend/")
+stage_latency = metrics.histogram(
+    "gyg_recommend_stage_duration_seconds", "Time spent in each stage of /recommend/", ["stage"]
+)
+candidate_pool_size = metrics.histogram(
+    "gyg_candidate_pool_size", "Candidates collected per request", buckets=SIZE_BUCKETS
+)
+library_size = metrics.histogram(
+    "gyg_library_size", "Owned games resolved to catalog rows per request", buckets=SIZE_BUCKETS
+)
+process_memory = metrics.gauge("gyg_process_memory_bytes", "Memory of the serving process", ["type"])
+gc_collections_gauge = metrics.gauge(
+    "gyg_gc_collections", "Garbage collections since the process started", ["generation"]
+)
+inference_gauge = metrics.gauge("gyg_inference", "Load of the inference pool", ["stat"])
+model_version_info = metrics.gauge("gyg_model_version_info", "Model version being served", ["version"])
+pool_cache_gauge = metrics.gauge("gyg_pool_cache", "Size and lookups of the candidate pool cache", ["stat"])
+
+
+def collect_process_metrics():
+    """Refresh the gauges that are read at scrape time."""
+    for kind, value in read_process_memory().items():
+        process_memory.set(value, type=kind)
+    for generation, count in gc_collections().items():
+        gc_collections_gauge.set(count, generation=generation)
+    stats = inference_executor.stats()
+    for stat in ["pending", "queue_depth", "completed", "rejected"]:
+        inference_gauge.set(stats[stat], stat=stat)
+    model_version_info.clear()
+    model_version_info.set(1, version=model_state.version)
+    if pool_cache is not None:
+        for stat, value in pool_cache.stats().items():
+            pool_cache_gauge.set(value, stat=stat)
+
+
+metrics.on_collect(collect_process_metrics)
+
+
+def record_request(status, seconds, timer):
+    """
+    Record the metrics of one /recommend/ request.
 
-class GameRequest(BaseModel):
-    game_names: list[str]
-    user_id: str = None  # Optional user ID for tracking recommendations
+    Args:
+        status (int): Response status code
+        seconds (float): Time spent handling the request
+        timer (StageTimer): Stage timings of the request, None if it never reached the inference pool
+    """
+    request_counter.inc(status=status)
+    request_latency.observe(seconds)
+    if timer is None:
+        return
+    for stage, stage_seconds in timer.stages.items():
+        stage_latency.observe(stage_seconds, stage=stage)
+    if "library_size" in timer.values:
+        library_size.observe(timer.values["library_size"])
+    if "candidate_pool_size" in timer.values:
+        candidate_pool_size.observe(timer.values["candidate_pool_size"])
 
 
-def clean_old_recommendations():
-    """Clean up old entries from the recommendation cache."""
-    current_time = time.time()
-    users_to_check = list(recent_recommendations.keys())
+@asynccontextmanager
+async def lifespan(app):
+    watcher = asyncio.create_task(watch_model_registry()) if MODEL_WATCH_INTERVAL > 0 else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
 
-    for user_hash in users_to_check:
-        user_games = recent_recommendations[user_hash]
-        games_to_remove = []
 
-        for game_id, timestamp in user_games.items():
-            if current_time - timestamp > RECOMMENDATION_COOLDOWN:
-                games_to_remove.append(game_id)
+app = FastAPI(lifespan=lifespan)
 
-        for game_id in games_to_remove:
-            del user_games[game_id]
 
-        if not user_games:
-            del recent_recommendations[user_hash]
+class GameRequest(BaseModel):
+    game_names: list[str] = []
+    appids: list[int] = []  # Steam AppIDs of owned games, can be sent instead of names
+    user_id: str = None  # Optional user ID for tracking recommendations
+    k: int = Field(default=5, ge=1, le=MAX_RECENT_GAMES)  # Number of recommendations to return
+    seed: Optional[int] = None  # Optional seed to reproduce a selection
+    diversity: float = Field(default=0.0, ge=0.0, le=1.0)  # Strength of genre diversity re-ranking
+    genres: list[str] = []  # Only recommend games of one of these genres
+    exclude_genres: list[str] = []  # Never recommend games of these genres
+    cursor: Optional[str] = None  # Cursor of a previous response, draws more games from its candidate pool
 
 
-def get_user_hash(request: GameRequest) -> str:
+def get_user_hash(request: GameRequest, library_digest=None) -> str:
     """Generate a unique hash for the user based on user_id or game list."""
     if request.user_id:
         return f"user_{request.user_id}"
 
-    game_list = sorted(request.game_names)
-    game_str = ",".join(game_list)
-    return f"games_{hash(game_str)}"
-
+    return f"games_{library_digest or games_digest(request.game_names, request.appids)}"
 
-def update_recent_recommendations(user_hash: str, recommended_games: List[dict]):
-    """Update the cache with newly recommended games."""
-    current_time = time.time()
 
-    user_recent = recent_recommendations[user_hash]
-
-    for game in recommended_games:
-        user_recent[game["appid"]] = current_time
+def resolve_owned_rows(state, request: GameRequest):
+    """
+    Resolve the user's library to catalog rows by name and AppID.
 
-    if len(user_recent) > MAX_RECENT_GAMES:
-        sorted_games = sorted(user_recent.items(), key=lambda x: x[1])
-        games_to_keep = sorted_games[-MAX_RECENT_GAMES:]
+    Args:
+        state (ModelState): Model version serving the request
+        request (GameRequest): Request carrying game names and/or AppIDs
 
-        recent_recommendations[user_hash] = dict(games_to_keep)
+    Returns:
+        numpy.ndarray: Sorted unique catalog rows of the owned games
+    """
+    return np.union1d(
+        state.catalog_lookup.rows_for_names(request.game_names),
+        state.catalog_lookup.rows_for_appids(request.appids),
+    )
 
 
-def create_user_profile(valid_games):
+def create_user_profile(state, owned_rows):
     """
     Create a user profile based on the genre probabilities of owned games.
 
     Args:
-        valid_games (DataFrame): DataFrame containing the user's valid games
+        state (ModelState): Model version serving the request
+        owned_rows (numpy.ndarray): Catalog rows of the user's games
 
     Returns:
         numpy.ndarray: User profile as a 1D array of genre probabilities
     """
-    owned_indices = valid_games.index.tolist()
-    owned_features = df.iloc[owned_indices]["combined_features"].values
+    return state.catalog.rows(owned_rows).mean(axis=0).reshape(1, -1)
+
+
+def score_catalog(state, user_profile):
+    """
+    Compute the cosine similarity between the user profile and every catalog game.
 
-    owned_tfidf = tfidf.transform(owned_features)
-    owned_genre_probs = rf_model.predict_proba(owned_tfidf)
-    user_profile = owned_genre_probs.mean(axis=0).reshape(1, -1)
+    Args:
+        state (ModelState): Model version serving the request
+        user_profile (numpy.ndarray): User profile as a 1D array of genre probabilities
+
+    Returns:
+        numpy.ndarray: Similarity score for each row of the catalog
+    """
+    profile = user_profile.ravel().astype(np.float32)
+    profile_norm = max(float(np.linalg.norm(profile)), 1e-12)
+    return state.catalog.dot(profile[None])[0] / (np.maximum(state.catalog_norms, 1e-12) * profile_norm)
 
-    del owned_tfidf, owned_genre_probs
-    gc.collect()
 
-    return user_profile
+def score_catalog_batch(state, user_profiles):
+    """
+    Compute cosine similarities for several user profiles in one matrix product.
+
+    Args:
+        state (ModelState): Model version serving the requests
+        user_profiles (numpy.ndarray): Matrix of shape (n_users, n_genres)
+
+    Returns:
+        numpy.ndarray: Matrix of shape (n_users, n_games) with one row of scores per user
+    """
+    profiles = user_profiles.astype(np.float32)
+    profile_norms = np.maximum(np.linalg.norm(profiles, axis=1, keepdims=True), 1e-12)
+    return state.catalog.dot(profiles / profile_norms) / np.maximum(state.catalog_norms, 1e-12)
+
+
+def build_exclusion_mask(state, owned_rows, user_recent_games, filter_mask=None):
+    """
+    Mark the catalog rows that must not be recommended.
+
+    Args:
+        state (ModelState): Model version serving the request
+        owned_rows (numpy.ndarray): Catalog rows of the user's games
+        user_recent_games (set): Set of game IDs recently recommended to the user
+        filter_mask (numpy.ndarray): Optional mask of rows ruled out by the genre filter
+
+    Returns:
+        numpy.ndarray: Boolean mask over catalog rows, True for excluded games
+    """
+    if filter_mask is not None:
+        exclude_mask = filter_mask.copy()
+    else:
+        exclude_mask = np.zeros(len(state.catalog_appids), dtype=bool)
+    exclude_mask[owned_rows] = True
+    if state.retired is not None:
+        exclude_mask |= state.retired
+    if user_recent_games:
+        exclude_mask[state.catalog_lookup.rows_for_appids(user_recent_games)] = True
+    return exclude_mask
 
 
 def find_candidate_games(
-    user_profile, owned_games, user_recent_games, candidate_pool_size=1000
+    state, user_profile, owned_rows, user_recent_games, candidate_pool_size=1000, similarities=None, filter_mask=None
 ):
     """
-    Find candidate games for recommendation by processing in batches.
+    Find the catalog games most similar to the user profile.
+
+    Uses an exact top-k over the whole catalog, or the approximate IVF index
+    when CANDIDATE_INDEX is set to "ivf".
 
     Args:
+        state (ModelState): Model version serving the request
         user_profile (numpy.ndarray): User profile as a 1D array of genre probabilities
-        owned_games (set): Set of game names owned by the user
+        owned_rows (numpy.ndarray): Catalog rows of the user's games
         user_recent_games (set): Set of game IDs recently recommended to the user
         candidate_pool_size (int): Maximum number of candidates to collect
+        similarities (numpy.ndarray): Catalog scores already computed for this profile, if any
+        filter_mask (numpy.ndarray): Optional mask of rows ruled out by the genre filter
 
     Returns:
-        list: List of candidate game dictionaries with similarity scores
+        tuple: (rows, similarities) arrays of candidate catalog rows, best first
     """
-    batch_size = 1000
-    candidates = []
+    exclude_mask = build_exclusion_mask(state, owned_rows, user_recent_games, filter_mask)
 
-    for start_idx in range(0, len(df), batch_size):
-        end_idx = min(start_idx + batch_size, len(df))
-        batch_indices = list(range(start_idx, end_idx))
+    if state.candidate_index is not None:
+        return state.candidate_index.search(user_profile, candidate_pool_size, exclude_mask)
 
-        batch_games = set(df.iloc[batch_indices]["name"].values)
-        if not batch_games - owned_games:
-            continue
+    if similarities is None:
+        similarities = score_catalog(state, user_profile)
+    top_rows = exact_top_k(similarities, candidate_pool_size, exclude_mask)
+    return top_rows, similarities[top_rows]
 
-        batch_features = df.iloc[batch_indices]["combined_features"].values
-        batch_tfidf = tfidf.transform(batch_features)
-        batch_genre_probs = rf_model.predict_proba(batch_tfidf)
-        batch_similarities = cosine_similarity(user_profile, batch_genre_probs)[0]
-        batch_similar_indices = np.argsort(batch_similarities)[::-1]
-
-        for i in batch_similar_indices:
-            actual_idx = batch_indices[i]
-            game_name = df.iloc[actual_idx]["name"]
-            game_id = int(df.iloc[actual_idx]["AppID"])
-
-            if game_name in owned_games or game_id in user_recent_games:
-                continue
-
-            candidates.append(
-                {
-                    "name": game_name,
-                    "short_description": df.iloc[actual_idx]["short_description"],
-                    "header_image": df.iloc[actual_idx].get("header_image", ""),
-                    "appid": game_id,
-                    "similarity": float(batch_similarities[i]),
-                }
-            )
-            if len(candidates) >= candidate_pool_size:
-                break
 
-        del batch_tfidf, batch_genre_probs, batch_similarities
-        gc.collect()
+def select_recommendations(state, candidate_rows, similarities, k=5, rng=None, diversity=0.0):
+    """
+    Select recommendations from candidates using weighted random sampling.
+
+    Args:
+        state (ModelState): Model version serving the request
+        candidate_rows (numpy.ndarray): Catalog rows of the candidate games
+        similarities (numpy.ndarray): Similarity score of each candidate
+        k (int): Number of recommendations to return
+        rng (numpy.random.Generator): Source of randomness, seed it to reproduce a selection
+        diversity (float): Strength of MMR re-ranking over genre vectors, 0 disables it
+
+    Returns:
+        numpy.ndarray: Catalog rows of the selected games
+    """
+    if len(candidate_rows) <= k:
+        return candidate_rows
 
-        if len(candidates) >= candidate_pool_size:
-            break
+    rng = rng if rng is not None else np.random.default_rng()
+    weights = np.asarray(similarities, dtype=np.float64)
+
+    min_weight = weights.min()
+    if min_weight < 0:
+        weights = weights - min_weight + 0.01
 
-    return candidates
+    if diversity <= 0:
+        return candidate_rows[weighted_sample(weights, k, rng)]
 
+    # Only MMR needs the genre vectors, decoding them costs a copy on the compact stores
+    vectors = state.catalog.rows(candidate_rows) / np.maximum(state.catalog_norms[candidate_rows], 1e-12)[:, None]
+    return candidate_rows[sample_diverse(weights, vectors, k, rng, diversity)]
 
-def select_recommendations(candidates):
+
+def game_details(state, rows):
     """
-    Select recommendations from candidates using weighted random sampling.
+    Build the response entries for catalog rows.
 
     Args:
-        candidates (list): List of candidate game dictionaries with similarity scores
+        state (ModelState): Model version serving the request
+        rows (numpy.ndarray): Catalog rows
 
     Returns:
-        list: List of selected game dictionaries without similarity scores
+        list: List of game dictionaries
+    """
+    return [
+        {
+            "name": state.catalog_names[row],
+            "short_description": state.catalog_descriptions[row],
+            "header_image": state.catalog_images[row],
+            "appid": int(state.catalog_appids[row]),
+        }
+        for row in rows
+    ]
+
+
+def recommend_from_profile(
+    state, request: GameRequest, owned_rows, user_profile, user_recent_games, timer, similarities=None
+):
     """
-    if len(candidates) <= 5:
-        for game in candidates:
-            game.pop("similarity", None)
-        return candidates
+    Find candidates for a user profile and sample the final recommendations.
 
-    weights = [game["similarity"] for game in candidates]
+    The candidate pool only excludes the owned games and those ruled out by the
+    genre filter, so it stays valid for the library and filter and can be cached;
+    recently recommended games are filtered out when drawing from it.
 
-    min_weight = min(weights)
-    if min_weight < 0:
-        weights = [w - min_weight + 0.01 for w in weights]
+    Args:
+        state (ModelState): Model version serving the request
+        request (GameRequest): The recommendation request
+        owned_rows (numpy.ndarray): Catalog rows of the user's games
+        user_profile (numpy.ndarray): User profile as a 1D array of genre probabilities
+        user_recent_games (set): Set of game IDs recently recommended to the user
+        timer (StageTimer): Collects the time spent in each stage
+        similarities (numpy.ndarray): Catalog scores already computed for this profile, if any
+
+    Returns:
+        tuple: (recommendations, pool) with the recommended game dictionaries and the CandidatePool
+    """
+    # Find candidate games for recommendation
+    with timer.stage("candidates"):
+        filter_mask = None
+        if state.genre_filter is not None:
+            filter_mask = state.genre_filter.exclusion_mask(request.genres, request.exclude_genres)
+        candidate_rows, similarities = find_candidate_games(
+            state, user_profile, owned_rows, set(), similarities=similarities, filter_mask=filter_mask
+        )
+    timer.record("candidate_pool_size", len(candidate_rows))
+    pool = CandidatePool(candidate_rows, similarities)
+    return recommend_from_pool(state, request, pool, user_recent_games, timer), pool
+
+
+def recommend_from_pool(state, request: GameRequest, pool, user_recent_games, timer):
+    """
+    Sample the final recommendations from a candidate pool.
+
+    Args:
+        state (ModelState): Model version the pool was built with
+        request (GameRequest): The recommendation request
+        pool (CandidatePool): Ranked candidates of the user's library
+        user_recent_games (set): Set of game IDs recently recommended to the user
+        timer (StageTimer): Collects the time spent in each stage
+
+    Returns:
+        list: Recommended game dictionaries
+    """
+    # Select final recommendations using weighted random sampling
+    with timer.stage("select"):
+        candidate_rows, similarities = pool.rows, pool.similarities
+        if user_recent_games:
+            recent = np.fromiter(user_recent_games, dtype=np.int64, count=len(user_recent_games))
+            keep = ~np.isin(state.catalog_appids[candidate_rows], recent)
+            candidate_rows, similarities = candidate_rows[keep], similarities[keep]
+        rng = np.random.default_rng(request.seed)
+        selected_rows = select_recommendations(
+            state, candidate_rows, similarities, k=request.k, rng=rng, diversity=request.diversity
+        )
+    with timer.stage("details"):
+        return game_details(state, selected_rows)
+
+
+def compute_recommendations(version, request: GameRequest, user_recent_games):
+    """
+    Run the CPU-bound part of a recommendation request. Executed on the inference pool.
+
+    Args:
+        version (str): Model version the request was accepted under
+        request (GameRequest): The recommendation request
+        user_recent_games (set): Set of game IDs recently recommended to the user
+
+    Returns:
+        tuple: (recommendations, timer, pool) with the recommended game dictionaries, or None if
+            none of the user's games are in the catalog, the StageTimer of the request and the
+            CandidatePool the recommendations were drawn from
+    """
+    state = get_model_state(version)
+    timer = StageTimer()
+
+    # Validate user's games
+    with timer.stage("resolve"):
+        owned_rows = resolve_owned_rows(state, request)
+    timer.record("library_size", len(owned_rows))
+    if not len(owned_rows):
+        return None, timer, None
+
+    # Create user profile based on owned games
+    with timer.stage("profile"):
+        user_profile = create_user_profile(state, owned_rows)
+    recommendations, pool = recommend_from_profile(
+        state, request, owned_rows, user_profile, user_recent_games, timer
+    )
+    return recommendations, timer, pool
+
+
+def compute_recommendations_from_pool(version, request: GameRequest, pool, user_recent_games):
+    """
+    Draw recommendations from a cached candidate pool without rescoring the catalog.
+    Executed on the inference pool.
+
+    Args:
+        version (str): Model version the pool was built with
+        request (GameRequest): The recommendation request
+        pool (CandidatePool): Ranked candidates of the user's library
+        user_recent_games (set): Set of game IDs recently recommended to the user
+
+    Returns:
+        tuple: (recommendations, timer)
+    """
+    timer = StageTimer()
+    timer.record("candidate_pool_size", len(pool.rows))
+    return recommend_from_pool(get_model_state(version), request, pool, user_recent_games, timer), timer
 
-    selected_indices = []
-    remaining_indices = list(range(len(candidates)))
 
-    while len(selected_indices) < 5 and remaining_indices:
-        remaining_weights = [weights[i] for i in remaining_indices]
-        total_weight = sum(remaining_weights)
-        normalized_weights = [w / total_weight for w in remaining_weights]
+def compute_recommendations_batch(jobs):
+    """
+    Run several recommendation requests together, scoring all their profiles against
+    the catalog in one matrix product per model version. Executed on the inference pool.
 
-        selected_idx = random.choices(
-            remaining_indices, weights=normalized_weights, k=1
-        )[0]
-        selected_indices.append(selected_idx)
-        remaining_indices.remove(selected_idx)
+    Args:
+        jobs (list): (version, request, user_recent_games) tuples
 
-    recommendations = [candidates[i] for i in selected_indices]
+    Returns:
+        list: One entry per job: a (recommendations, timer, pool) tuple as returned by
+            compute_recommendations, or the exception raised for that job
+    """
+    # Requests accepted just before and after a reload are scored by their own version
+    jobs_by_version = {}
+    for i, (version, _, _) in enumerate(jobs):
+        jobs_by_version.setdefault(version, []).append(i)
+
+    results = [None] * len(jobs)
+    for version, indices in jobs_by_version.items():
+        try:
+            state = get_model_state(version)
+        except Exception as e:
+            for i in indices:
+                results[i] = e
+            continue
+        version_results = recommend_batch(state, [jobs[i][1:] for i in indices])
+        for i, result in zip(indices, version_results):
+            results[i] = result
+    return results
 
-    for game in recommendations:
-        game.pop("similarity", None)
 
-    return recommendations
+def recommend_batch(state, jobs):
+    """
+    Run several recommendation requests against one model version.
+
+    Args:
+        state (ModelState): Model version serving the requests
+        jobs (list): (request, user_recent_games) tuples
+
+    Returns:
+        list: One entry per job, as returned by compute_recommendations_batch
+    """
+    timers = [StageTimer() for _ in jobs]
+    results = [(None, timer, None) for timer in timers]
+    resolved = []
+    for (request, _), timer in zip(jobs, timers):
+        with timer.stage("resolve"):
+            resolved.append(resolve_owned_rows(state, request))
+        timer.record("library_size", len(resolved[-1]))
+    with_games = [i for i, owned_rows in enumerate(resolved) if len(owned_rows)]
+    if not with_games:
+        return results
+
+    profiles = []
+    for i in with_games:
+        with timers[i].stage("profile"):
+            profiles.append(create_user_profile(state, resolved[i]))
+    user_profiles = np.vstack(profiles)
+
+    batch_similarities = None
+    if state.candidate_index is None:
+        start = time.perf_counter()
+        batch_similarities = score_catalog_batch(state, user_profiles)
+        elapsed = time.perf_counter() - start
+        # Every request in the batch waits for the shared product
+        for i in with_games:
+            timers[i].add("score", elapsed)
+
+    for position, i in enumerate(with_games):
+        request, user_recent_games = jobs[i]
+        similarities = batch_similarities[position] if batch_similarities is not None else None
+        try:
+            recommendations, pool = recommend_from_profile(
+                state, request, resolved[i], user_profiles[position], user_recent_games, timers[i], similarities
+            )
+            results[i] = (recommendations, timers[i], pool)
+        except Exception as e:
+            results[i] = e
+    return results
+
+
+micro_batcher = create_micro_batcher(compute_recommendations_batch, inference_executor)
 
 
 @app.post("/recommend/")
-async def recommend_games(request: GameRequest):
+async def recommend_games(request: GameRequest, response: Response):
     """Recommend games based on genre preferences using RandomForest classifier.
-    Memory-optimized implementation that computes probabilities on-demand.
+    Scores the catalog against precomputed genre probabilities with a single matrix-vector product.
     Uses weighted random sampling to provide varied recommendations on each request.
-    Prevents the same game from being recommended multiple times in a row."""
+    Prevents the same game from being recommended multiple times in a row.
+    The scoring runs on a bounded inference pool so the event loop stays responsive.
+    The whole request is served by the model version that was current when it arrived.
+    The candidate pool of the library is cached, so repeated requests and requests sent
+    with the returned cursor only sample from it again."""
+    state = model_state
+    start = time.perf_counter()
+    status = 500
+    timer = None
     try:
-        # Initialize user data and clean old recommendations
-        user_hash = get_user_hash(request)
-        clean_old_recommendations()
-        user_recent_games = set(recent_recommendations.get(user_hash, {}).keys())
-
-        # Validate user's games
-        owned_games = set(request.game_names)
-        valid_games = df[df["name"].isin(owned_games)]
-
-        if valid_games.empty:
+        cursor_only = bool(request.cursor) and not (request.game_names or request.appids)
+        if cursor_only:
+            # A cursor alone is only served while its pool is cached by this process under the
+            # current version; sent with the games, the pool is rebuilt from them on a miss
+            cursor_version, library_digest, filters = parse_pool_key(request.cursor)
+            if cursor_version != state.version:
+                library_digest = None
+        else:
+            library_digest = games_digest(request.game_names, request.appids)
+            filters = filters_digest(request.genres, request.exclude_genres)
+            if filters:
+                if state.genre_filter is None:
+                    status = 422
+                    raise HTTPException(
+                        status_code=422, detail=f"Model version {state.version} does not support genre filters"
+                    )
+                unknown = state.genre_filter.unknown(request.genres + request.exclude_genres)
+                if unknown:
+                    status = 422
+                    raise HTTPException(status_code=422, detail=f"Unknown genres: {', '.join(unknown)}")
+        key = pool_key(state.version, library_digest, filters) if library_digest else None
+        pool = pool_cache.get(key) if pool_cache is not None and key else None
+        if pool is None and cursor_only:
+            status = 410
+            raise HTTPException(status_code=410, detail="Cursor expired, send the games again")
+
+        # Initialize user data and load their recommendation history
+        user_hash = get_user_hash(request, library_digest)
+        history_start = time.perf_counter()
+        user_recent_games = history_store.get_recent(user_hash)
+        history_seconds = time.perf_counter() - history_start
+
+        if pool is not None:
+            recommendations, timer = await inference_executor.run(
+                compute_recommendations_from_pool, state.version, request, pool, user_recent_games
+            )
+        else:
+            if micro_batcher is not None:
+                recommendations, timer, pool = await micro_batcher.submit((state.version, request, user_recent_games))
+            else:
+                recommendations, timer, pool = await inference_executor.run(
+                    compute_recommendations, state.version, request, user_recent_games
+                )
+            if pool is not None and pool_cache is not None:
+                pool_cache.put(key, pool)
+
+        if recommendations is None:
+            status = 404
             raise HTTPException(
                 status_code=404, detail="No matching games found in dataset"
             )
 
-        # Create user profile based on owned games
-        user_profile = create_user_profile(valid_games)
+        # Update recommendation history
+        with timer.stage("history"):
+            history_store.add(user_hash, [game["appid"] for game in recommendations])
+        timer.add("history", history_seconds)
+
+        response.headers["X-Model-Version"] = state.version
+        if SERVER_TIMING:
+            stages = {**timer.stages, "total": time.perf_counter() - start}
+            response.headers["Server-Timing"] = server_timing_header(stages)
+        status = 200
+        return {
+            "recommendations": recommendations,
+            "model_version": state.version,
+            "cursor": key if pool_cache is not None else None,
+        }
+
+    except InferenceQueueFull:
+        status = 503
+        raise HTTPException(
+            status_code=503,
+            detail="Recommendation service is overloaded, please retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        record_request(status, time.perf_counter() - start, timer)
 
-        # Find candidate games for recommendation
-        candidates = find_candidate_games(user_profile, owned_games, user_recent_games)
 
-        # Select final recommendations using weighted random sampling
-        recommendations = select_recommendations(candidates)
+@app.get("/similar/{appid}")
+async def similar_games(appid: int, response: Response, k: int = Query(default=10, ge=1)):
+    """Return the games most similar to one game.
+    Reads the neighbours precomputed by train.py, so the cost depends only on k."""
+    state = model_state
+    rows = state.catalog_lookup.rows_for_appids([appid])
+    if not len(rows):
+        raise HTTPException(status_code=404, detail="Game not found in dataset")
+    neighbors = state.neighbors(int(rows[-1]), k)
+    if neighbors is None:
+        raise HTTPException(status_code=404, detail=f"Model version {state.version} has no neighbour graph")
 
-        # Update recommendation history
-        update_recent_recommendations(user_hash, recommendations)
+    neighbor_rows, neighbor_scores = neighbors
+    similar = game_details(state, neighbor_rows)
+    for game, score in zip(similar, neighbor_scores):
+        game["similarity"] = round(float(score), 4)
 
-        return {"recommendations": recommendations}
+    response.headers["X-Model-Version"] = state.version
+    return {"appid": appid, "similar": similar, "model_version": state.version}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+async def reload_model(version=None):
+    """
+    Load a model version, validate it and swap it in for new requests.
+
+    The new version is loaded and validated off the event loop while the current one
+    keeps serving. Requests already running finish on the version they started with.
+    When only segments were appended to the served version, just those are loaded.
+
+    Args:
+        version (str): Version to switch to and publish as current, defaults to the
+            version the registry currently points to
+
+    Returns:
+        bool: True if the served version changed
+
+    Raises:
+        ValueError: If the version is missing, fails verification or is inconsistent
+    """
+    global model_state
+
+    async with reload_lock:
+        if version is None:
+            target, bundle_dir = resolve_bundle_dir(MODEL_DIR)
+        else:
+            target = version
+            bundle_dir = f"{MODEL_DIR}/bundle" if version == "bundle" else version_dir(MODEL_DIR, version)
+        if target is None:
+            return False
+        # Segments appended to the served version count as a new version as well
+        base_version = target
+        target = segmented_version(target, len(list_segments(bundle_dir)))
+        if target == model_state.version:
+            return False
+        if version is None and target in failed_versions:
+            return False
+
+        def load():
+            if base_version == model_state.base_version:
+                # Only segments were appended, keep everything already loaded
+                state = model_state.extend(verify=True)
+            else:
+                state = load_model_state(target, verify=True)
+            state.validate()
+            return state
+
+        try:
+            state = await asyncio.to_thread(load)
+        except Exception as e:
+            failed_versions.add(target)
+            raise ValueError(f"Model version {target} failed validation: {e}") from e
+
+        with model_states_lock:
+            remember_model_state(state)
+        previous, model_state = model_state, state
+
+        # Let the other workers on this host follow through their watchers
+        if version is not None and version != "bundle":
+            publish_version(MODEL_DIR, version)
+
+        logger.info(f"Switched model version from {previous.version} to {state.version}")
+        return True
+
+
+async def watch_model_registry():
+    """Poll the registry every MODEL_WATCH_INTERVAL seconds and switch to newly published versions."""
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            await reload_model()
+        except Exception as e:
+            logger.error(f"Failed to reload model: {e}")
+
+
+class ReloadRequest(BaseModel):
+    version: Optional[str] = None  # Registry version to switch to, defaults to the current one
+
+
+@app.post("/admin/reload")
+async def reload(reload_request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(default=None)):
+    """Switch to a model version without restarting. Requires the ADMIN_TOKEN in the X-Admin-Token header.
+    Validates the new version before serving it; on failure the current version stays in service."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    version = reload_request.version if reload_request else None
+    if version is not None and version != "bundle" and version not in list_versions(MODEL_DIR):
+        raise HTTPException(status_code=404, detail=f"Unknown model version {version}")
+
+    previous = model_state.version
+    try:
+        changed = await reload_model(version)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return {"model_version": model_state.version, "previous_version": previous, "changed": changed}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose request, per-stage latency and process metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health")
+async def health():
+    """Report liveness, the served model version and the load of the inference pool. Never waits on the pool."""
+    return {"status": "ok", "model_version": model_state.version, "inference": inference_executor.stats()}
@@ -0,0 +1,521 @@
+"""
+Model artifact bundles and the versioned registry shared by train.py and the
+recommendation service.
+
+A bundle is a directory of uncompressed files that can be memory-mapped, so
+every uvicorn worker shares one page-cache copy instead of holding its own:
+
+    manifest.json           format version, catalog size and a sha256 per file
+    <array>.npy             numeric arrays (catalog probabilities, lookup indexes)
+    <column>.offsets.npy    string columns: int64 offsets into the UTF-8 data
+    <column>.data.npy
+    <model>.joblib          fitted sklearn objects, dumped without compression
+
+Bundles live in <model_dir>/registry/<version>/, and <model_dir>/registry/CURRENT
+names the version the service should serve. Games ingested after training are
+appended as segments, <version>/segments/<number>/, each a bundle of the same
+layout without models; the service serves a version with n segments as <version>+n.
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import secrets
+import shutil
+import time
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+REGISTRY_DIR = "registry"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+SEGMENTS_DIR = "segments"
+
+
+class StringColumn:
+    """
+    Read-only column of strings stored as UTF-8 bytes plus row offsets,
+    which unlike an object array can be memory-mapped.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Encode a sequence of strings, treating missing values as empty strings.
+
+        Args:
+            values (iterable): Column values
+
+        Returns:
+            StringColumn: Encoded column
+        """
+        encoded = [value.encode("utf-8") if isinstance(value, str) else b"" for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, data)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.data[self.offsets[row] : self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+
+class ConcatenatedColumn:
+    """Read-only view of several string columns one after the other."""
+
+    def __init__(self, parts):
+        self.parts = [
+            part for column in parts for part in (column.parts if isinstance(column, ConcatenatedColumn) else [column])
+        ]
+        self.offsets = np.cumsum([0] + [len(part) for part in self.parts])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, row):
+        part = int(np.searchsorted(self.offsets, row, side="right")) - 1
+        return self.parts[part][row - self.offsets[part]]
+
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_bundle(bundle_dir, arrays, columns, models, metadata=None):
+    """
+    Write a complete bundle. Files are written to a temporary directory that is only
+    renamed to bundle_dir once complete, so readers never see a partial bundle.
+
+    An existing bundle at bundle_dir is moved aside and replaced, which takes two
+    renames and is not atomic: only replace bundles nothing is serving, and write
+    a new registry version for the service instead.
+
+    Args:
+        bundle_dir (str): Target directory
+        arrays (dict): Numeric numpy arrays by name
+        columns (dict): Sequences of strings by name, one value per catalog row
+        models (dict): Picklable fitted objects by name
+        metadata (dict): Extra values stored in the manifest
+
+    Returns:
+        dict: The written manifest
+    """
+    tmp_dir = f"{bundle_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    files = {}
+
+    def save_array(file_name, array):
+        np.save(os.path.join(tmp_dir, file_name), np.ascontiguousarray(array))
+        files[file_name] = {"dtype": str(array.dtype), "shape": list(array.shape)}
+
+    for name, array in arrays.items():
+        save_array(f"{name}.npy", array)
+    for name, values in columns.items():
+        column = values if isinstance(values, StringColumn) else StringColumn.from_values(values)
+        save_array(f"{name}.offsets.npy", column.offsets)
+        save_array(f"{name}.data.npy", column.data)
+    for name, model in models.items():
+        joblib.dump(model, os.path.join(tmp_dir, f"{name}.joblib"))
+        files[f"{name}.joblib"] = {}
+
+    for file_name, info in files.items():
+        path = os.path.join(tmp_dir, file_name)
+        info["bytes"] = os.path.getsize(path)
+        info["sha256"] = _sha256(path)
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "created_at": time.time(),
+        "arrays": sorted(arrays),
+        "columns": sorted(columns),
+        "models": sorted(models),
+        "files": files,
+        **(metadata or {}),
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    old_dir = f"{bundle_dir}.old-{os.getpid()}"
+    if os.path.exists(bundle_dir):
+        os.replace(bundle_dir, old_dir)
+    os.replace(tmp_dir, bundle_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+class ModelBundle:
+    """
+    Loaded view of a bundle directory. Arrays are memory-mapped read-only and
+    models are only unpickled when first requested.
+    """
+
+    def __init__(self, bundle_dir, mmap_mode="r", verify=False):
+        """
+        Open a bundle.
+
+        Args:
+            bundle_dir (str): Bundle directory written by write_bundle
+            mmap_mode (str): numpy mmap mode, None loads arrays into private memory
+            verify (bool): Check every file against its sha256 instead of only its size
+
+        Raises:
+            ValueError: If the manifest is missing, has an unknown format or a file does not match it
+        """
+        self.bundle_dir = bundle_dir
+        manifest_path = os.path.join(bundle_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"No {MANIFEST_FILE} in {bundle_dir}")
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format {self.manifest.get('format_version')} in {bundle_dir}")
+        self.verify(full=verify)
+
+        self.arrays = {name: self._load_array(f"{name}.npy", mmap_mode) for name in self.manifest["arrays"]}
+        self.columns = {
+            name: StringColumn(
+                self._load_array(f"{name}.offsets.npy", mmap_mode), self._load_array(f"{name}.data.npy", mmap_mode)
+            )
+            for name in self.manifest["columns"]
+        }
+        self._models = {}
+
+    def _load_array(self, file_name, mmap_mode):
+        array = np.load(os.path.join(self.bundle_dir, file_name), mmap_mode=mmap_mode)
+        # A plain ndarray view keeps the mapping but makes slicing much cheaper than on np.memmap
+        return array.view(np.ndarray) if isinstance(array, np.memmap) else array
+
+    def verify(self, full=False):
+        """
+        Check the bundle files against the manifest.
+
+        Args:
+            full (bool): Compare sha256 checksums, otherwise only file sizes
+
+        Raises:
+            ValueError: If a file is missing or does not match the manifest
+        """
+        for file_name, info in self.manifest["files"].items():
+            path = os.path.join(self.bundle_dir, file_name)
+            if not os.path.exists(path) or os.path.getsize(path) != info["bytes"]:
+                raise ValueError(f"{path} is missing or has an unexpected size")
+            if full and _sha256(path) != info["sha256"]:
+                raise ValueError(f"{path} does not match its checksum")
+
+    def model(self, name):
+        """
+        Load a fitted model from the bundle, caching it for later calls.
+
+        Args:
+            name (str): Model name as passed to write_bundle
+
+        Returns:
+            object: The unpickled model
+        """
+        if name not in self._models:
+            self._models[name] = joblib.load(os.path.join(self.bundle_dir, f"{name}.joblib"), mmap_mode="r")
+        return self._models[name]
+
+
+def new_version_name():
+    """
+    Name a new model version after the current UTC time, so versions sort chronologically,
+    followed by a random suffix so versions created within the same second don't collide.
+
+    Returns:
+        str: Version name such as 20240501-120000-3f9a2c
+    """
+    return f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{secrets.token_hex(3)}"
+
+
+def version_dir(model_dir, version):
+    """
+    Get the bundle directory of a model version in the registry.
+
+    Args:
+        model_dir (str): Model directory holding the registry
+        version (str): Version name
+
+    Returns:
+        str: Path of the version's bundle
+    """
+    return os.path.join(model_dir, REGISTRY_DIR, version)
+
+
+def list_versions(model_dir):
+    """
+    List the versions in the registry that hold a complete bundle.
+
+    Args:
+        model_dir (str): Model directory holding the registry
+
+    Returns:
+        list: Version names, oldest first
+    """
+    registry = os.path.join(model_dir, REGISTRY_DIR)
+    if not os.path.isdir(registry):
+        return []
+    return sorted(
+        name for name in os.listdir(registry) if os.path.exists(os.path.join(registry, name, MANIFEST_FILE))
+    )
+
+
+def list_segments(bundle_dir):
+    """
+    List the complete segments appended to a bundle.
+
+    Args:
+        bundle_dir (str): Bundle directory
+
+    Returns:
+        list: Segment directories, oldest first
+    """
+    segments = os.path.join(bundle_dir, SEGMENTS_DIR)
+    if not os.path.isdir(segments):
+        return []
+    return [
+        os.path.join(segments, name)
+        for name in sorted(os.listdir(segments))
+        if name.isdigit() and os.path.exists(os.path.join(segments, name, MANIFEST_FILE))
+    ]
+
+
+def next_segment_dir(bundle_dir):
+    """
+    Get the directory for the next segment of a bundle. write_bundle only moves a
+    segment there once it is complete, so the service never sees a partial one.
+
+    Args:
+        bundle_dir (str): Bundle directory
+
+    Returns:
+        str: Path of the next segment
+    """
+    return os.path.join(bundle_dir, SEGMENTS_DIR, f"{len(list_segments(bundle_dir)) + 1:04d}")
+
+
+def segmented_version(version, n_segments):
+    """
+    Name a version served with some of its segments.
+
+    Args:
+        version (str): Registry version name
+        n_segments (int): Number of segments served with it
+
+    Returns:
+        str: The version name, followed by +n_segments if there are any
+    """
+    return f"{version}+{n_segments}" if n_segments else version
+
+
+def parse_segmented_version(name):
+    """
+    Split a name from segmented_version.
+
+    Args:
+        name (str): Served version name
+
+    Returns:
+        tuple: (version, n_segments)
+    """
+    version, _, n_segments = name.partition("+")
+    return version, int(n_segments or 0)
+
+
+def current_version(model_dir):
+    """
+    Read the version the registry currently points to.
+
+    Args:
+        model_dir (str): Model directory holding the registry
+
+    Returns:
+        str: Current version name, or None if no version was published yet
+    """
+    try:
+        with open(os.path.join(model_dir, REGISTRY_DIR, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_bundle_dir(model_dir):
+    """
+    Find the bundle to serve: the current registry version, or the unversioned
+    <model_dir>/bundle written before the registry existed.
+
+    Args:
+        model_dir (str): Model directory
+
+    Returns:
+        tuple: (version, bundle_dir), with version "bundle" for the unversioned bundle,
+            or (None, None) if the directory holds no bundle
+    """
+    version = current_version(model_dir)
+    if version is not None:
+        return version, version_dir(model_dir, version)
+    if os.path.exists(os.path.join(model_dir, "bundle", MANIFEST_FILE)):
+        return "bundle", os.path.join(model_dir, "bundle")
+    return None, None
+
+
+def publish_version(model_dir, version):
+    """
+    Point the registry at a version. The pointer file is replaced atomically, so
+    readers see either the old or the new version.
+
+    Args:
+        model_dir (str): Model directory holding the registry
+        version (str): Version name, must hold a complete bundle
+
+    Raises:
+        ValueError: If the version has no bundle
+    """
+    if not os.path.exists(os.path.join(version_dir(model_dir, version), MANIFEST_FILE)):
+        raise ValueError(f"Model version {version} has no bundle in {model_dir}/{REGISTRY_DIR}")
+
+    pointer = os.path.join(model_dir, REGISTRY_DIR, CURRENT_FILE)
+    tmp_pointer = f"{pointer}.tmp-{os.getpid()}"
+    with open(tmp_pointer, "w") as f:
+        f.write(version)
+    os.replace(tmp_pointer, pointer)
+
+
+@contextmanager
+def registry_lock(model_dir):
+    """
+    Hold an exclusive lock on the registry, shared by all processes on the host.
+
+    Args:
+        model_dir (str): Model directory holding the registry
+    """
+    registry = os.path.join(model_dir, REGISTRY_DIR)
+    os.makedirs(registry, exist_ok=True)
+    with open(os.path.join(registry, LOCK_FILE), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def publish_legacy_model_dir(model_dir, replace_current=False):
+    """
+    Convert a legacy model directory into a new registry version and publish it.
+
+    Runs under the registry lock, so when several workers start on a legacy
+    directory at once, one converts it and the others wait and serve its version.
+
+    Args:
+        model_dir (str): Directory holding games_may2024_cleaned.csv and the .pkl files
+        replace_current (bool): Convert even if the directory already has a bundle to serve
+
+    Returns:
+        tuple: (version, bundle_dir) of the version to serve
+    """
+    with registry_lock(model_dir):
+        version, bundle_dir = resolve_bundle_dir(model_dir)
+        if version is not None and not replace_current:
+            return version, bundle_dir
+        version = new_version_name()
+        bundle_dir = version_dir(model_dir, version)
+        manifest = convert_legacy_model_dir(model_dir, bundle_dir)
+        publish_version(model_dir, version)
+    logger.info(f"Published version {version} with {manifest['n_games']} games")
+    return version, bundle_dir
+
+
+def convert_legacy_model_dir(model_dir, bundle_dir):
+    """
+    Build a bundle from the CSV and compressed pickles written by older versions of train.py.
+
+    Args:
+        model_dir (str): Directory holding games_may2024_cleaned.csv and the .pkl files
+        bundle_dir (str): Target bundle directory
+
+    Returns:
+        dict: The written manifest
+    """
+    import pandas as pd
+
+    from genre_filter import build_genre_bitmaps, split_genres
+    from lookup import CatalogLookup
+    from vector_store import compact_arrays
+
+    df = pd.read_csv(f"{model_dir}/games_may2024_cleaned.csv")
+    tfidf = joblib.load(f"{model_dir}/tfidf.pkl")
+    rf_model = joblib.load(f"{model_dir}/random_forest.pkl")
+    label_encoder = joblib.load(f"{model_dir}/label_encoder.pkl")
+
+    probs_path = f"{model_dir}/catalog_probs_v1.npy"
+    if os.path.exists(probs_path):
+        catalog_probs = np.load(probs_path)
+    else:
+        catalog_probs = rf_model.predict_proba(tfidf.transform(df["combined_features"].fillna(""))).astype(np.float32)
+
+    appids = df["AppID"].to_numpy(dtype=np.int64)
+    lookup = CatalogLookup.build(df["name"].astype(str), appids)
+    genre_names, genre_bitmaps = build_genre_bitmaps(
+        split_genres(df["genres"] if "genres" in df else df.get("primary_genre", [None] * len(df)))
+    )
+    return write_bundle(
+        bundle_dir,
+        arrays={
+            "catalog_probs": catalog_probs,
+            **compact_arrays(catalog_probs),
+            "appids": appids,
+            **lookup.to_arrays(),
+            "genre_bitmaps": genre_bitmaps,
+        },
+        columns={
+            column: df[column] if column in df else [""] * len(df)
+            for column in ["name", "short_description", "header_image", "primary_genre"]
+        },
+        models={"tfidf": tfidf, "model": rf_model, "label_encoder": label_encoder},
+        metadata={
+            "n_games": len(df),
+            "genre_classes": label_encoder.classes_.tolist(),
+            "genre_names": genre_names,
+        },
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Convert a legacy model directory into a new registry version and publish it."
+    )
+    parser.add_argument("model_dir", nargs="?", default="./model")
+    args = parser.parse_args()
+
+    publish_legacy_model_dir(args.model_dir, replace_current=True)
@@ -0,0 +1,111 @@
+import asyncio
+import os
+
+
+class MicroBatcher:
+    """
+    Collects requests that arrive within a short window and processes them together,
+    so concurrent requests share one vectorized pass over the catalog.
+    """
+
+    def __init__(self, process_batch, executor, max_batch_size=16, max_wait_ms=5.0):
+        """
+        Configure the batcher. The collecting task starts with the first request.
+
+        Args:
+            process_batch (callable): Module-level function taking a list of items and returning
+                one result per item; a returned exception is raised to that item's caller
+            executor (InferenceExecutor): Pool the batches run on
+            max_batch_size (int): Largest number of requests processed together
+            max_wait_ms (float): How long the first request of a batch waits for others to join
+        """
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._collector = None
+        self._batch_tasks = set()
+
+    async def submit(self, item):
+        """
+        Queue one item and wait for its result.
+
+        Args:
+            item: Argument for process_batch
+
+        Returns:
+            object: The result for this item
+        """
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.create_task(self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def close(self):
+        """Stop collecting new batches. Batches already running are left to finish."""
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Process batches concurrently so the next one can be collected meanwhile
+            task = asyncio.create_task(self._run(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = await self.executor.run(self.process_batch, items)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def create_micro_batcher(process_batch, executor):
+    """
+    Create a batcher when BATCHING_ENABLED is set, configured by BATCH_MAX_SIZE and BATCH_MAX_WAIT_MS.
+
+    Args:
+        process_batch (callable): Function processing a list of items
+        executor (InferenceExecutor): Pool the batches run on
+
+    Returns:
+        MicroBatcher: The batcher, or None when batching is disabled
+    """
+    if os.getenv("BATCHING_ENABLED", "0").lower() not in ("1", "true", "yes"):
+        return None
+    return MicroBatcher(
+        process_batch,
+        executor,
+        max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "16")),
+        max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "5")),
+    )
@@ -0,0 +1,92 @@
+"""
+Throughput of /recommend/ inference with and without micro-batching.
+
+Fires requests from many concurrent callers at the inference pool, either one
+request per pool task or through the MicroBatcher, and reports throughput and
+latency percentiles. Uses the bundle in MODEL_DIR (default ./model).
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_batching --requests 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+import app
+from batching import MicroBatcher
+from benchmarks.common import latency_summary
+from inference import InferenceExecutor
+
+
+def make_requests(n_requests, library_size, rng):
+    appids = app.model_state.catalog_appids
+    return [
+        app.GameRequest(appids=appids[rng.integers(0, len(appids), size=library_size)].tolist())
+        for _ in range(n_requests)
+    ]
+
+
+async def drive(requests, concurrency, call):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(request):
+        async with semaphore:
+            start = time.perf_counter()
+            await call(request)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(request) for request in requests))
+    return latency_summary(latencies, time.perf_counter() - start)
+
+
+async def run(args):
+    rng = np.random.default_rng(args.seed)
+    requests = make_requests(args.requests, args.library_size, rng)
+    queue_size = args.requests
+
+    version = app.model_state.version
+    executor = InferenceExecutor(workers=args.workers, queue_size=queue_size)
+    report = {
+        "games": len(app.model_state.catalog_appids),
+        "concurrency": args.concurrency,
+        "unbatched": await drive(
+            requests, args.concurrency, lambda r: executor.run(app.compute_recommendations, version, r, set())
+        ),
+    }
+
+    for batch_size in args.batch_sizes:
+        batcher = MicroBatcher(
+            app.compute_recommendations_batch,
+            InferenceExecutor(workers=args.workers, queue_size=queue_size),
+            max_batch_size=batch_size,
+            max_wait_ms=args.max_wait_ms,
+        )
+        report[f"batched_{batch_size}"] = await drive(
+            requests, args.concurrency, lambda r: batcher.submit((version, r, set()))
+        )
+        await batcher.close()
+
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--library-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
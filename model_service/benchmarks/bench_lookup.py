@@ -0,0 +1,61 @@
+"""
+Micro-benchmark of owned-game resolution: DataFrame isin scan versus the CatalogLookup index.
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_lookup --games 100000 --library-size 5000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from lookup import CatalogLookup
+
+
+def per_call_ms(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--library-size", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    df = pd.DataFrame(
+        {
+            "name": [f"Game Title {i}" for i in range(args.games)],
+            "AppID": rng.permutation(args.games * 10)[: args.games],
+        }
+    )
+    library_rows = rng.choice(args.games, size=args.library_size, replace=False)
+    library_names = set(df["name"].to_numpy()[library_rows])
+    library_appids = df["AppID"].to_numpy()[library_rows].tolist()
+
+    start = time.perf_counter()
+    lookup = CatalogLookup(df["name"].to_numpy(), df["AppID"].to_numpy())
+    build_ms = (time.perf_counter() - start) * 1000
+
+    report = {
+        "games": args.games,
+        "library_size": args.library_size,
+        "index_build_ms": round(build_ms, 1),
+        "dataframe_isin_ms": round(per_call_ms(lambda: df[df["name"].isin(library_names)], args.repeats), 3),
+        "lookup_by_name_ms": round(per_call_ms(lambda: lookup.rows_for_names(library_names), args.repeats), 3),
+        "lookup_by_appid_ms": round(per_call_ms(lambda: lookup.rows_for_appids(library_appids), args.repeats), 3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
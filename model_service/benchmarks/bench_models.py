@@ -0,0 +1,126 @@
+"""
+Evaluation of the genre model backends against the random forest.
+
+Fits every backend on the same TF-IDF features and reports, per backend:
+fit time, predict_proba time per 1k games, serialized size, held-out accuracy,
+top-genre agreement and probability distance to the forest, and the overlap of
+the 1000-game candidate pools the service would collect from each model's
+catalog probabilities.
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_models --games 50000
+    python -m benchmarks.bench_models --csv ./model/games_may2024_full.csv
+"""
+
+import argparse
+import io
+import json
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.synthetic import make_catalog
+from models import MODEL_BACKENDS, predict_genre_proba, train_genre_model
+from retrieval import exact_top_k, normalize_rows
+
+
+def load_texts(args):
+    """Texts and primary genres of the games, from the dataset CSV or a synthetic catalog."""
+    if args.csv:
+        from dataset import read_dataset
+        from preprocessing import TEXT_COLUMNS, combine_features, primary_genres
+
+        df = read_dataset(args.csv, TEXT_COLUMNS)
+        return combine_features(df).tolist(), primary_genres(df["genres"]).to_numpy()
+    df = make_catalog(args.games, args.seed)
+    return df["short_description"].tolist(), df["primary_genre"].to_numpy()
+
+
+def serialized_bytes(model):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+
+def ranking_overlap(probs, reference_probs, rng, n_queries=50, library_size=20, k=1000):
+    """Mean overlap of the top-k catalog games for the same libraries under two probability matrices."""
+    libraries = rng.integers(0, len(probs), size=(n_queries, library_size))
+    unit, reference_unit = normalize_rows(probs), normalize_rows(reference_probs)
+    overlaps = []
+    for library in libraries:
+        top = exact_top_k(unit @ probs[library].mean(axis=0), k)
+        reference_top = exact_top_k(reference_unit @ reference_probs[library].mean(axis=0), k)
+        overlaps.append(len(np.intersect1d(top, reference_top)) / k)
+    return float(np.mean(overlaps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="games_may2024_full.csv; a synthetic catalog is used otherwise")
+    parser.add_argument("--games", type=int, default=50_000, help="Size of the synthetic catalog")
+    parser.add_argument("--backends", nargs="+", default=list(MODEL_BACKENDS), choices=MODEL_BACKENDS)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import LabelEncoder
+
+    texts, genres = load_texts(args)
+    features = TfidfVectorizer(stop_words="english", max_features=1000).fit_transform(texts)
+    label_encoder = LabelEncoder()
+    labels = label_encoder.fit_transform(genres)
+    n_classes = len(label_encoder.classes_)
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(labels))
+    n_test = int(len(labels) * args.test_size)
+    test, train = order[:n_test], order[n_test:]
+
+    results = {}
+    for backend in ["random_forest"] + [b for b in args.backends if b != "random_forest"]:
+        start = time.perf_counter()
+        model = train_genre_model(backend, features[train], labels[train], random_state=args.seed)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        catalog_probs = predict_genre_proba(model, features, n_classes)
+        predict_seconds = time.perf_counter() - start
+
+        results[backend] = {
+            "model": model,
+            "probs": catalog_probs,
+            "report": {
+                "fit_seconds": round(fit_seconds, 2),
+                "predict_ms_per_1k_games": round(predict_seconds * 1000 / len(labels) * 1000, 3),
+                "artifact_bytes": serialized_bytes(model),
+                "holdout_accuracy": round(float(np.mean(catalog_probs[test].argmax(axis=1) == labels[test])), 4),
+            },
+        }
+
+    reference = results["random_forest"]["probs"]
+    for backend, result in results.items():
+        probs = result["probs"]
+        top_genre_agreement = np.mean(probs.argmax(axis=1) == reference.argmax(axis=1))
+        result["report"].update(
+            {
+                "top_genre_agreement_with_rf": round(float(top_genre_agreement), 4),
+                "mean_total_variation_to_rf": round(float(np.abs(probs - reference).sum(axis=1).mean() / 2), 4),
+                "candidate_pool_overlap_with_rf": round(
+                    ranking_overlap(probs, reference, np.random.default_rng(args.seed)), 4
+                ),
+            }
+        )
+
+    report = {
+        "games": len(labels),
+        "genres": n_classes,
+        "backends": {backend: result["report"] for backend, result in results.items() if backend in args.backends},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
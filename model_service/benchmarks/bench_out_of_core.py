@@ -0,0 +1,122 @@
+"""
+Comparison of the two training modes of train.py on the same dataset.
+
+Runs train.py once with TRAIN_MODE=batch (TF-IDF and the in-memory genre model) and
+once with TRAIN_MODE=out_of_core (hashed features and an incremental model fitted
+chunk by chunk), each in a fresh process and model directory, and reports per mode:
+total and per-stage time and peak RSS from the run report, bundle size, and how
+closely the out_of_core catalog matches the batch one: top genre agreement,
+probability distance and overlap of the 1000-game candidate pools of random libraries.
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_out_of_core --csv ./model/games_may2024_full.csv
+    python -m benchmarks.bench_out_of_core --csv ./model/games_may2024_full.csv --incremental-backend naive_bayes
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.bench_models import ranking_overlap
+from benchmarks.common import run_metadata
+from models import INCREMENTAL_BACKENDS, MODEL_BACKENDS
+
+TRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "train.py")
+
+
+def train(csv_path, work_dir, env):
+    """
+    Run train.py on a dataset in its own model directory.
+
+    Returns:
+        tuple: (report, bundle_dir) with the run report and the written version directory
+    """
+    model_dir = os.path.join(work_dir, "model")
+    os.makedirs(model_dir)
+    os.symlink(os.path.abspath(csv_path), os.path.join(model_dir, "games_may2024_full.csv"))
+    subprocess.run(
+        [sys.executable, TRAIN_SCRIPT],
+        cwd=work_dir,
+        env={**os.environ, "TRAIN_CHECKPOINTS": "0", **env},
+        check=True,
+        capture_output=True,
+    )
+    report_path = glob.glob(os.path.join(model_dir, "runs", "*.json"))[0]
+    with open(report_path) as f:
+        report = json.load(f)
+    return report, os.path.join(model_dir, "registry", report["version"])
+
+
+def summarize(report):
+    return {
+        "total_seconds": report["total_seconds"],
+        "peak_rss_mb": max(stage["peak_rss_mb"] or 0 for stage in report["stages"].values()),
+        "bundle_bytes": report["bundle_bytes"],
+        "stages": {
+            name: {"seconds": stage["seconds"], "peak_rss_mb": stage["peak_rss_mb"]}
+            for name, stage in report["stages"].items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="./model/games_may2024_full.csv")
+    parser.add_argument("--batch-backend", default="random_forest", choices=MODEL_BACKENDS)
+    parser.add_argument("--incremental-backend", default="sgd", choices=INCREMENTAL_BACKENDS)
+    parser.add_argument("--memory-budget-mb", type=int, default=256, help="Memory budget of the out_of_core run")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    # The neighbour graph costs the same in both modes
+    common = {"N_NEIGHBORS": "0"}
+    runs = {
+        "batch": {**common, "TRAIN_MODE": "batch", "MODEL_BACKEND": args.batch_backend},
+        "out_of_core": {
+            **common,
+            "TRAIN_MODE": "out_of_core",
+            "MODEL_BACKEND": args.incremental_backend,
+            "TRAIN_MEMORY_BUDGET_MB": str(args.memory_budget_mb),
+            "OUT_OF_CORE_EPOCHS": str(args.epochs),
+        },
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, env in runs.items():
+            report, bundle_dir = train(args.csv, os.path.join(tmp, mode), env)
+            results[mode] = {
+                "backend": env["MODEL_BACKEND"],
+                **summarize(report),
+                "probs": np.load(os.path.join(bundle_dir, "catalog_probs.npy")),
+            }
+
+    reference, probs = results["batch"].pop("probs"), results["out_of_core"].pop("probs")
+    report = {
+        "games": len(reference),
+        "modes": results,
+        "out_of_core_vs_batch": {
+            "top_genre_agreement": round(float(np.mean(probs.argmax(axis=1) == reference.argmax(axis=1))), 4),
+            "mean_total_variation": round(float(np.abs(probs - reference).sum(axis=1).mean() / 2), 4),
+            "candidate_pool_overlap": round(ranking_overlap(probs, reference, np.random.default_rng(args.seed)), 4),
+            "peak_rss_ratio": round(results["out_of_core"]["peak_rss_mb"] / results["batch"]["peak_rss_mb"], 3),
+            "time_ratio": round(results["out_of_core"]["total_seconds"] / results["batch"]["total_seconds"], 3),
+        },
+        "meta": run_metadata(),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Memory, scoring latency and ranking fidelity of the reduced-precision catalog stores.
+
+Scores random user profiles against the catalog in every precision and compares
+the top-k rankings with full precision float32.
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_precision --games 500000
+    python -m benchmarks.bench_precision --model-dir ./model
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from artifacts import ModelBundle, resolve_bundle_dir
+from benchmarks.synthetic import build_model_dir
+from retrieval import exact_top_k
+from vector_store import DEFAULT_TOP_N, PRECISIONS, encode_vectors
+
+
+def cosine_scores(store, profiles):
+    profiles = profiles / np.maximum(np.linalg.norm(profiles, axis=1, keepdims=True), 1e-12)
+    return store.dot(profiles) / np.maximum(store.norms, 1e-12)
+
+
+def per_call_ms(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="Use this registry instead of a synthetic catalog")
+    parser.add_argument("--games", type=int, default=100_000, help="Size of the synthetic catalog")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--library-size", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N)
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model_dir = args.model_dir
+    if model_dir is None:
+        model_dir = f"/tmp/gyg-bench-{args.games}"
+        os.makedirs(model_dir, exist_ok=True)
+        build_model_dir(model_dir, args.games, args.seed)
+    vectors = np.asarray(ModelBundle(resolve_bundle_dir(model_dir)[1]).arrays["catalog_probs"], dtype=np.float32)
+
+    # Profiles are library means, as create_user_profile builds them
+    rng = np.random.default_rng(args.seed)
+    libraries = rng.integers(0, len(vectors), size=(args.queries, args.library_size))
+    profiles = vectors[libraries].mean(axis=1)
+
+    reference = encode_vectors(vectors, "float32")
+    reference_scores = cosine_scores(reference, profiles)
+    reference_top = {k: [exact_top_k(scores, k) for scores in reference_scores] for k in args.k}
+
+    report = {"games": len(vectors), "genres": vectors.shape[1], "top_n": args.top_n, "precisions": {}}
+    for precision in PRECISIONS:
+        start = time.perf_counter()
+        store = encode_vectors(vectors, precision, args.top_n)
+        encode_seconds = time.perf_counter() - start
+
+        scores = cosine_scores(store, profiles)
+        overlap = {
+            f"overlap_at_{k}": round(
+                float(
+                    np.mean(
+                        [
+                            len(np.intersect1d(exact_top_k(row, k), top)) / len(top)
+                            for row, top in zip(scores, reference_top[k])
+                        ]
+                    )
+                ),
+                4,
+            )
+            for k in args.k
+        }
+        batch = profiles[: args.batch_size]
+        report["precisions"][precision] = {
+            "bytes": store.nbytes,
+            "bytes_per_game": round(store.nbytes / len(store), 1),
+            "relative_size": round(store.nbytes / reference.nbytes, 3),
+            "encode_seconds": round(encode_seconds, 3),
+            "ms_per_query": round(per_call_ms(lambda: store.dot(profiles[:1]), args.queries), 3),
+            f"ms_per_batch_of_{len(batch)}": round(per_call_ms(lambda: store.dot(batch), 10), 3),
+            "max_abs_score_error": round(float(np.abs(scores - reference_scores).max()), 5),
+            **overlap,
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
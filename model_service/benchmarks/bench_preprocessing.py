@@ -0,0 +1,110 @@
+"""
+Benchmark of the dataset preprocessing: per-row apply against the vectorized
+functions in preprocessing.py.
+
+Times combined text cleaning, primary genre extraction and owner range parsing on
+the dataset, checks that both give the same values, and reports the speedups.
+The review sentiment pass is not included, it has no vectorized form.
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_preprocessing --csv ./model/games_may2024_full.csv
+    python -m benchmarks.bench_preprocessing --csv ./model/games_may2024_full.csv --scale 10
+"""
+
+import argparse
+import json
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import run_metadata
+from dataset import read_dataset
+from preprocessing import combine_features, estimated_owners, primary_genres
+
+
+def apply_combine_features(df):
+    """Per-row cleaning as train.py did it before preprocessing.py."""
+    combined = (
+        df["short_description"].fillna("")
+        + " "
+        + df["categories"].fillna("")
+        + " "
+        + df["genres"].fillna("")
+        + " "
+        + df["tags"].fillna("")
+    )
+    return combined.apply(lambda x: re.sub(r"[^a-zA-Z0-9\s.,!?\';:-]", "", x))
+
+
+def apply_primary_genres(genres):
+    return genres.fillna("").apply(lambda x: x.split(",")[0].strip() if x else "Unknown")
+
+
+def parse_estimated_owners(owner_range):
+    try:
+        lower, upper = owner_range.split(" - ")
+        return (int(lower) + int(upper)) / 2
+    except (AttributeError, ValueError):
+        return 0
+
+
+def best_seconds(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="./model/games_may2024_full.csv")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat the dataset this many times")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    df = read_dataset(args.csv, ["short_description", "categories", "genres", "tags", "estimated_owners"])
+    df = pd.concat([df] * args.scale, ignore_index=True)
+    # The per-row parser is timed on plain strings, the vectorized one on the categorical column train.py reads
+    owner_strings = df["estimated_owners"].astype(object)
+
+    steps = {
+        "combine_features": (lambda: apply_combine_features(df), lambda: combine_features(df)),
+        "primary_genre": (lambda: apply_primary_genres(df["genres"]), lambda: primary_genres(df["genres"])),
+        "estimated_owners": (
+            lambda: owner_strings.apply(parse_estimated_owners),
+            lambda: estimated_owners(df["estimated_owners"]),
+        ),
+    }
+    report = {"games": len(df), "steps": {}, "meta": run_metadata()}
+    total_apply = total_vectorized = 0.0
+    for name, (per_row, vectorized) in steps.items():
+        apply_seconds, expected = best_seconds(per_row, args.repeats)
+        vectorized_seconds, result = best_seconds(vectorized, args.repeats)
+        if name == "estimated_owners":
+            identical = bool(np.array_equal(expected.to_numpy(dtype=float), result.to_numpy(dtype=float)))
+        else:
+            identical = expected.astype(str).tolist() == result.astype(str).tolist()
+        report["steps"][name] = {
+            "apply_ms": round(apply_seconds * 1000, 1),
+            "vectorized_ms": round(vectorized_seconds * 1000, 1),
+            "speedup": round(apply_seconds / vectorized_seconds, 2),
+            "identical": identical,
+        }
+        total_apply += apply_seconds
+        total_vectorized += vectorized_seconds
+    report["total_speedup"] = round(total_apply / total_vectorized, 2)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Recall-vs-latency benchmark of the approximate IVF index against exact top-k.
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_retrieval --games 100000 --n-probe 1 4 8 16
+    python -m benchmarks.bench_retrieval --model-dir ./model
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from artifacts import resolve_bundle_dir
+from retrieval import IVFIndex, exact_top_k, normalize_rows
+
+
+def load_vectors(args, rng):
+    if args.model_dir:
+        _, bundle_dir = resolve_bundle_dir(args.model_dir)
+        return np.load(f"{bundle_dir}/catalog_probs.npy")
+    return rng.dirichlet(np.full(args.genres, 0.1), size=args.games).astype(np.float32)
+
+
+def make_queries(vectors, n_queries, library_size, rng):
+    rows = rng.integers(0, len(vectors), size=(n_queries, library_size))
+    return vectors[rows].mean(axis=1)
+
+
+def time_per_query(fn, queries):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(fn(query))
+    return results, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="Benchmark the trained catalog instead of synthetic vectors")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--genres", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--library-size", type=int, default=50)
+    parser.add_argument("--k", type=int, default=1000)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = load_vectors(args, rng)
+    queries = make_queries(vectors, args.queries, args.library_size, rng)
+    unit_vectors = normalize_rows(vectors)
+
+    def exact(query):
+        return exact_top_k(unit_vectors @ normalize_rows(query.reshape(1, -1))[0], args.k)
+
+    exact_results, exact_ms = time_per_query(exact, queries)
+
+    start = time.perf_counter()
+    index = IVFIndex(vectors, n_lists=args.n_lists)
+    build_s = time.perf_counter() - start
+
+    report = {
+        "games": len(vectors),
+        "genres": vectors.shape[1],
+        "k": args.k,
+        "exact_ms_per_query": round(exact_ms, 3),
+        "ivf_lists": index.n_lists,
+        "ivf_build_seconds": round(build_s, 2),
+        "ivf": [],
+    }
+    for n_probe in args.n_probe:
+        ivf_results, ivf_ms = time_per_query(lambda q: index.search(q, args.k, n_probe=n_probe)[0], queries)
+        recall = np.mean(
+            [len(np.intersect1d(a, e)) / max(len(e), 1) for a, e in zip(ivf_results, exact_results)]
+        )
+        report["ivf"].append(
+            {"n_probe": n_probe, "ms_per_query": round(ivf_ms, 3), "recall_at_k": round(float(recall), 4)}
+        )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
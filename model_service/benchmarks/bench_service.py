@@ -0,0 +1,196 @@
+"""
+Reproducible benchmark of /recommend/ on a synthetic catalog.
+
+Builds (or reuses) a synthetic model registry of the requested size, then
+measures requests for each library size in two ways, each in a fresh process:
+
+- functions: calls compute_recommendations directly and reports latency
+  percentiles per stage (resolve, profile, candidates, select, details)
+- http: runs the service under uvicorn and drives POST /recommend/ with
+  concurrent clients
+
+Every section reports p50/p95/p99 latency, throughput and peak RSS. The JSON
+report records the commit it ran on; compare two reports with
+benchmarks.compare to spot regressions.
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_service --games 100000 --library-sizes 1 100 10000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import latency_summary, read_memory_mb, run_metadata
+from benchmarks.synthetic import build_model_dir, make_libraries
+
+STAGES = ["resolve", "profile", "candidates", "select", "details"]
+
+
+def bench_functions(model_dir, args, results):
+    """Time compute_recommendations in this process. Runs in a fresh process per benchmark."""
+    os.environ["MODEL_DIR"] = model_dir
+    import app
+
+    state = app.model_state
+    report = {"after_load": read_memory_mb()}
+    for library_size in args.library_sizes:
+        libraries = make_libraries(
+            state.catalog_names, state.catalog_appids, library_size, args.requests, args.seed, args.by_name
+        )
+        requests = [app.GameRequest(game_names=names, appids=appids, k=args.k) for names, appids in libraries]
+
+        # Warm up caches and lazy imports before measuring
+        for request in requests[: args.warmup]:
+            app.compute_recommendations(state.version, request, set())
+
+        latencies = []
+        stages = {stage: [] for stage in STAGES}
+        start = time.perf_counter()
+        for request in requests:
+            request_start = time.perf_counter()
+            _, timer, _ = app.compute_recommendations(state.version, request, set())
+            latencies.append(time.perf_counter() - request_start)
+            for stage in STAGES:
+                stages[stage].append(timer.stages.get(stage, 0.0))
+        elapsed = time.perf_counter() - start
+
+        report[f"library_{library_size}"] = {
+            **latency_summary(latencies, elapsed),
+            "stages": {
+                stage: {key: value for key, value in latency_summary(values, elapsed).items() if key.endswith("_ms")}
+                for stage, values in stages.items()
+            },
+            **read_memory_mb(),
+        }
+    results.put(report)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(model_dir, port, timeout=120):
+    """Start the service under uvicorn and wait until /health answers."""
+    import httpx
+
+    # Warmup libraries are sent again, measure them uncached unless asked otherwise
+    env = {"POOL_CACHE_SIZE": "0", **os.environ, "MODEL_DIR": model_dir}
+    command = [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port)]
+    server = subprocess.Popen(command + ["--log-level", "warning"], env=env)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Service exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Service did not start within {timeout} seconds")
+
+
+async def drive_http(url, bodies, concurrency):
+    import httpx
+
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=concurrency)) as client:
+
+        async def one(body):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(url, json=body)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(body) for body in bodies))
+        elapsed = time.perf_counter() - start
+
+    return {**latency_summary(latencies, elapsed), "statuses": {str(k): v for k, v in sorted(statuses.items())}}
+
+
+def bench_http(model_dir, catalog_names, catalog_appids, args):
+    port = free_port()
+    server = start_server(model_dir, port)
+    url = f"http://127.0.0.1:{port}/recommend/"
+    report = {"after_load": read_memory_mb(server.pid)}
+    try:
+        for library_size in args.library_sizes:
+            libraries = make_libraries(
+                catalog_names, catalog_appids, library_size, args.requests, args.seed, args.by_name
+            )
+            bodies = [{"game_names": names, "appids": appids, "k": args.k} for names, appids in libraries]
+            asyncio.run(drive_http(url, bodies[: args.warmup], args.concurrency))
+            report[f"library_{library_size}"] = {
+                **asyncio.run(drive_http(url, bodies, args.concurrency)),
+                **read_memory_mb(server.pid),
+            }
+    finally:
+        server.terminate()
+        server.wait()
+    return report
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--model-dir", default=None, help="Defaults to /tmp/gyg-bench-<games>")
+    parser.add_argument("--library-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per library size")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent HTTP clients")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--by-name", type=float, default=0.5, help="Share of each library sent as names")
+    parser.add_argument("--modes", nargs="+", default=["functions", "http"], choices=["functions", "http"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    model_dir = args.model_dir or f"/tmp/gyg-bench-{args.games}"
+    os.makedirs(model_dir, exist_ok=True)
+
+    report = {
+        "meta": {**run_metadata(), "args": vars(args)},
+        "catalog": build_model_dir(model_dir, args.games, args.seed),
+    }
+
+    if "functions" in args.modes:
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        process = context.Process(target=bench_functions, args=(model_dir, args, results))
+        process.start()
+        report["functions"] = results.get()
+        process.join()
+
+    if "http" in args.modes:
+        from artifacts import ModelBundle, resolve_bundle_dir
+
+        bundle = ModelBundle(resolve_bundle_dir(model_dir)[1])
+        report["http"] = bench_http(model_dir, bundle.columns["name"], bundle.arrays["appids"], args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Cold-start time and resident memory per worker: legacy CSV + compressed pickles
+versus the memory-mapped artifact bundle.
+
+Each worker is a fresh process that loads the artifacts and scores one profile
+against the whole catalog, like a uvicorn worker serving its first request.
+RssAnon is private to the worker; RssFile is page cache shared between workers.
+
+Run from the model_service directory:
+
+    python -m benchmarks.bench_startup --model-dir ./model --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+
+def read_rss():
+    rss = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                rss[f"{key}_mb"] = round(int(value.split()[0]) / 1024, 1)
+    return rss
+
+
+def load_legacy(model_dir):
+    import joblib
+    import numpy as np
+    import pandas as pd
+
+    df = pd.read_csv(f"{model_dir}/games_may2024_cleaned.csv")
+    joblib.load(f"{model_dir}/tfidf.pkl")
+    joblib.load(f"{model_dir}/random_forest.pkl")
+    joblib.load(f"{model_dir}/label_encoder.pkl")
+    probs = np.load(f"{model_dir}/catalog_probs_v1.npy")
+    return len(df), probs
+
+
+def load_bundle(model_dir):
+    from artifacts import ModelBundle, resolve_bundle_dir
+
+    bundle = ModelBundle(resolve_bundle_dir(model_dir)[1], mmap_mode="r")
+    return bundle.manifest["n_games"], bundle.arrays["catalog_probs"]
+
+
+def worker(mode, model_dir, results):
+    start = time.perf_counter()
+    _, probs = (load_legacy if mode == "legacy" else load_bundle)(model_dir)
+    (probs @ probs[0]).argmax()
+    results.put({"cold_start_seconds": round(time.perf_counter() - start, 3), **read_rss()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default="./model")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=["legacy", "bundle"], choices=["legacy", "bundle"])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    report = {}
+    for mode in args.modes:
+        if mode == "legacy" and not os.path.exists(f"{args.model_dir}/games_may2024_cleaned.csv"):
+            continue
+        results = context.Queue()
+        workers = [context.Process(target=worker, args=(mode, args.model_dir, results)) for _ in range(args.workers)]
+        for process in workers:
+            process.start()
+        report[mode] = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Helpers shared by the benchmarks: latency summaries, memory readings and run metadata.
+"""
+
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def latency_summary(latencies, elapsed):
+    """
+    Summarize per-request latencies.
+
+    Args:
+        latencies (list): Latency of each request in seconds
+        elapsed (float): Wall time of the whole run in seconds
+
+    Returns:
+        dict: Throughput and p50/p95/p99/max latency in milliseconds
+    """
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies_ms),
+        "requests_per_second": round(len(latencies_ms) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+    }
+
+
+def read_memory_mb(pid="self"):
+    """
+    Read the current and peak resident memory of a process.
+
+    Args:
+        pid (int): Process to read, defaults to this one
+
+    Returns:
+        dict: rss_mb and peak_rss_mb, empty where /proc is not available
+    """
+    fields = {"VmRSS": "rss_mb", "VmHWM": "peak_rss_mb"}
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    memory[fields[key]] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+
+def run_metadata():
+    """
+    Describe the code and machine a benchmark ran on, so reports can be compared across commits.
+
+    Returns:
+        dict: Commit, Python and numpy versions, CPU count and timestamp
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+            .stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
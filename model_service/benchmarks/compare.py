@@ -0,0 +1,82 @@
+"""
+Compare two bench_service reports, for example from two commits.
+
+Prints every latency, throughput and memory figure found in both reports with
+its relative change, and flags changes beyond the threshold as regressions or
+improvements. Latency changes smaller than --min-delta-ms are never flagged, so
+sub-millisecond stages don't drown the report in timer noise.
+
+Run from the model_service directory:
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+
+import argparse
+import json
+
+# Figures where a higher value is better; for all others lower is better
+HIGHER_IS_BETTER = ("requests_per_second",)
+COMPARED_SUFFIXES = ("_ms", "_mb", "requests_per_second")
+
+
+def flatten(report, prefix=""):
+    """Flatten a nested report into {"functions.library_100.p95_ms": value} for compared figures."""
+    figures = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            figures.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and key.endswith(COMPARED_SUFFIXES):
+            figures[path] = value
+    return figures
+
+
+def compare(baseline, candidate, threshold, min_delta_ms=0.0):
+    """
+    Compare the figures two reports have in common.
+
+    Args:
+        baseline (dict): Report of the reference run
+        candidate (dict): Report of the run being checked
+        threshold (float): Relative change in percent beyond which a figure is flagged
+        min_delta_ms (float): Smallest absolute change of a latency figure that is flagged
+
+    Returns:
+        list: (figure, baseline value, candidate value, change in percent, flag) tuples
+    """
+    old, new = flatten(baseline), flatten(candidate)
+    rows = []
+    for figure in sorted(old.keys() & new.keys()):
+        if figure.startswith("meta."):
+            continue
+        change = (new[figure] - old[figure]) / old[figure] * 100 if old[figure] else 0.0
+        worse = -change if figure.endswith(HIGHER_IS_BETTER) else change
+        flag = "regression" if worse > threshold else "improvement" if worse < -threshold else ""
+        if figure.endswith("_ms") and abs(new[figure] - old[figure]) < min_delta_ms:
+            flag = ""
+        rows.append((figure, old[figure], new[figure], round(change, 1), flag))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Flag changes beyond this many percent")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="Ignore smaller latency changes")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['meta'].get('commit')} -> candidate {candidate['meta'].get('commit')}")
+    rows = compare(baseline, candidate, args.threshold, args.min_delta_ms)
+    width = max((len(row[0]) for row in rows), default=0)
+    for figure, old, new, change, flag in rows:
+        print(f"{figure:<{width}}  {old:>12}  {new:>12}  {change:>+8.1f}%  {flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Synthetic catalogs and libraries for benchmarks.
+
+Builds a model registry with the same bundle layout train.py writes, for any
+catalog size: game texts are drawn from per-genre vocabularies, a TF-IDF +
+RandomForest pipeline is fitted on a sample, and its genre probabilities are
+precomputed for the whole catalog. The same size and seed always give the same
+catalog, and an existing matching registry is reused.
+
+Run from the model_service directory:
+
+    python -m benchmarks.synthetic --games 100000 --model-dir /tmp/gyg-bench-100000
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from artifacts import ModelBundle, publish_version, resolve_bundle_dir, version_dir, write_bundle
+from genre_filter import build_genre_bitmaps, split_genres
+from lookup import CatalogLookup
+from vector_store import compact_arrays
+
+logger = logging.getLogger(__name__)
+
+GENRES = [
+    "Action", "Adventure", "Casual", "Indie", "Massively Multiplayer", "Racing",
+    "RPG", "Simulation", "Sports", "Strategy", "Early Access", "Free to Play",
+]
+COMMON_WORDS = "game play world new friends explore unique story mode online levels".split()
+GENRE_WORDS_PER_GENRE = 12
+
+
+def genre_vocabularies(rng):
+    """Give every genre its own small vocabulary so the classifier has something to learn."""
+    return {
+        genre: [f"{genre.split()[0].lower()}{i}" for i in rng.permutation(50)[:GENRE_WORDS_PER_GENRE]]
+        for genre in GENRES
+    }
+
+
+def make_catalog(n_games, seed=0):
+    """
+    Generate a catalog with the columns train.py reads.
+
+    Args:
+        n_games (int): Number of games
+        seed (int): Random seed
+
+    Returns:
+        pandas.DataFrame: AppID, name, short_description, header_image and primary_genre per game
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    vocabularies = genre_vocabularies(rng)
+
+    # Skewed genre popularity, like the real catalog
+    popularity = rng.dirichlet(np.full(len(GENRES), 2.0))
+    primary = rng.choice(len(GENRES), size=n_games, p=popularity)
+    secondary = rng.choice(len(GENRES), size=n_games, p=popularity)
+
+    descriptions = []
+    for first, second in zip(primary, secondary):
+        words = (
+            list(rng.choice(vocabularies[GENRES[first]], size=5))
+            + list(rng.choice(vocabularies[GENRES[second]], size=2))
+            + list(rng.choice(COMMON_WORDS, size=3))
+        )
+        descriptions.append(" ".join(words))
+
+    appids = np.sort(rng.choice(n_games * 10, size=n_games, replace=False)) + 10
+    return pd.DataFrame(
+        {
+            "AppID": appids,
+            "name": [f"Synthetic Game {appid}" for appid in appids],
+            "short_description": descriptions,
+            "header_image": [f"https://cdn.example.com/apps/{appid}/header.jpg" for appid in appids],
+            "primary_genre": [GENRES[i] for i in primary],
+        }
+    )
+
+
+def build_model_dir(model_dir, n_games, seed=0, train_sample=5000, n_estimators=50):
+    """
+    Build a model registry holding one synthetic version, unless a matching one exists.
+
+    Args:
+        model_dir (str): Directory for the registry
+        n_games (int): Number of catalog games
+        seed (int): Random seed
+        train_sample (int): Games the classifier is fitted on
+        n_estimators (int): Trees in the RandomForest
+
+    Returns:
+        dict: Catalog description: version, games, genres and build time
+    """
+    params = {"n_games": n_games, "seed": seed, "train_sample": train_sample, "n_estimators": n_estimators}
+    version, bundle_dir = resolve_bundle_dir(model_dir)
+    if version is not None:
+        manifest = ModelBundle(bundle_dir).manifest
+        if manifest.get("synthetic") == params:
+            logger.info(f"Reusing synthetic catalog {model_dir} version {version}")
+            return {"version": version, "games": n_games, "genres": len(manifest["genre_classes"])}
+
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import LabelEncoder
+
+    start = time.perf_counter()
+    df = make_catalog(n_games, seed)
+
+    tfidf = TfidfVectorizer(stop_words="english", max_features=1000)
+    tfidf_matrix = tfidf.fit_transform(df["short_description"])
+    label_encoder = LabelEncoder()
+    genre_labels = label_encoder.fit_transform(df["primary_genre"])
+
+    sample = np.random.default_rng(seed).permutation(n_games)[:train_sample]
+    rf_model = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=20, min_samples_split=5, min_samples_leaf=2, random_state=seed, n_jobs=-1
+    )
+    rf_model.fit(tfidf_matrix[sample], genre_labels[sample])
+    catalog_probs = rf_model.predict_proba(tfidf_matrix).astype(np.float32)
+
+    appids = df["AppID"].to_numpy(dtype=np.int64)
+    catalog_lookup = CatalogLookup.build(df["name"], appids)
+    genre_names, genre_bitmaps = build_genre_bitmaps(split_genres(df["primary_genre"]))
+
+    version = f"synthetic-{n_games}-{seed}"
+    write_bundle(
+        version_dir(model_dir, version),
+        arrays={
+            "catalog_probs": catalog_probs,
+            **compact_arrays(catalog_probs),
+            "appids": appids,
+            **catalog_lookup.to_arrays(),
+            "genre_bitmaps": genre_bitmaps,
+        },
+        columns={column: df[column] for column in ["name", "short_description", "header_image", "primary_genre"]},
+        models={"tfidf": tfidf, "model": rf_model, "label_encoder": label_encoder},
+        metadata={
+            "version": version,
+            "n_games": n_games,
+            "genre_classes": label_encoder.classes_.tolist(),
+            "genre_names": genre_names,
+            "synthetic": params,
+        },
+    )
+    publish_version(model_dir, version)
+
+    build_seconds = round(time.perf_counter() - start, 2)
+    logger.info(f"Built synthetic catalog with {n_games} games in {build_seconds} seconds")
+    return {"version": version, "games": n_games, "genres": len(GENRES), "build_seconds": build_seconds}
+
+
+def make_libraries(names, appids, library_size, n_libraries, seed=0, by_name=0.5):
+    """
+    Draw user libraries from a catalog.
+
+    Args:
+        names (Sequence): Catalog game names
+        appids (numpy.ndarray): Catalog AppIDs
+        library_size (int): Games per library, capped at the catalog size
+        n_libraries (int): Number of libraries
+        seed (int): Random seed
+        by_name (float): Share of each library sent as names rather than AppIDs
+
+    Returns:
+        list: (game_names, appids) tuples of lists, ready for a GameRequest
+    """
+    rng = np.random.default_rng([seed, library_size])
+    size = min(library_size, len(appids))
+    n_names = int(round(size * by_name))
+
+    libraries = []
+    for _ in range(n_libraries):
+        rows = rng.choice(len(appids), size=size, replace=False)
+        libraries.append(([names[row] for row in rows[:n_names]], appids[rows[n_names:]].tolist()))
+    return libraries
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--model-dir", default=None, help="Defaults to /tmp/gyg-bench-<games>")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--train-sample", type=int, default=5000)
+    args = parser.parse_args()
+
+    model_dir = args.model_dir or f"/tmp/gyg-bench-{args.games}"
+    os.makedirs(model_dir, exist_ok=True)
+    print(json.dumps(build_model_dir(model_dir, args.games, args.seed, args.train_sample), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Reading the raw games dataset within a memory budget.
+
+The full dump carries columns training never uses (detailed descriptions, prices,
+...) and review text that is only needed for the sentiment pass. read_dataset loads
+just DATASET_DTYPES. spill_dataset streams the CSV in chunks sized from a memory
+budget, prepares each chunk and writes it to disk:
+
+    <spill_dir>/rows-00000.joblib   small per-game columns kept for the bundle
+    <spill_dir>/text-00000.joblib   combined text the TF-IDF is fitted on
+    <spill_dir>/done.json           written last, marks a complete spill
+
+so the raw text of the whole dataset is never held at once.
+"""
+
+import json
+import logging
+import os
+import shutil
+
+import joblib
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns read from the dataset, everything else is skipped while parsing
+DATASET_DTYPES = {
+    "AppID": "int32",
+    "name": "str",
+    "short_description": "str",
+    "header_image": "str",
+    "categories": "str",
+    "genres": "str",
+    "tags": "str",
+    "reviews": "str",
+    "estimated_owners": "category",
+}
+# Rows parsed to estimate the in-memory size of a row
+SAMPLE_ROWS = 1000
+# Peak memory of preparing a chunk relative to its parsed size: the combined text,
+# the sentiment workers' copies of the reviews and pandas temporaries
+PREPARE_MEMORY_FACTOR = 4
+MIN_CHUNK_ROWS = 100
+
+
+def read_dataset(path, columns=None, **kwargs):
+    """
+    Read the dataset columns used by training and ingestion with compact dtypes.
+
+    Args:
+        path (str): CSV in the games_may2024_full.csv format
+        columns (list): Columns to read, defaults to all of DATASET_DTYPES
+        **kwargs: Passed on to pandas.read_csv, e.g. chunksize
+
+    Returns:
+        pandas.DataFrame: The rows, or an iterator of chunks when chunksize is given
+    """
+    columns = list(DATASET_DTYPES) if columns is None else columns
+    return pd.read_csv(path, usecols=columns, dtype={name: DATASET_DTYPES[name] for name in columns}, **kwargs)
+
+
+def rows_per_chunk(path, budget_bytes):
+    """
+    Rows per chunk that keep reading and preparing a chunk within a memory budget.
+
+    Args:
+        path (str): Dataset CSV
+        budget_bytes (int): Memory allowed for one chunk
+
+    Returns:
+        int: Rows per chunk, at least MIN_CHUNK_ROWS
+    """
+    # The parser buffers the raw text of every column, including the skipped ones
+    raw = pd.read_csv(path, nrows=SAMPLE_ROWS)
+    parsed = read_dataset(path, nrows=SAMPLE_ROWS)
+    n_rows = max(len(parsed), 1)
+    row_bytes = (
+        raw.memory_usage(deep=True).sum() + parsed.memory_usage(deep=True).sum() * PREPARE_MEMORY_FACTOR
+    ) / n_rows
+    return max(int(budget_bytes / max(row_bytes, 1)), MIN_CHUNK_ROWS)
+
+
+class SpilledDataset:
+    """A prepared dataset written to disk in chunks by spill_dataset."""
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): Spill directory holding a complete spill
+        """
+        self.directory = directory
+        with open(os.path.join(directory, "done.json")) as f:
+            info = json.load(f)
+        self.n_chunks = info["n_chunks"]
+        self.n_rows = info["n_rows"]
+        self.offsets = [0]
+        for size in info["chunk_sizes"]:
+            self.offsets.append(self.offsets[-1] + size)
+
+    def _path(self, kind, i):
+        return os.path.join(self.directory, f"{kind}-{i:05d}.joblib")
+
+    def frame(self):
+        """
+        Returns:
+            pandas.DataFrame: The small per-game columns of all chunks, indexed from 0
+        """
+        return pd.concat([joblib.load(self._path("rows", i)) for i in range(self.n_chunks)], ignore_index=True)
+
+    def text_chunks(self, order=None):
+        """
+        Stream the combined text chunk by chunk.
+
+        Args:
+            order (iterable): Chunk numbers to read, defaults to all of them in row order
+
+        Yields:
+            tuple: (rows, texts) with the slice of rows a chunk covers and its texts
+        """
+        for i in range(self.n_chunks) if order is None else order:
+            yield slice(self.offsets[i], self.offsets[i + 1]), joblib.load(self._path("text", i))
+
+    def texts(self):
+        """
+        Stream the combined text, one chunk in memory at a time.
+
+        Yields:
+            str: Text of each game, in row order
+        """
+        for _, texts in self.text_chunks():
+            yield from texts
+
+
+def spill_dataset(path, directory, chunk_rows, prepare):
+    """
+    Prepare the dataset chunk by chunk and write the chunks to a spill directory.
+    A complete spill already in the directory is reused.
+
+    Args:
+        path (str): Dataset CSV
+        directory (str): Spill directory
+        chunk_rows (int): Rows per chunk
+        prepare (callable): Takes a raw chunk and returns (rows, texts) with the
+            columns to keep as a DataFrame and the combined text as a list or Series
+
+    Returns:
+        SpilledDataset: The spilled dataset
+    """
+    if os.path.exists(os.path.join(directory, "done.json")):
+        logger.info(f"Reusing the spilled dataset in {directory}")
+        return SpilledDataset(directory)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    chunk_sizes = []
+    for chunk in read_dataset(path, chunksize=chunk_rows):
+        rows, texts = prepare(chunk)
+        joblib.dump(rows.reset_index(drop=True), os.path.join(directory, f"rows-{len(chunk_sizes):05d}.joblib"))
+        joblib.dump(list(texts), os.path.join(directory, f"text-{len(chunk_sizes):05d}.joblib"))
+        chunk_sizes.append(len(chunk))
+        logger.info(f"Spilled chunk {len(chunk_sizes)} ({sum(chunk_sizes)} rows so far)")
+
+    with open(os.path.join(directory, "done.json"), "w") as f:
+        json.dump({"n_chunks": len(chunk_sizes), "n_rows": sum(chunk_sizes), "chunk_sizes": chunk_sizes}, f)
+    return SpilledDataset(directory)
@@ -0,0 +1,132 @@
+"""
+Per-genre bitmaps over catalog rows for filtered recommendations.
+
+train.py stores one packed bit row per genre (genre_bitmaps, uint8 of shape
+(n_genres, ceil(n_games / 8))) and the genre names in the manifest. A filter is
+combined on the packed bytes and unpacked once into a boolean mask that joins
+the owned/recent exclusion mask before the top-k.
+"""
+
+import hashlib
+
+import numpy as np
+
+
+def split_genres(values):
+    """
+    Parse comma-separated genre strings as found in the dataset's genres column.
+
+    Args:
+        values (iterable): Genre strings, missing values count as no genres
+
+    Returns:
+        list: List of genre names per value
+    """
+    return [
+        [genre.strip() for genre in value.split(",") if genre.strip()] if isinstance(value, str) else []
+        for value in values
+    ]
+
+
+def build_genre_bitmaps(genre_lists, names=None):
+    """
+    Build the packed membership bitmap of every genre.
+
+    Args:
+        genre_lists (list): Genres of each catalog game, as lists of names
+        names (list): Genres to build bitmaps for, defaults to every genre in genre_lists;
+            other genres are ignored
+
+    Returns:
+        tuple: (names, bitmaps) with the genre names and a uint8 array of
+            shape (len(names), ceil(n_games / 8))
+    """
+    if names is None:
+        names = sorted({genre for genres in genre_lists for genre in genres})
+    index = {name: i for i, name in enumerate(names)}
+    members = np.zeros((len(names), len(genre_lists)), dtype=bool)
+    for row, genres in enumerate(genre_lists):
+        members[[index[genre] for genre in genres if genre in index], row] = True
+    return names, np.packbits(members, axis=1)
+
+
+def filters_digest(genres, exclude_genres):
+    """
+    Stable digest of a genre filter, empty when there is none.
+
+    Args:
+        genres (list): Genres the recommendations must have one of
+        exclude_genres (list): Genres the recommendations must not have
+
+    Returns:
+        str: Hex digest
+    """
+    if not genres and not exclude_genres:
+        return ""
+    key = "|".join(",".join(sorted({genre.lower() for genre in names})) for names in (genres, exclude_genres))
+    return hashlib.md5(key.encode("utf-8")).hexdigest()[:16]
+
+
+class GenreFilter:
+    """Turns genre filters of a request into an exclusion mask over catalog rows."""
+
+    def __init__(self, names, bitmaps, n_games):
+        """
+        Args:
+            names (list): Genre name of each bitmap row
+            bitmaps (numpy.ndarray): Packed membership bits of shape (len(names), ceil(n_games / 8))
+            n_games (int): Number of catalog rows
+        """
+        self.names = list(names)
+        self.bitmaps = bitmaps
+        self.n_games = n_games
+        self._index = {name.lower(): i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def concatenate(cls, filters):
+        """
+        Join the filters of catalog parts that follow each other, such as a bundle and
+        its appended segments. The bitmaps are repacked, they are small.
+
+        Args:
+            filters (list): Filters over the same genre names, in catalog order
+
+        Returns:
+            GenreFilter: Filter over all parts
+        """
+        bits = np.hstack([np.unpackbits(f.bitmaps, axis=1, count=f.n_games) for f in filters])
+        return cls(filters[0].names, np.packbits(bits, axis=1), bits.shape[1])
+
+    def unknown(self, genres):
+        """
+        Args:
+            genres (list): Genre names, matched case-insensitively
+
+        Returns:
+            list: The names that are not catalog genres
+        """
+        return [genre for genre in genres if genre.lower() not in self._index]
+
+    def _union(self, genres):
+        return np.bitwise_or.reduce(self.bitmaps[[self._index[genre.lower()] for genre in genres]], axis=0)
+
+    def exclusion_mask(self, genres=(), exclude_genres=()):
+        """
+        Mark the catalog rows a genre filter rules out.
+
+        Args:
+            genres (list): Genres the recommendations must have one of, empty for any
+            exclude_genres (list): Genres the recommendations must not have
+
+        Returns:
+            numpy.ndarray: Boolean mask over catalog rows, True for filtered out games,
+                or None when the filter is empty
+        """
+        if not genres and not exclude_genres:
+            return None
+        packed = np.zeros(self.bitmaps.shape[1], dtype=np.uint8)
+        if genres:
+            packed |= ~self._union(genres)
+        if exclude_genres:
+            packed |= self._union(exclude_genres)
+        return np.unpackbits(packed, count=self.n_games).view(bool)
@@ -0,0 +1,169 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+import time
+
+MAX_RECENT_GAMES = 20
+RECOMMENDATION_COOLDOWN = 3 * 24 * 60 * 60
+
+
+def games_digest(game_names, appids=()):
+    """
+    Build a digest of a game list that is identical across workers and restarts,
+    unlike Python's salted hash().
+
+    Args:
+        game_names (iterable): Game names in any order
+        appids (iterable): Steam AppIDs in any order
+
+    Returns:
+        str: Hex digest of the sorted game list
+    """
+    game_list = sorted(game_names) + [str(appid) for appid in sorted(appids)]
+    return hashlib.blake2b("\n".join(game_list).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class HistoryStore(ABC):
+    """
+    Keeps the games recently recommended to each user so they can be skipped
+    until their cooldown expires.
+    """
+
+    def __init__(self, max_recent_games=MAX_RECENT_GAMES, cooldown=RECOMMENDATION_COOLDOWN):
+        self.max_recent_games = max_recent_games
+        self.cooldown = cooldown
+
+    @abstractmethod
+    def get_recent(self, user_hash):
+        """
+        Get the games recommended to a user within the cooldown period.
+
+        Args:
+            user_hash (str): Key identifying the user
+
+        Returns:
+            set: Steam AppIDs recently recommended to the user
+        """
+
+    @abstractmethod
+    def add(self, user_hash, appids):
+        """
+        Record newly recommended games, keeping only the most recent ones.
+
+        Args:
+            user_hash (str): Key identifying the user
+            appids (list): Steam AppIDs that were just recommended
+        """
+
+
+class InMemoryHistoryStore(HistoryStore):
+    """
+    Process-local history store with per-entry expiry and LRU eviction of users.
+
+    Expired entries are dropped when a user is read, so no request scans other users.
+    """
+
+    def __init__(self, max_users=100_000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_recent(self, user_hash):
+        cutoff = time.time() - self.cooldown
+        with self._lock:
+            user_recent = self._users.get(user_hash)
+            if user_recent is None:
+                return set()
+
+            for appid in [appid for appid, timestamp in user_recent.items() if timestamp < cutoff]:
+                del user_recent[appid]
+            if not user_recent:
+                del self._users[user_hash]
+                return set()
+
+            self._users.move_to_end(user_hash)
+            return set(user_recent)
+
+    def add(self, user_hash, appids):
+        current_time = time.time()
+        with self._lock:
+            user_recent = self._users.setdefault(user_hash, {})
+            for appid in appids:
+                user_recent.pop(appid, None)
+                user_recent[appid] = current_time
+
+            # Dicts keep insertion order, so the oldest recommendations come first
+            while len(user_recent) > self.max_recent_games:
+                del user_recent[next(iter(user_recent))]
+
+            self._users.move_to_end(user_hash)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+
+class RedisHistoryStore(HistoryStore):
+    """
+    History store shared by all workers, one sorted set of AppIDs scored by
+    timestamp per user. Keys expire natively once a user's cooldown has passed.
+    """
+
+    def __init__(self, url=None, client=None, key_prefix="gyg:recent:", **kwargs):
+        """
+        Connect to Redis.
+
+        Args:
+            url (str): Redis URL, used when no client is given
+            client: Existing Redis-compatible client, e.g. fakeredis.FakeRedis in tests
+            key_prefix (str): Prefix of the per-user keys
+        """
+        super().__init__(**kwargs)
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.key_prefix = key_prefix
+
+    def _key(self, user_hash):
+        return f"{self.key_prefix}{user_hash}"
+
+    def get_recent(self, user_hash):
+        key = self._key(user_hash)
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(key, "-inf", time.time() - self.cooldown)
+        pipe.zrange(key, 0, -1)
+        _, members = pipe.execute()
+        return {int(member) for member in members}
+
+    def add(self, user_hash, appids):
+        if not appids:
+            return
+
+        key = self._key(user_hash)
+        current_time = time.time()
+        pipe = self.client.pipeline()
+        pipe.zadd(key, {str(appid): current_time for appid in appids})
+        pipe.zremrangebyrank(key, 0, -(self.max_recent_games + 1))
+        pipe.expire(key, int(self.cooldown))
+        pipe.execute()
+
+
+def create_history_store():
+    """
+    Create the history store selected by the HISTORY_BACKEND environment variable.
+
+    "memory" (the default) keeps history per process; "redis" shares it between
+    workers through REDIS_URL.
+
+    Returns:
+        HistoryStore: The configured store
+    """
+    backend = os.getenv("HISTORY_BACKEND", "memory")
+    if backend == "redis":
+        return RedisHistoryStore(url=os.getenv("REDIS_URL", "redis://localhost:6379/2"))
+    if backend == "memory":
+        return InMemoryHistoryStore()
+    raise ValueError(f"Unknown HISTORY_BACKEND: {backend}")
@@ -0,0 +1,130 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import threading
+import time
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue has no room for another request."""
+
+
+def _timed_call(fn, args, submitted_at):
+    """Run fn in the pool and report when it started, to measure queue wait."""
+    started_at = time.time()
+    return fn(*args), started_at
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound inference off the event loop on a thread or process pool,
+    with a bounded number of waiting requests.
+    """
+
+    def __init__(self, kind="thread", workers=None, queue_size=32):
+        """
+        Start the pool.
+
+        Args:
+            kind (str): "thread" or "process"
+            workers (int): Pool size, defaults to the number of CPUs
+            queue_size (int): Requests allowed to wait for a free worker before new ones are rejected
+        """
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        if kind == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        elif kind == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            raise ValueError(f"Unknown inference executor kind: {kind}")
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) in the pool and wait for its result.
+
+        Args:
+            fn (callable): Module-level function, so it can be sent to a process pool
+            *args: Arguments for fn
+
+        Returns:
+            object: The return value of fn
+
+        Raises:
+            InferenceQueueFull: If all workers are busy and the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise InferenceQueueFull()
+            self._pending += 1
+
+        submitted_at = time.time()
+        try:
+            job = self._pool.submit(_timed_call, fn, args, submitted_at)
+        except Exception:
+            self._release()
+            raise
+        # The slot is freed when the pool job ends, not when the caller stops waiting:
+        # a cancelled request leaves its job queued or running until the pool is done with it
+        job.add_done_callback(self._release)
+        result, started_at = await asyncio.wrap_future(job)
+
+        wait = max(started_at - submitted_at, 0.0)
+        with self._lock:
+            self._completed += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        return result
+
+    def _release(self, job=None):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self):
+        """
+        Report the current load and queue wait times.
+
+        Returns:
+            dict: Pool size, queue depth, completed and rejected counts, and wait times in milliseconds
+        """
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "pending": self._pending,
+                "queue_depth": max(self._pending - self.workers, 0),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / self._completed * 1000, 3) if self._completed else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+    def shutdown(self):
+        """Stop the pool, letting running requests finish."""
+        self._pool.shutdown(wait=True)
+
+
+def create_inference_executor():
+    """
+    Create the executor configured by INFERENCE_EXECUTOR, INFERENCE_WORKERS and INFERENCE_QUEUE_SIZE.
+
+    Returns:
+        InferenceExecutor: The configured executor
+    """
+    workers = os.getenv("INFERENCE_WORKERS")
+    return InferenceExecutor(
+        kind=os.getenv("INFERENCE_EXECUTOR", "thread"),
+        workers=int(workers) if workers else None,
+        queue_size=int(os.getenv("INFERENCE_QUEUE_SIZE", "32")),
+    )
@@ -0,0 +1,184 @@
+"""
+Append new or changed games to a model version without retraining.
+
+Rows are transformed with the version's fitted TF-IDF, scored with its genre model
+and written as a new segment of its bundle (see artifacts.py), with their lookup
+indexes, genre bitmaps and nearest neighbours. Rows that match the catalog exactly
+are skipped, and a row whose AppID is already in the catalog replaces the earlier
+row. Running services pick the segment up through their registry watcher or
+POST /admin/reload and only load the new rows.
+
+The games stay in the segment until the next run of train.py, which trains on them
+if they are part of its dataset.
+
+    python ingest.py new_games.csv
+    python ingest.py new_games.csv --model-dir ./model --version 20240501-120000-3f9a2c
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+
+from artifacts import next_segment_dir, resolve_bundle_dir, version_dir, write_bundle
+from dataset import read_dataset
+from genre_filter import build_genre_bitmaps, split_genres
+from lookup import CatalogLookup
+from model_state import ModelState
+from models import predict_genre_proba
+from neighbors import search_neighbors
+from preprocessing import combine_features, primary_genres
+from vector_store import compact_arrays
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["name", "short_description", "header_image", "primary_genre"]
+# Dataset columns the text features are built from; reviews are not needed without a refit
+SOURCE_COLUMNS = ["AppID", "name", "short_description", "header_image", "categories", "genres", "tags"]
+
+
+def prepare_rows(df):
+    """
+    Build the text features and primary genre of dataset rows the way train.py does.
+
+    Args:
+        df (pandas.DataFrame): Rows in the games_may2024_full.csv format
+
+    Returns:
+        pandas.DataFrame: The rows with combined_features and primary_genre added
+    """
+    return df.assign(combined_features=combine_features(df), primary_genre=primary_genres(df["genres"]))
+
+
+def unchanged_rows(state, df, probs):
+    """
+    Mark the rows that are already in the catalog with the same vector and details.
+
+    Args:
+        state (ModelState): The version being extended, with its segments
+        df (pandas.DataFrame): Prepared rows
+        probs (numpy.ndarray): Genre probabilities of the rows
+
+    Returns:
+        numpy.ndarray: Boolean mask over the rows
+    """
+    appids = df["AppID"].to_numpy(dtype=np.int64)
+    live = np.flatnonzero(~state.retired) if state.retired is not None else np.arange(len(state.catalog_appids))
+    order = live[np.argsort(state.catalog_appids[live], kind="stable")]
+    positions = np.minimum(np.searchsorted(state.catalog_appids[order], appids), len(order) - 1)
+    rows = order[positions]
+    unchanged = state.catalog_appids[rows] == appids
+    unchanged[unchanged] = np.all(state.catalog.rows(rows[unchanged]) == probs[unchanged], axis=1)
+    for i in np.flatnonzero(unchanged):
+        row, values = rows[i], df.iloc[i]
+        # Missing values are stored as empty strings
+        unchanged[i] = all(
+            column[row] == (values[name] if isinstance(values[name], str) else "")
+            for name, column in [
+                ("name", state.catalog_names),
+                ("short_description", state.catalog_descriptions),
+                ("header_image", state.catalog_images),
+            ]
+        )
+    return unchanged
+
+
+def ingest(model_dir, csv_path, version=None, n_jobs=None):
+    """
+    Score new or changed games with a version's models and append them as a segment.
+
+    Args:
+        model_dir (str): Model directory holding the registry
+        csv_path (str): CSV with the new or changed rows
+        version (str): Version to extend, defaults to the current one
+        n_jobs (int): Threads for the neighbour search, defaults to the CPU count
+
+    Returns:
+        tuple: (segment_dir, n_rows) with the written segment, or None if every row was unchanged
+    """
+    if version is None:
+        version, bundle_dir = resolve_bundle_dir(model_dir)
+        if version is None:
+            raise ValueError(f"No model version in {model_dir}, run train.py first")
+    else:
+        bundle_dir = version_dir(model_dir, version)
+    state = ModelState(bundle_dir, version)
+    logger.info(f"Extending model version {state.version} with {len(state.catalog_appids)} games")
+
+    df = read_dataset(csv_path, SOURCE_COLUMNS).drop_duplicates("AppID", keep="last").reset_index(drop=True)
+    df = prepare_rows(df)
+
+    start_time = time.time()
+    tfidf = state.bundle.model("tfidf")
+    model = state.bundle.model("model")
+    probs = predict_genre_proba(model, tfidf.transform(df["combined_features"]), len(state.genre_classes))
+    logger.info(f"Scored {len(df)} rows in {time.time() - start_time:.2f} seconds")
+
+    unchanged = unchanged_rows(state, df, probs)
+    df, probs = df[~unchanged].reset_index(drop=True), probs[~unchanged]
+    if not len(df):
+        logger.info("Every row is already in the catalog, nothing to ingest")
+        return None
+    logger.info(f"Appending {len(df)} new or changed games, skipped {int(unchanged.sum())} unchanged")
+
+    appids = df["AppID"].to_numpy(dtype=np.int64)
+    arrays = {
+        "catalog_probs": probs,
+        **compact_arrays(probs),
+        "appids": appids,
+        **CatalogLookup.build(df["name"].astype(str), appids).to_arrays(),
+    }
+    if state.genre_filter is not None:
+        arrays["genre_bitmaps"] = build_genre_bitmaps(split_genres(df["genres"]), state.genre_filter.names)[1]
+
+    if state.neighbor_parts:
+        start_time = time.time()
+        n_neighbors = state.neighbor_parts[0][1].shape[1]
+        first_row = len(state.catalog_appids)
+        vectors = np.vstack([state.catalog.rows(np.arange(first_row)), probs])
+        # Neither the rows replaced by this segment nor earlier replaced rows can be neighbours
+        exclude_mask = np.zeros(len(vectors), dtype=bool)
+        if state.retired is not None:
+            exclude_mask[:first_row] = state.retired
+        exclude_mask[state.catalog_lookup.rows_for_appids(appids)] = True
+        arrays.update(
+            search_neighbors(vectors, np.arange(first_row, len(vectors)), n_neighbors, n_jobs, exclude_mask)
+        )
+        logger.info(f"Found neighbours of the new games in {time.time() - start_time:.2f} seconds")
+
+    segment_dir = next_segment_dir(bundle_dir)
+    write_bundle(
+        segment_dir,
+        arrays=arrays,
+        columns={column: df[column] for column in COLUMNS},
+        models={},
+        metadata={
+            "version": version,
+            "n_games": len(df),
+            "genre_classes": state.genre_classes,
+            "source": os.path.basename(csv_path),
+        },
+    )
+    logger.info(f"Wrote segment {segment_dir}")
+    return segment_dir, len(df)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", help="New or changed rows in the games_may2024_full.csv format")
+    parser.add_argument("--model-dir", default="./model")
+    parser.add_argument("--version", help="Version to extend, defaults to the current one")
+    parser.add_argument("--n-jobs", type=int, help="Threads for the neighbour search")
+    args = parser.parse_args()
+
+    result = ingest(args.model_dir, args.csv, args.version, args.n_jobs)
+    if result is None:
+        print("Nothing to ingest, every row is already in the catalog.")
+    else:
+        print(f"Appended {result[1]} games as {result[0]}.")
@@ -0,0 +1,166 @@
+import hashlib
+
+import numpy as np
+
+
+def normalize_name(name):
+    """
+    Normalize a game name for lookups: case-insensitive and whitespace-collapsed.
+
+    Args:
+        name (str): Game name as sent by the client or stored in the catalog
+
+    Returns:
+        str: Normalized name
+    """
+    key = str(name).strip().casefold()
+    return " ".join(key.split()) if "  " in key else key
+
+
+def name_hashes(names):
+    """
+    Hash normalized game names to 64-bit integers.
+
+    Args:
+        names (iterable): Game names
+
+    Returns:
+        numpy.ndarray: uint64 hash of each name
+    """
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(normalize_name(name).encode("utf-8"), digest_size=8).digest(), "little")
+            for name in names
+        ),
+        dtype=np.uint64,
+    )
+
+
+def _rows_for_keys(sorted_keys, order, keys):
+    """Find the rows whose key is in keys, given the keys sorted with their row order."""
+    # Sorted queries keep the binary searches cache-friendly
+    keys = np.sort(keys)
+    if not len(keys) or not len(sorted_keys):
+        return np.empty(0, dtype=np.int64)
+
+    left = np.searchsorted(sorted_keys, keys, side="left")
+    right = np.searchsorted(sorted_keys, keys, side="right")
+    found = right > left
+    if np.all(right[found] - left[found] == 1):
+        return np.unique(order[left[found]])
+
+    rows = [order[start:end] for start, end in zip(left[found], right[found])]
+    return np.unique(np.concatenate(rows))
+
+
+class CatalogLookup:
+    """
+    Resolves game names and Steam AppIDs to catalog row numbers without scanning the catalog.
+
+    Both indexes are sorted key arrays with the matching row order, so they can be
+    saved with the model artifacts and memory-mapped instead of rebuilt per worker.
+    """
+
+    def __init__(self, sorted_name_hashes, name_order, sorted_appids, appid_order):
+        """
+        Wrap prebuilt index arrays, see CatalogLookup.build.
+
+        Args:
+            sorted_name_hashes (numpy.ndarray): Sorted uint64 hashes of the normalized names
+            name_order (numpy.ndarray): Catalog row of each entry in sorted_name_hashes
+            sorted_appids (numpy.ndarray): Sorted Steam AppIDs
+            appid_order (numpy.ndarray): Catalog row of each entry in sorted_appids
+        """
+        self.sorted_name_hashes = sorted_name_hashes
+        self.name_order = name_order
+        self.sorted_appids = sorted_appids
+        self.appid_order = appid_order
+
+    @classmethod
+    def build(cls, names, appids):
+        """
+        Build the name and AppID indexes for a catalog.
+
+        Args:
+            names (iterable): Game name for each catalog row
+            appids (numpy.ndarray): Steam AppID for each catalog row
+
+        Returns:
+            CatalogLookup: Lookup over the catalog
+        """
+        hashes = name_hashes(names)
+        name_order = np.argsort(hashes, kind="stable")
+        appids = np.asarray(appids, dtype=np.int64)
+        appid_order = np.argsort(appids, kind="stable")
+        return cls(hashes[name_order], name_order, appids[appid_order], appid_order)
+
+    def to_arrays(self):
+        """
+        Export the index arrays so they can be saved with the model artifacts.
+
+        Returns:
+            dict: Arrays keyed by the argument names of CatalogLookup
+        """
+        return {
+            "sorted_name_hashes": self.sorted_name_hashes,
+            "name_order": self.name_order,
+            "sorted_appids": self.sorted_appids,
+            "appid_order": self.appid_order,
+        }
+
+    def rows_for_names(self, names):
+        """
+        Find the catalog rows of the given game names, including duplicate catalog entries.
+
+        Args:
+            names (iterable): Game names, unknown names are ignored
+
+        Returns:
+            numpy.ndarray: Sorted unique row numbers
+        """
+        return _rows_for_keys(self.sorted_name_hashes, self.name_order, name_hashes(names))
+
+    def rows_for_appids(self, appids):
+        """
+        Find the catalog rows of the given Steam AppIDs.
+
+        Args:
+            appids (iterable): Steam AppIDs, unknown AppIDs are ignored
+
+        Returns:
+            numpy.ndarray: Sorted unique row numbers
+        """
+        return _rows_for_keys(self.sorted_appids, self.appid_order, np.fromiter(appids, dtype=np.int64))
+
+
+class ConcatenatedLookup:
+    """
+    Lookup over several catalog parts one after the other, such as a bundle and its
+    appended segments, each with its own CatalogLookup. Rows replaced by a later part
+    are never returned.
+    """
+
+    def __init__(self, parts, retired=None):
+        """
+        Args:
+            parts (list): (lookup, first_row) of each part, in catalog order
+            retired (numpy.ndarray): Optional boolean mask of rows replaced by a later part
+        """
+        self.parts = parts
+        self.retired = retired
+
+    def _rows(self, find):
+        rows = np.unique(np.concatenate([find(lookup) + first_row for lookup, first_row in self.parts]))
+        if self.retired is not None:
+            rows = rows[~self.retired[rows]]
+        return rows
+
+    def rows_for_names(self, names):
+        """See CatalogLookup.rows_for_names."""
+        names = list(names)
+        return self._rows(lambda lookup: lookup.rows_for_names(names))
+
+    def rows_for_appids(self, appids):
+        """See CatalogLookup.rows_for_appids."""
+        appids = list(appids)
+        return self._rows(lambda lookup: lookup.rows_for_appids(appids))
@@ -0,0 +1,209 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import gc
+import os
+import threading
+import time
+
+# Latency buckets in seconds, from 0.1 ms to 10 s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that is set to its current reading."""
+
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket plus +Inf, then the running sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def _render_value(self, key, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts[:-1]):
+            cumulative += count
+            labels = _format_labels(key + (("le", bound if bound == "+Inf" else repr(float(bound))),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(key)} {counts[-1]!r}")
+        lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the service metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def on_collect(self, collector):
+        """Register a callable run before each render, to refresh gauges read at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Render every metric.
+
+        Returns:
+            str: Metrics in the Prometheus text exposition format
+        """
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+class StageTimer:
+    """
+    Records how long each stage of one request takes. Created inside the inference
+    job and returned with its result, so it also works across a process pool.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.values = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def record(self, name, value):
+        """Keep a per-request value such as the candidate pool size."""
+        self.values[name] = value
+
+
+def server_timing_header(stages):
+    """
+    Format stage durations as a Server-Timing header value.
+
+    Args:
+        stages (dict): Stage name to duration in seconds
+
+    Returns:
+        str: Header value such as "profile;dur=0.12, candidates;dur=1.5"
+    """
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in stages.items())
+
+
+def read_process_memory():
+    """
+    Read the resident and virtual memory of this process.
+
+    Returns:
+        dict: rss and vms in bytes, empty where /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            vms_pages, rss_pages = f.read().split()[:2]
+    except OSError:
+        return {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    return {"rss": int(rss_pages) * page_size, "vms": int(vms_pages) * page_size}
+
+
+def gc_collections():
+    """
+    Count garbage collections per generation since the process started.
+
+    Returns:
+        dict: Generation number to number of collections
+    """
+    return {generation: stats["collections"] for generation, stats in enumerate(gc.get_stats())}
@@ -0,0 +1,234 @@
+import copy
+import logging
+
+import numpy as np
+
+from artifacts import ConcatenatedColumn, ModelBundle, list_segments, segmented_version
+from genre_filter import GenreFilter
+from lookup import CatalogLookup, ConcatenatedLookup
+from retrieval import IVFIndex
+from vector_store import DEFAULT_TOP_N, ConcatenatedVectors, load_vectors
+
+logger = logging.getLogger(__name__)
+
+
+class ModelState:
+    """
+    Everything the service reads from one model version: the catalog arrays,
+    the lookup index and the optional candidate index.
+
+    A state is never modified after it is built. Reloading builds a new state and
+    swaps it in, so requests that already hold the old one finish on it unchanged.
+    Segments appended to the bundle after it was loaded are picked up with extend,
+    which shares everything already loaded with the new state.
+    """
+
+    def __init__(
+        self,
+        bundle_dir,
+        version,
+        candidate_index="exact",
+        n_probe=16,
+        precision="float32",
+        top_n=DEFAULT_TOP_N,
+        verify=False,
+        n_segments=None,
+    ):
+        """
+        Open a bundle and build the serving structures on top of it.
+
+        Args:
+            bundle_dir (str): Directory of the artifact bundle
+            version (str): Version name reported with each recommendation
+            candidate_index (str): "exact" or "ivf"
+            n_probe (int): Clusters probed per query by the IVF index
+            precision (str): Form the catalog vectors are scored in, see vector_store.PRECISIONS
+            top_n (int): Genres kept per game with the sparse precision
+            verify (bool): Check the sha256 of every bundle file before using it
+            n_segments (int): Number of appended segments to load, defaults to all of them
+        """
+        self.version = version
+        self.base_version = version
+        self.bundle_dir = bundle_dir
+        self.precision = precision
+        self.top_n = top_n
+        self.bundle = ModelBundle(bundle_dir, mmap_mode="r", verify=verify)
+        self.genre_classes = self.bundle.manifest["genre_classes"]
+
+        self.catalog = load_vectors(self.bundle.arrays, precision, top_n)
+        self.catalog_norms = self.catalog.norms
+
+        self.catalog_names = self.bundle.columns["name"]
+        self.catalog_appids = self.bundle.arrays["appids"]
+        self.catalog_descriptions = self.bundle.columns["short_description"]
+        self.catalog_images = self.bundle.columns["header_image"]
+
+        self.catalog_lookup = CatalogLookup(
+            **{
+                name: self.bundle.arrays[name]
+                for name in ["sorted_name_hashes", "name_order", "sorted_appids", "appid_order"]
+            }
+        )
+        # Genre bitmaps for filtered recommendations, absent from bundles trained without them
+        genre_bitmaps = self.bundle.arrays.get("genre_bitmaps")
+        self.genre_filter = (
+            GenreFilter(self.bundle.manifest["genre_names"], genre_bitmaps, len(self.catalog))
+            if genre_bitmaps is not None
+            else None
+        )
+
+        # Item-to-item graph for /similar/, absent from bundles trained without one
+        self.neighbor_parts = []
+        if "neighbor_rows" in self.bundle.arrays:
+            self.neighbor_parts.append((0, self.bundle.arrays["neighbor_rows"], self.bundle.arrays["neighbor_scores"]))
+        self.candidate_index = (
+            IVFIndex(self.catalog.rows(np.arange(len(self.catalog))), n_probe=n_probe)
+            if candidate_index == "ivf"
+            else None
+        )
+
+        # Rows replaced by a game re-ingested in a later segment, None while there are none
+        self.retired = None
+        self.segments = []
+        segment_dirs = list_segments(bundle_dir)
+        self._append_segments(segment_dirs[:n_segments] if n_segments is not None else segment_dirs, verify)
+
+    def extend(self, verify=False):
+        """
+        Build a state that also serves the segments appended since this one was loaded.
+
+        Args:
+            verify (bool): Check the sha256 of every new segment file before using it
+
+        Returns:
+            ModelState: The extended state, or this state if there are no new segments
+        """
+        new_segments = list_segments(self.bundle_dir)[len(self.segments) :]
+        if not new_segments:
+            return self
+        state = copy.copy(self)
+        state.segments = list(self.segments)
+        state.neighbor_parts = list(self.neighbor_parts)
+        state._append_segments(new_segments, verify)
+        return state
+
+    def _append_segments(self, segment_dirs, verify):
+        """Append segments after the rows loaded so far, replacing the rows of re-ingested games."""
+        for segment_dir in segment_dirs:
+            segment = ModelBundle(segment_dir, mmap_mode="r", verify=verify)
+            first_row = len(self.catalog)
+            appids = segment.arrays["appids"]
+            n_rows = first_row + len(appids)
+
+            retired = np.zeros(n_rows, dtype=bool)
+            if self.retired is not None:
+                retired[:first_row] = self.retired
+            retired[self.catalog_lookup.rows_for_appids(appids)] = True
+
+            vectors = load_vectors(segment.arrays, self.precision, self.top_n)
+            self.catalog = ConcatenatedVectors([self.catalog, vectors])
+            self.catalog_norms = self.catalog.norms
+            self.catalog_names = ConcatenatedColumn([self.catalog_names, segment.columns["name"]])
+            self.catalog_appids = np.concatenate([self.catalog_appids, appids])
+            self.catalog_descriptions = ConcatenatedColumn(
+                [self.catalog_descriptions, segment.columns["short_description"]]
+            )
+            self.catalog_images = ConcatenatedColumn([self.catalog_images, segment.columns["header_image"]])
+
+            lookup_parts = (
+                self.catalog_lookup.parts if isinstance(self.catalog_lookup, ConcatenatedLookup)
+                else [(self.catalog_lookup, 0)]
+            )
+            segment_lookup = CatalogLookup(
+                **{
+                    name: segment.arrays[name]
+                    for name in ["sorted_name_hashes", "name_order", "sorted_appids", "appid_order"]
+                }
+            )
+            self.retired = retired if retired.any() else None
+            self.catalog_lookup = ConcatenatedLookup(lookup_parts + [(segment_lookup, first_row)], self.retired)
+
+            if self.genre_filter is not None and "genre_bitmaps" in segment.arrays:
+                segment_filter = GenreFilter(self.genre_filter.names, segment.arrays["genre_bitmaps"], len(appids))
+                self.genre_filter = GenreFilter.concatenate([self.genre_filter, segment_filter])
+            else:
+                self.genre_filter = None
+            if "neighbor_rows" in segment.arrays:
+                self.neighbor_parts.append(
+                    (first_row, segment.arrays["neighbor_rows"], segment.arrays["neighbor_scores"])
+                )
+            if self.candidate_index is not None:
+                self.candidate_index = self.candidate_index.extend(vectors.rows(np.arange(len(vectors))))
+
+            self.segments.append(segment)
+        self.version = segmented_version(self.base_version, len(self.segments))
+
+    def neighbors(self, row, k):
+        """
+        Read the precomputed nearest neighbours of a catalog row.
+
+        Args:
+            row (int): Catalog row
+            k (int): Maximum number of neighbours
+
+        Returns:
+            tuple: (rows, scores) best first, or None if the row has no neighbour graph
+        """
+        for first_row, rows, scores in reversed(self.neighbor_parts):
+            if first_row <= row:
+                if row - first_row >= len(rows):
+                    return None
+                neighbor_rows = np.asarray(rows[row - first_row, :k], dtype=np.int64)
+                neighbor_scores = np.asarray(scores[row - first_row, :k], dtype=np.float32)
+                found = neighbor_rows >= 0
+                if self.retired is not None:
+                    found &= ~self.retired[np.maximum(neighbor_rows, 0)]
+                return neighbor_rows[found], neighbor_scores[found]
+        return None
+
+    def validate(self):
+        """
+        Check that the arrays of the bundle agree with each other and can be scored,
+        before the state is put into service.
+
+        Raises:
+            ValueError: If the bundle is inconsistent
+        """
+        n_games = self.bundle.manifest["n_games"] + sum(segment.manifest["n_games"] for segment in self.segments)
+        for segment in self.segments:
+            if segment.manifest["genre_classes"] != self.genre_classes:
+                raise ValueError(f"Segment {segment.bundle_dir} was scored with different genre classes")
+        shape = (len(self.catalog), self.catalog.n_dims)
+        if shape != (n_games, len(self.genre_classes)):
+            raise ValueError(f"Catalog vectors have shape {shape}, expected ({n_games}, {len(self.genre_classes)})")
+        for name, column in [
+            ("appids", self.catalog_appids),
+            ("name", self.catalog_names),
+            ("short_description", self.catalog_descriptions),
+            ("header_image", self.catalog_images),
+        ]:
+            if len(column) != n_games:
+                raise ValueError(f"{name} has {len(column)} rows, expected {n_games}")
+        if n_games == 0:
+            raise ValueError("Bundle holds no games")
+        if self.genre_filter is not None:
+            expected = (len(self.genre_filter.names), (n_games + 7) // 8)
+            if self.genre_filter.bitmaps.shape != expected:
+                raise ValueError(f"Genre bitmaps have shape {self.genre_filter.bitmaps.shape}, expected {expected}")
+        for part, (first_row, rows, scores) in enumerate(self.neighbor_parts):
+            next_row = self.neighbor_parts[part + 1][0] if part + 1 < len(self.neighbor_parts) else n_games
+            if first_row + len(rows) > next_row or scores.shape != rows.shape:
+                raise ValueError(
+                    f"Neighbour graph has shape {rows.shape}, expected at most {next_row - first_row} rows"
+                )
+            if rows.max(initial=-1) >= n_games:
+                raise ValueError("Neighbour graph points past the catalog")
+
+        # Score one catalog game against the catalog, as a request would
+        scores = self.catalog.dot(self.catalog.rows(np.array([0])))
+        if not np.all(np.isfinite(scores)):
+            raise ValueError("Catalog scores are not finite")
+        rows = self.catalog_lookup.rows_for_appids([int(self.catalog_appids[0])])
+        if not len(rows):
+            raise ValueError("Lookup index does not resolve the catalog's own AppIDs")
+        logger.info(f"Validated model version {self.version} with {n_games} games")
@@ -0,0 +1,170 @@
+"""
+Genre model backends for train.py.
+
+Every backend maps TF-IDF features to genre probabilities with predict_proba, so the
+precomputed catalog matrix the service scores against keeps the same contract:
+
+    random_forest   the original RandomForestClassifier
+    logistic        multinomial logistic regression trained on the genre labels
+    distilled       logistic regression trained on the probabilities of a random
+                    forest, so it mimics the forest at a fraction of the size and cost
+
+TRAIN_MODE=out_of_core fits one of the INCREMENTAL_BACKENDS chunk by chunk with
+partial_fit instead (see out_of_core.py):
+
+    sgd             logistic regression fitted by stochastic gradient descent
+    naive_bayes     multinomial naive Bayes
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+MODEL_BACKENDS = ("random_forest", "logistic", "distilled")
+INCREMENTAL_BACKENDS = ("sgd", "naive_bayes")
+
+RANDOM_FOREST_PARAMS = {
+    "n_estimators": 200,  # More trees
+    "max_depth": 20,  # Deeper trees
+    "min_samples_split": 5,  # Prevent overfitting
+    "min_samples_leaf": 2,  # Prevent overfitting
+    "n_jobs": -1,  # Fit the trees on all cores
+}
+LOGISTIC_PARAMS = {"C": 10.0, "max_iter": 1000}
+SGD_PARAMS = {"loss": "log_loss", "alpha": 1e-5}
+NAIVE_BAYES_PARAMS = {"alpha": 0.01}
+
+# Teacher probabilities below this are dropped from the distillation targets
+DISTILL_MIN_PROBABILITY = 0.01
+
+
+def train_random_forest(features, labels, random_state=42, **params):
+    """
+    Fit the random forest backend.
+
+    Args:
+        features (scipy.sparse.csr_matrix): TF-IDF matrix
+        labels (numpy.ndarray): Encoded primary genre of each game
+        random_state (int): Random seed
+        **params: Overrides of RANDOM_FOREST_PARAMS
+
+    Returns:
+        RandomForestClassifier: The fitted forest
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    model = RandomForestClassifier(**{**RANDOM_FOREST_PARAMS, **params}, random_state=random_state)
+    return model.fit(features, labels)
+
+
+def train_logistic(features, labels, random_state=42, sample_weight=None, **params):
+    """
+    Fit the logistic regression backend.
+
+    Args:
+        features (scipy.sparse.csr_matrix): TF-IDF matrix
+        labels (numpy.ndarray): Encoded primary genre of each game
+        random_state (int): Random seed
+        sample_weight (numpy.ndarray): Optional weight of each row
+        **params: Overrides of LOGISTIC_PARAMS
+
+    Returns:
+        LogisticRegression: The fitted model
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    model = LogisticRegression(**{**LOGISTIC_PARAMS, **params}, random_state=random_state)
+    return model.fit(features, labels, sample_weight=sample_weight)
+
+
+def distill(teacher, features, random_state=42, min_probability=DISTILL_MIN_PROBABILITY, **params):
+    """
+    Train a logistic regression student on the genre probabilities of a teacher model.
+
+    Soft targets are expressed as weighted samples: every game is repeated once per
+    genre the teacher gives at least min_probability, weighted by that probability.
+    Minimizing the weighted log loss is then the same as minimizing the cross-entropy
+    against the teacher's distribution.
+
+    Args:
+        teacher: Fitted model with predict_proba
+        features (scipy.sparse.csr_matrix): TF-IDF matrix
+        random_state (int): Random seed
+        min_probability (float): Teacher probabilities below this are dropped
+        **params: Overrides of LOGISTIC_PARAMS
+
+    Returns:
+        LogisticRegression: The fitted student
+    """
+    probs = teacher.predict_proba(features)
+    rows, columns = np.nonzero(probs >= min_probability)
+    student_features = sp.csr_matrix(features)[rows]
+    student_labels = teacher.classes_[columns]
+    return train_logistic(
+        student_features, student_labels, random_state=random_state, sample_weight=probs[rows, columns], **params
+    )
+
+
+def train_genre_model(backend, features, labels, random_state=42, teacher_params=None, **params):
+    """
+    Fit the genre model of a backend.
+
+    Args:
+        backend (str): One of MODEL_BACKENDS
+        features (scipy.sparse.csr_matrix): TF-IDF matrix
+        labels (numpy.ndarray): Encoded primary genre of each game
+        random_state (int): Random seed
+        teacher_params (dict): Overrides of RANDOM_FOREST_PARAMS for the teacher of the distilled backend
+        **params: Overrides of the backend's default parameters
+
+    Returns:
+        object: The fitted model, with predict_proba and classes_
+    """
+    if backend == "random_forest":
+        return train_random_forest(features, labels, random_state, **params)
+    if backend == "logistic":
+        return train_logistic(features, labels, random_state, **params)
+    if backend == "distilled":
+        teacher = train_random_forest(features, labels, random_state, **(teacher_params or {}))
+        return distill(teacher, features, random_state, **params)
+    raise ValueError(f"Unknown model backend: {backend}")
+
+
+def new_incremental_model(backend, random_state=42, **params):
+    """
+    Create an unfitted model of an incremental backend.
+
+    Args:
+        backend (str): One of INCREMENTAL_BACKENDS
+        random_state (int): Random seed
+        **params: Overrides of the backend's default parameters
+
+    Returns:
+        object: Model with partial_fit, predict_proba and classes_
+    """
+    if backend == "sgd":
+        from sklearn.linear_model import SGDClassifier
+
+        return SGDClassifier(**{**SGD_PARAMS, **params}, random_state=random_state)
+    if backend == "naive_bayes":
+        from sklearn.naive_bayes import MultinomialNB
+
+        return MultinomialNB(**{**NAIVE_BAYES_PARAMS, **params})
+    raise ValueError(f"Unknown incremental backend: {backend}")
+
+
+def predict_genre_proba(model, features, n_classes):
+    """
+    Genre probabilities with one column per encoded genre, also when the model never
+    saw some genres during training.
+
+    Args:
+        model: Fitted model with predict_proba and classes_
+        features (scipy.sparse.csr_matrix): TF-IDF matrix
+        n_classes (int): Number of genres known to the label encoder
+
+    Returns:
+        numpy.ndarray: float32 matrix of shape (n_games, n_classes)
+    """
+    probs = np.zeros((features.shape[0], n_classes), dtype=np.float32)
+    probs[:, model.classes_] = model.predict_proba(features)
+    return probs
@@ -0,0 +1,210 @@
+"""
+Item-to-item nearest neighbour graph over the catalog genre probabilities.
+
+train.py stores, for every game, the rows and cosine similarities of its
+n_neighbors most similar games as two (n_games, n_neighbors) arrays:
+
+    neighbor_rows       int32 catalog rows, best first, -1 where a game has fewer neighbours
+    neighbor_scores     float16 cosine similarities
+
+The service answers /similar/{appid} by reading one row of each.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+
+import numpy as np
+
+from retrieval import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NEIGHBORS = 50
+
+# Upper bound on the similarity block a worker holds at once (rows x catalog), ~64 MB of float32
+CHUNK_ELEMENTS = 1 << 24
+
+# Above this share of new or changed games a full rebuild is cheaper than an update
+FULL_REBUILD_SHARE = 0.5
+
+
+def _top_neighbors(block, n_neighbors, self_rows=None):
+    """
+    Top n_neighbors columns of each row of a similarity block.
+
+    Args:
+        block (numpy.ndarray): Similarities of shape (n_rows, n_candidates), modified in place
+        n_neighbors (int): Neighbours kept per row
+        self_rows (numpy.ndarray): Column of each row's own game, excluded from its neighbours
+
+    Returns:
+        tuple: (columns, scores) arrays of shape (n_rows, n_neighbors), best first,
+            padded with -1 and -inf when there are fewer candidates
+    """
+    if self_rows is not None:
+        block[np.arange(len(block)), self_rows] = -np.inf
+    n_rows, n_candidates = block.shape
+    k = min(n_neighbors, n_candidates)
+    columns = np.full((n_rows, n_neighbors), -1, dtype=np.int64)
+    scores = np.full((n_rows, n_neighbors), -np.inf, dtype=np.float32)
+    if k:
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        columns[:, :k] = np.take_along_axis(top, order, axis=1)
+        scores[:, :k] = np.take_along_axis(top_scores, order, axis=1)
+    columns[~np.isfinite(scores)] = -1
+    return columns, scores
+
+
+def _search_rows(unit, rows, n_neighbors, n_jobs, exclude_mask=None):
+    """
+    Exact neighbours of the given rows against the whole catalog, in chunks spread over threads.
+
+    Args:
+        unit (numpy.ndarray): Row-normalized catalog vectors
+        rows (numpy.ndarray): Catalog rows to search for
+        n_neighbors (int): Neighbours kept per row
+        n_jobs (int): Worker threads, numpy releases the GIL in the matrix products
+        exclude_mask (numpy.ndarray): Optional boolean mask of rows that must not be neighbours
+
+    Returns:
+        tuple: (rows, scores) arrays of shape (len(rows), n_neighbors)
+    """
+    chunk_rows = max(1, CHUNK_ELEMENTS // max(len(unit), 1))
+    chunks = [rows[start : start + chunk_rows] for start in range(0, len(rows), chunk_rows)]
+
+    def search(chunk):
+        block = unit[chunk] @ unit.T
+        if exclude_mask is not None:
+            block[:, exclude_mask] = -np.inf
+        return _top_neighbors(block, n_neighbors, self_rows=chunk)
+
+    neighbor_rows = np.full((len(rows), n_neighbors), -1, dtype=np.int64)
+    neighbor_scores = np.full((len(rows), n_neighbors), -np.inf, dtype=np.float32)
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count() or 1) as executor:
+        start = 0
+        for chunk_rows_found, chunk_scores in executor.map(search, chunks):
+            neighbor_rows[start : start + len(chunk_rows_found)] = chunk_rows_found
+            neighbor_scores[start : start + len(chunk_rows_found)] = chunk_scores
+            start += len(chunk_rows_found)
+    return neighbor_rows, neighbor_scores
+
+
+def _to_arrays(neighbor_rows, neighbor_scores):
+    return {
+        "neighbor_rows": neighbor_rows.astype(np.int32),
+        "neighbor_scores": np.where(neighbor_rows >= 0, neighbor_scores, 0).astype(np.float16),
+    }
+
+
+def build_neighbor_graph(vectors, n_neighbors=DEFAULT_NEIGHBORS, n_jobs=None):
+    """
+    Compute the exact nearest neighbours of every catalog game.
+
+    Args:
+        vectors (numpy.ndarray): Catalog genre probabilities of shape (n_games, n_genres)
+        n_neighbors (int): Neighbours kept per game
+        n_jobs (int): Worker threads, defaults to the CPU count
+
+    Returns:
+        dict: neighbor_rows and neighbor_scores arrays for the artifact bundle
+    """
+    unit = normalize_rows(vectors)
+    return _to_arrays(*_search_rows(unit, np.arange(len(unit)), n_neighbors, n_jobs))
+
+
+def search_neighbors(vectors, rows, n_neighbors=DEFAULT_NEIGHBORS, n_jobs=None, exclude_mask=None):
+    """
+    Compute the exact nearest neighbours of some catalog rows only, e.g. of games
+    appended to a catalog whose other games keep their graph.
+
+    Args:
+        vectors (numpy.ndarray): Catalog genre probabilities of shape (n_games, n_genres)
+        rows (numpy.ndarray): Catalog rows to search for
+        n_neighbors (int): Neighbours kept per game
+        n_jobs (int): Worker threads, defaults to the CPU count
+        exclude_mask (numpy.ndarray): Optional boolean mask of rows that must not be neighbours
+
+    Returns:
+        dict: neighbor_rows and neighbor_scores arrays for the given rows
+    """
+    unit = normalize_rows(vectors)
+    return _to_arrays(*_search_rows(unit, np.asarray(rows), n_neighbors, n_jobs, exclude_mask))
+
+
+def update_neighbor_graph(vectors, appids, previous, n_neighbors=DEFAULT_NEIGHBORS, n_jobs=None):
+    """
+    Bring the neighbour graph of a previous catalog up to date with a changed catalog.
+
+    Games that are new or whose vector changed are searched against the whole
+    catalog. Every other game keeps its previous neighbours merged with its most
+    similar new and changed games, unless one of its previous neighbours was
+    removed or changed, in which case it is searched again as well. The result
+    is the same graph a full build would produce, so appending games only costs
+    a search for the appended ones. Falls back to a full build when most of the
+    catalog changed.
+
+    Args:
+        vectors (numpy.ndarray): Catalog genre probabilities of shape (n_games, n_genres)
+        appids (numpy.ndarray): AppID of each catalog row
+        previous (dict): appids, catalog_probs, neighbor_rows and neighbor_scores of the previous catalog
+        n_neighbors (int): Neighbours kept per game
+        n_jobs (int): Worker threads, defaults to the CPU count
+
+    Returns:
+        dict: neighbor_rows and neighbor_scores arrays for the artifact bundle
+    """
+    previous_appids = np.asarray(previous["appids"])
+    previous_rows = previous["neighbor_rows"]
+    if not len(previous_appids) or previous_rows.shape[1] < n_neighbors:
+        logger.info("Previous neighbour graph cannot be reused, rebuilding it")
+        return build_neighbor_graph(vectors, n_neighbors, n_jobs)
+
+    # Match rows of the two catalogs by AppID
+    order = np.argsort(previous_appids, kind="stable")
+    positions = np.minimum(np.searchsorted(previous_appids[order], appids), len(order) - 1)
+    old_row_of = np.where(previous_appids[order][positions] == appids, order[positions], -1)
+    kept = old_row_of >= 0
+    kept[kept] = np.all(
+        np.asarray(previous["catalog_probs"])[old_row_of[kept]] == np.asarray(vectors)[kept], axis=1
+    )
+    changed = np.flatnonzero(~kept)
+    if len(changed) > FULL_REBUILD_SHARE * len(appids):
+        logger.info(f"{len(changed)} of {len(appids)} games are new or changed, rebuilding the neighbour graph")
+        return build_neighbor_graph(vectors, n_neighbors, n_jobs)
+    logger.info(f"Updating the neighbour graph for {len(changed)} new or changed games")
+
+    unit = normalize_rows(vectors)
+    neighbor_rows = np.full((len(unit), n_neighbors), -1, dtype=np.int64)
+    neighbor_scores = np.full((len(unit), n_neighbors), -np.inf, dtype=np.float32)
+
+    # Previous neighbours of unchanged games, translated to new rows
+    new_row_of = np.full(len(previous_appids), -1, dtype=np.int64)
+    new_row_of[old_row_of[kept]] = np.flatnonzero(kept)
+    unchanged = np.flatnonzero(kept)
+    old_neighbors = previous_rows[old_row_of[unchanged], :n_neighbors].astype(np.int64)
+    translated = np.where(old_neighbors >= 0, new_row_of[np.maximum(old_neighbors, 0)], -1)
+
+    # Merge them with the most similar new and changed games
+    chunk_rows = max(1, CHUNK_ELEMENTS // max(len(changed), n_neighbors * unit.shape[1]))
+    for start in range(0, len(unchanged), chunk_rows):
+        rows = unchanged[start : start + chunk_rows]
+        candidates = translated[start : start + chunk_rows]
+        scores = np.einsum("rd,rnd->rn", unit[rows], unit[np.maximum(candidates, 0)])
+        scores[candidates < 0] = -np.inf
+        if len(changed):
+            columns, changed_scores = _top_neighbors(unit[rows] @ unit[changed].T, n_neighbors)
+            candidates = np.hstack([candidates, np.where(columns >= 0, changed[np.maximum(columns, 0)], -1)])
+            scores = np.hstack([scores, changed_scores])
+        top, top_scores = _top_neighbors(scores, n_neighbors)
+        neighbor_rows[rows] = np.where(top >= 0, np.take_along_axis(candidates, np.maximum(top, 0), axis=1), -1)
+        neighbor_scores[rows] = top_scores
+
+    # A game that lost a previous neighbour may have had better candidates beyond its list
+    lost = np.any((old_neighbors >= 0) & (translated < 0), axis=1)
+    search = np.concatenate([changed, unchanged[lost]])
+    if len(search):
+        neighbor_rows[search], neighbor_scores[search] = _search_rows(unit, search, n_neighbors, n_jobs)
+    return _to_arrays(neighbor_rows, neighbor_scores)
@@ -0,0 +1,86 @@
+"""
+Out-of-core genre model training for TRAIN_MODE=out_of_core in train.py.
+
+The TF-IDF needs the whole corpus to learn its vocabulary and the random forest
+needs the whole feature matrix. Here the text is hashed into a fixed number of
+features by a stateless HashingVectorizer, so each chunk of a spilled dataset (see
+dataset.py) is transformed on its own, and the genre model is one of the
+INCREMENTAL_BACKENDS of models.py, updated chunk by chunk with partial_fit over a
+few epochs. Only one chunk of text and its features are in memory at a time.
+
+The bundle stores the vectorizer under the name of the TF-IDF; it has the same
+transform method, so ingest.py and the serving path are unchanged.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from models import new_incremental_model, predict_genre_proba
+
+logger = logging.getLogger(__name__)
+
+HASHING_PARAMS = {"n_features": 1 << 18, "stop_words": "english", "alternate_sign": False, "norm": "l2"}
+# Passes over the dataset, each over the chunks in a new random order
+DEFAULT_EPOCHS = 5
+
+
+def hashing_vectorizer(**params):
+    """
+    Args:
+        **params: Overrides of HASHING_PARAMS
+
+    Returns:
+        HashingVectorizer: Stateless vectorizer, no fitting needed
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(**{**HASHING_PARAMS, **params})
+
+
+def train_incremental(backend, vectorizer, spilled, labels, n_classes, epochs=DEFAULT_EPOCHS, random_state=42):
+    """
+    Fit an incremental genre model chunk by chunk.
+
+    Args:
+        backend (str): One of models.INCREMENTAL_BACKENDS
+        vectorizer (HashingVectorizer): Turns texts into features
+        spilled (dataset.SpilledDataset): The preprocessed dataset on disk
+        labels (numpy.ndarray): Encoded primary genre of each row
+        n_classes (int): Number of genres known to the label encoder
+        epochs (int): Passes over the dataset
+        random_state (int): Random seed of the model and of the chunk and row order
+
+    Returns:
+        object: The fitted model
+    """
+    model = new_incremental_model(backend, random_state)
+    classes = np.arange(n_classes)
+    rng = np.random.default_rng(random_state)
+    for epoch in range(epochs):
+        start_time = time.time()
+        for rows, texts in spilled.text_chunks(rng.permutation(spilled.n_chunks)):
+            order = rng.permutation(len(texts))
+            model.partial_fit(vectorizer.transform(texts)[order], labels[rows][order], classes=classes)
+        logger.info(f"Epoch {epoch + 1}/{epochs} done in {time.time() - start_time:.2f} seconds")
+    return model
+
+
+def predict_in_chunks(model, vectorizer, spilled, n_classes):
+    """
+    Genre probabilities of every row, computed chunk by chunk.
+
+    Args:
+        model: Fitted model with predict_proba and classes_
+        vectorizer (HashingVectorizer): Turns texts into features
+        spilled (dataset.SpilledDataset): The preprocessed dataset on disk
+        n_classes (int): Number of genres known to the label encoder
+
+    Returns:
+        numpy.ndarray: float32 matrix of shape (n_rows, n_classes)
+    """
+    probs = np.zeros((spilled.n_rows, n_classes), dtype=np.float32)
+    for rows, texts in spilled.text_chunks():
+        probs[rows] = predict_genre_proba(model, vectorizer.transform(texts), n_classes)
+    return probs
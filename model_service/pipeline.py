@@ -0,0 +1,169 @@
+"""
+Named, checkpointed stages for train.py.
+
+The result of every stage is saved to <model_dir>/checkpoints/<stage>/<key>.joblib.
+The key hashes everything the result depends on: content hashes of input files,
+the keys of earlier stages and the stage's parameters. A rerun with the same inputs
+loads the result instead of computing it again, and a change anywhere upstream
+changes the keys of all later stages. Stage timings and the peak resident memory
+reached by the end of each stage go to a JSON run report.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+# Checkpoints kept per stage, older ones are deleted
+CHECKPOINTS_KEPT = 2
+
+
+def file_digest(path):
+    """
+    Content hash of a file.
+
+    Args:
+        path (str): File path
+
+    Returns:
+        str: Hex sha256 of the file
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def peak_rss_mb():
+    """
+    Returns:
+        float: Peak resident memory of this process in MB, None where /proc is not available
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class StageRunner:
+    """Runs pipeline stages, skipping those whose checkpoint matches their inputs."""
+
+    def __init__(self, checkpoint_dir=None, kept=CHECKPOINTS_KEPT):
+        """
+        Args:
+            checkpoint_dir (str): Directory for the checkpoints, None runs every stage without saving
+            kept (int): Checkpoints kept per stage
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.kept = kept
+        self.keys = {}
+        self.stages = {}
+        self.started_at = time.time()
+
+    def run(self, name, compute, inputs=None, params=None, save=True):
+        """
+        Run a stage or load its checkpoint.
+
+        Args:
+            name (str): Stage name
+            compute (callable): Computes the stage result, called without arguments
+            inputs (list): Hashes or names of earlier stages the result depends on;
+                None marks a stage that is never checkpointed
+            params (dict): JSON-serializable parameters of the stage
+            save (bool): Save a checkpoint; stages that keep their own results on disk
+                only need the key for the stages after them
+
+        Returns:
+            object: The stage result
+        """
+        start = time.perf_counter()
+        if inputs is None:
+            result = compute()
+            self._record(name, start, cached=False, key=None)
+            return result
+
+        key_source = {
+            "stage": name,
+            "inputs": [self.keys.get(value, value) for value in inputs],
+            "params": params or {},
+        }
+        key = hashlib.sha256(json.dumps(key_source, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        self.keys[name] = key
+
+        path = os.path.join(self.checkpoint_dir, name, f"{key}.joblib") if self.checkpoint_dir and save else None
+        if path is not None and os.path.exists(path):
+            try:
+                result = joblib.load(path)
+                self._record(name, start, cached=True, key=key)
+                return result
+            except Exception as e:
+                logger.warning(f"Could not read checkpoint {path}, running stage {name}: {e}")
+
+        result = compute()
+        if path is not None:
+            self._save(path, result)
+        self._record(name, start, cached=False, key=key)
+        return result
+
+    def _save(self, path, result):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        joblib.dump(result, tmp_path)
+        os.replace(tmp_path, path)
+
+        stage_dir = os.path.dirname(path)
+        checkpoints = sorted(
+            (os.path.join(stage_dir, name) for name in os.listdir(stage_dir) if name.endswith(".joblib")),
+            key=os.path.getmtime,
+        )
+        for old in checkpoints[: -self.kept]:
+            os.remove(old)
+
+    def _record(self, name, start, cached, key):
+        seconds = time.perf_counter() - start
+        self.stages[name] = {"seconds": round(seconds, 3), "cached": cached, "key": key, "peak_rss_mb": peak_rss_mb()}
+        logger.info(f"Stage {name} {'loaded from checkpoint' if cached else 'completed'} in {seconds:.2f} seconds")
+
+    def report(self, **extra):
+        """
+        Summarize the run.
+
+        Args:
+            **extra: Additional values for the report
+
+        Returns:
+            dict: Start time, total and per-stage timings, and the extra values
+        """
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+            "total_seconds": round(time.time() - self.started_at, 3),
+            "stages": self.stages,
+            **extra,
+        }
+
+    def write_report(self, path, **extra):
+        """
+        Write the run report as JSON.
+
+        Args:
+            path (str): Report file
+            **extra: Additional values for the report
+
+        Returns:
+            dict: The written report
+        """
+        report = self.report(**extra)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
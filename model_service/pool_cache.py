@@ -0,0 +1,135 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
+
+class CandidatePool:
+    """Ranked candidates of one library under one model version."""
+
+    def __init__(self, rows, similarities):
+        """
+        Args:
+            rows (numpy.ndarray): Candidate catalog rows, best first, owned games excluded
+            similarities (numpy.ndarray): Similarity score of each candidate
+        """
+        self.rows = rows
+        self.similarities = similarities
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.similarities.nbytes
+
+
+def parse_pool_key(key):
+    """
+    Split a pool key or cursor into its parts.
+
+    Args:
+        key (str): Key from pool_key
+
+    Returns:
+        tuple: (model_version, library_digest, filters), empty strings for a malformed key
+    """
+    parts = key.rsplit(":", 2)
+    if len(parts) != 3:
+        return "", "", ""
+    return tuple(parts)
+
+
+def pool_key(model_version, library_digest, filters=""):
+    """
+    Build the cache key of a pool, which also serves as the paging cursor.
+
+    Args:
+        model_version (str): Model version the pool was scored with
+        library_digest (str): Digest of the library, see history.games_digest
+        filters (str): Digest of the genre filter, see genre_filter.filters_digest
+
+    Returns:
+        str: Cache key
+    """
+    return f"{model_version}:{library_digest}:{filters}"
+
+
+class CandidatePoolCache:
+    """
+    Process-local cache of candidate pools with per-entry expiry and LRU eviction,
+    so repeated requests for the same library skip profile building and scoring.
+    """
+
+    def __init__(self, max_entries=1000, ttl=600):
+        """
+        Args:
+            max_entries (int): Pools kept before the least recently used is evicted
+            ttl (float): Seconds a pool stays valid after it was built
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._pools = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        """
+        Look up a pool.
+
+        Args:
+            key (str): Key from pool_key
+
+        Returns:
+            CandidatePool: The pool, or None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._pools.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._pools[key]
+                self._misses += 1
+                return None
+            self._pools.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, pool):
+        """
+        Store a pool, evicting the least recently used ones beyond max_entries.
+
+        Args:
+            key (str): Key from pool_key
+            pool (CandidatePool): The pool
+        """
+        with self._lock:
+            self._pools[key] = (time.time() + self.ttl, pool)
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_entries:
+                self._pools.popitem(last=False)
+
+    def stats(self):
+        """
+        Report the cache size and hit counts.
+
+        Returns:
+            dict: Entries, bytes held by their pools, hits and misses
+        """
+        with self._lock:
+            return {
+                "entries": len(self._pools),
+                "bytes": sum(pool.nbytes for _, pool in self._pools.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+def create_pool_cache():
+    """
+    Create the cache configured by POOL_CACHE_SIZE and POOL_CACHE_TTL.
+
+    Returns:
+        CandidatePoolCache: The cache, or None when POOL_CACHE_SIZE is 0
+    """
+    max_entries = int(os.getenv("POOL_CACHE_SIZE", "1000"))
+    if max_entries <= 0:
+        return None
+    return CandidatePoolCache(max_entries=max_entries, ttl=float(os.getenv("POOL_CACHE_TTL", "600")))
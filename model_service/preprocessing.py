@@ -0,0 +1,122 @@
+"""
+Text preprocessing of the games dataset, shared by train.py and ingest.py so that
+ingested games get exactly the features the model was trained on.
+
+Everything except the review sentiment runs as vectorized pandas string operations
+with precompiled patterns, and only pandas and numpy are imported, so the service can
+build features of new games online the same way.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Reviews scored per task of the sentiment process pool
+SENTIMENT_CHUNK_SIZE = 2000
+# Dataset columns joined into the text the TF-IDF is fitted on
+TEXT_COLUMNS = ["short_description", "categories", "genres", "tags"]
+# Characters removed from the combined text
+UNSUPPORTED_CHARACTERS = re.compile(r"[^a-zA-Z0-9\s.,!?\';:-]")
+# Estimated owner ranges such as "20000 - 50000"
+OWNER_RANGE = re.compile(r"^\s*([+-]?\d+)\s* - \s*([+-]?\d+)\s*$")
+
+
+def _map_distinct(values, transform):
+    """
+    Apply a vectorized string transform to each distinct value of a column once.
+    Most dataset columns repeat heavily (genre and category lists, owner ranges).
+
+    Args:
+        values (pandas.Series): Plain or categorical column, missing values become ""
+        transform (callable): Takes and returns a pandas.Series of the distinct values
+
+    Returns:
+        pandas.Series: Transformed value of each row
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    distinct = pd.Series(np.asarray(uniques, dtype=object)).fillna("").astype(str)
+    return pd.Series(np.asarray(transform(distinct))[codes], index=values.index)
+
+
+def _clean_text(values):
+    return values.str.replace(UNSUPPORTED_CHARACTERS, "", regex=True)
+
+
+def _first_genre(values):
+    return values.str.partition(",")[0].str.strip().where(values != "", "Unknown")
+
+
+def _owner_midpoint(values):
+    bounds = values.str.extract(OWNER_RANGE)
+    return ((bounds[0].astype(float) + bounds[1].astype(float)) / 2).fillna(0.0)
+
+
+def combine_features(df):
+    """
+    Join description, categories, genres and tags into the text the TF-IDF is fitted on.
+
+    Args:
+        df (pandas.DataFrame): Rows in the games_may2024_full.csv format
+
+    Returns:
+        pandas.Series: Cleaned combined text of each game
+    """
+    # Cleaning removes single characters, so the columns can be cleaned before joining
+    columns = [_map_distinct(df[name], _clean_text) for name in TEXT_COLUMNS]
+    return columns[0].str.cat(columns[1:], sep=" ")
+
+
+def primary_genres(genres):
+    """
+    First listed genre of each game, "Unknown" for games without genres.
+
+    Args:
+        genres (pandas.Series): Comma-separated genre strings
+
+    Returns:
+        pandas.Series: Primary genre of each game
+    """
+    return _map_distinct(genres, _first_genre)
+
+
+def estimated_owners(owner_ranges):
+    """
+    Midpoint of each estimated owner range, 0 for missing or malformed ranges.
+
+    Args:
+        owner_ranges (pandas.Series): Ranges such as "20000 - 50000", plain or categorical
+
+    Returns:
+        pandas.Series: float64 midpoints
+    """
+    return _map_distinct(owner_ranges, _owner_midpoint).astype(np.float64)
+
+
+def _polarity(reviews):
+    from textblob import TextBlob
+
+    return [TextBlob(review).sentiment.polarity if isinstance(review, str) else 0 for review in reviews]
+
+
+def review_sentiment(reviews, n_jobs=None, chunk_size=SENTIMENT_CHUNK_SIZE):
+    """
+    TextBlob polarity of every review, scored in chunks across a process pool.
+
+    Args:
+        reviews (iterable): Review texts, missing values score 0
+        n_jobs (int): Worker processes, defaults to the CPU count; 1 scores in this process
+        chunk_size (int): Reviews per task
+
+    Returns:
+        numpy.ndarray: float64 polarity of each review
+    """
+    reviews = list(reviews)
+    chunks = [reviews[start : start + chunk_size] for start in range(0, len(reviews), chunk_size)]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(chunks) <= 1:
+        return np.array(_polarity(reviews), dtype=np.float64)
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks))) as executor:
+        return np.array([score for chunk in executor.map(_polarity, chunks) for score in chunk], dtype=np.float64)
@@ -0,0 +1,133 @@
+import copy
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    """
+    Scale every row to unit length so dot products become cosine similarities.
+
+    Args:
+        vectors (numpy.ndarray): Matrix of shape (n_rows, n_features)
+
+    Returns:
+        numpy.ndarray: Row-normalized float32 copy of the matrix
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def exact_top_k(scores, k, exclude_mask=None):
+    """
+    Return the rows with the k highest scores, best first.
+
+    Uses argpartition so only the k selected rows are sorted.
+
+    Args:
+        scores (numpy.ndarray): Score for each catalog row
+        k (int): Number of rows to return
+        exclude_mask (numpy.ndarray): Optional boolean mask of rows that must not be returned
+
+    Returns:
+        numpy.ndarray: Row indices ordered by descending score
+    """
+    if exclude_mask is not None:
+        scores = np.where(exclude_mask, -np.inf, scores)
+        k = min(k, int(len(scores) - np.count_nonzero(exclude_mask)))
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class IVFIndex:
+    """
+    Approximate top-k index that clusters the catalog and only scans the
+    clusters closest to the query (inverted file index).
+    """
+
+    def __init__(self, vectors, n_lists=None, n_probe=8, random_state=42):
+        """
+        Cluster the catalog vectors into inverted lists.
+
+        Args:
+            vectors (numpy.ndarray): Catalog matrix of shape (n_rows, n_features)
+            n_lists (int): Number of clusters, defaults to roughly sqrt(n_rows)
+            n_probe (int): Default number of clusters scanned per query
+            random_state (int): Seed for the clustering
+        """
+        from sklearn.cluster import MiniBatchKMeans
+
+        self.vectors = normalize_rows(vectors)
+        n_rows = len(self.vectors)
+        self.n_lists = min(n_lists or max(1, int(np.sqrt(n_rows))), n_rows)
+        self.n_probe = n_probe
+
+        kmeans = MiniBatchKMeans(
+            n_clusters=self.n_lists, random_state=random_state, batch_size=4096, n_init=3
+        )
+        assignments = kmeans.fit_predict(self.vectors)
+        self.centroids = normalize_rows(kmeans.cluster_centers_)
+
+        self.list_rows = np.argsort(assignments, kind="stable")
+        self.list_offsets = np.searchsorted(assignments[self.list_rows], np.arange(self.n_lists + 1))
+
+    def extend(self, vectors):
+        """
+        Index additional catalog rows under the existing clusters, without clustering again.
+
+        Args:
+            vectors (numpy.ndarray): Vectors of the rows appended to the catalog
+
+        Returns:
+            IVFIndex: A new index over the old and the appended rows
+        """
+        extended = copy.copy(self)
+        appended = normalize_rows(vectors)
+        assignments = np.empty(len(self.vectors), dtype=np.int64)
+        assignments[self.list_rows] = np.repeat(np.arange(self.n_lists), np.diff(self.list_offsets))
+        assignments = np.concatenate([assignments, np.argmax(appended @ self.centroids.T, axis=1)])
+        extended.vectors = np.vstack([self.vectors, appended])
+        extended.list_rows = np.argsort(assignments, kind="stable")
+        extended.list_offsets = np.searchsorted(assignments[extended.list_rows], np.arange(self.n_lists + 1))
+        return extended
+
+    def search(self, query, k, exclude_mask=None, n_probe=None):
+        """
+        Return approximately the k catalog rows most similar to the query, best first.
+
+        Args:
+            query (numpy.ndarray): Query vector in the same space as the catalog
+            k (int): Number of rows to return
+            exclude_mask (numpy.ndarray): Optional boolean mask of rows that must not be returned
+            n_probe (int): Number of clusters to scan, defaults to the index setting
+
+        Returns:
+            tuple: (rows, scores) ordered by descending cosine similarity
+        """
+        query = normalize_rows(np.asarray(query).reshape(1, -1))[0]
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+
+        # Probe at least n_probe clusters, and more until they hold k rows that are not
+        # excluded; when fewer than k rows are left, every cluster is probed
+        cluster_order = np.argsort(-(self.centroids @ query))
+        if exclude_mask is None:
+            cluster_sizes = np.diff(self.list_offsets)
+        else:
+            allowed = np.concatenate([[0], np.cumsum(~exclude_mask[self.list_rows])])
+            cluster_sizes = allowed[self.list_offsets[1:]] - allowed[self.list_offsets[:-1]]
+        n_needed = int(np.searchsorted(np.cumsum(cluster_sizes[cluster_order]), k)) + 1
+        n_probe = min(max(n_probe, n_needed), self.n_lists)
+        probed = cluster_order[:n_probe]
+        rows = np.concatenate(
+            [self.list_rows[self.list_offsets[c] : self.list_offsets[c + 1]] for c in probed]
+        )
+        if exclude_mask is not None:
+            rows = rows[~exclude_mask[rows]]
+
+        scores = self.vectors[rows] @ query
+        top = exact_top_k(scores, k)
+        return rows[top], scores[top]
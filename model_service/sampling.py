@@ -0,0 +1,99 @@
+import numpy as np
+
+
+def sampling_keys(weights, rng):
+    """
+    Perturb log-weights with Gumbel noise.
+
+    Taking the top k keys is equivalent to drawing k items without replacement
+    with probability proportional to their weights (Gumbel-top-k trick).
+
+    Args:
+        weights (numpy.ndarray): Non-negative sampling weight for each item
+        rng (numpy.random.Generator): Source of randomness
+
+    Returns:
+        numpy.ndarray: Random sort key for each item
+    """
+    with np.errstate(divide="ignore"):
+        log_weights = np.log(weights)
+    return log_weights + rng.gumbel(size=len(weights))
+
+
+def weighted_sample(weights, k, rng):
+    """
+    Draw k distinct items with probability proportional to their weights.
+
+    Args:
+        weights (numpy.ndarray): Non-negative sampling weight for each item
+        k (int): Number of items to draw
+        rng (numpy.random.Generator): Source of randomness
+
+    Returns:
+        numpy.ndarray: Indices of the drawn items, in draw order
+    """
+    k = min(k, len(weights))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    keys = sampling_keys(weights, rng)
+    top = np.argpartition(-keys, k - 1)[:k]
+    return top[np.argsort(-keys[top])]
+
+
+def mmr_rerank(vectors, relevance, k, diversity):
+    """
+    Greedily pick k items trading relevance against similarity to items already picked
+    (maximal marginal relevance).
+
+    Args:
+        vectors (numpy.ndarray): Row-normalized feature vector for each item
+        relevance (numpy.ndarray): Relevance score for each item
+        k (int): Number of items to pick
+        diversity (float): 0 ranks purely by relevance, 1 purely by novelty
+
+    Returns:
+        numpy.ndarray: Indices of the picked items, in pick order
+    """
+    k = min(k, len(relevance))
+    selected = np.empty(k, dtype=np.int64)
+    max_similarity = np.zeros(len(relevance), dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+
+    for i in range(k):
+        mmr_scores = (1 - diversity) * relevance - diversity * max_similarity
+        mmr_scores[~available] = -np.inf
+        pick = int(np.argmax(mmr_scores))
+        selected[i] = pick
+        available[pick] = False
+        np.maximum(max_similarity, vectors @ vectors[pick], out=max_similarity)
+
+    return selected
+
+
+def sample_diverse(weights, vectors, k, rng, diversity=0.0, shortlist_factor=5):
+    """
+    Draw k items by weighted sampling, optionally re-ranked for genre diversity.
+
+    With diversity > 0, a shortlist of k * shortlist_factor items is drawn by
+    weighted sampling and MMR then picks k of them, using the sampling order as
+    relevance so the result still varies between requests.
+
+    Args:
+        weights (numpy.ndarray): Non-negative sampling weight for each item
+        vectors (numpy.ndarray): Row-normalized feature vector for each item
+        k (int): Number of items to draw
+        rng (numpy.random.Generator): Source of randomness
+        diversity (float): Strength of the MMR re-ranking between 0 and 1
+        shortlist_factor (int): Shortlist size as a multiple of k
+
+    Returns:
+        numpy.ndarray: Indices of the drawn items
+    """
+    if diversity <= 0:
+        return weighted_sample(weights, k, rng)
+
+    shortlist = weighted_sample(weights, k * shortlist_factor, rng)
+    relevance = np.linspace(1.0, 0.0, num=len(shortlist), dtype=np.float32)
+    picked = mmr_rerank(vectors[shortlist], relevance, k, diversity)
+    return shortlist[picked]
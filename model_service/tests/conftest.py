@@ -0,0 +1,78 @@
+import importlib
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import build_model_dir
+
+# Small enough to build in a second, large enough for candidate pools and filters
+N_GAMES = 400
+# Rows of the raw dataset the training tests run on
+N_DATASET_ROWS = 120
+DATASET_GENRES = {
+    "Action": "shooter guns explosions combat",
+    "Puzzle": "logic riddles tiles brain",
+    "Racing": "cars speed tracks drift",
+    "Strategy": "armies empire tactics conquest",
+}
+
+
+@pytest.fixture(scope="session")
+def model_dir(tmp_path_factory):
+    """A model registry holding one synthetic version."""
+    model_dir = str(tmp_path_factory.mktemp("model"))
+    build_model_dir(model_dir, N_GAMES, train_sample=N_GAMES, n_estimators=10)
+    return model_dir
+
+
+@pytest.fixture(scope="session")
+def app_module(model_dir):
+    """The service module, imported to serve the synthetic registry."""
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setenv("MODEL_DIR", model_dir)
+    sys.modules.pop("app", None)
+    app = importlib.import_module("app")
+    yield app
+    monkeypatch.undo()
+
+
+def make_dataset(n_rows=N_DATASET_ROWS, seed=0):
+    """
+    Raw rows in the games_may2024_full.csv format, with a description that gives
+    away the primary genre.
+
+    Args:
+        n_rows (int): Number of games
+        seed (int): Random seed
+
+    Returns:
+        pandas.DataFrame: The dataset
+    """
+    rng = np.random.default_rng(seed)
+    genres = list(DATASET_GENRES)
+    primary = rng.integers(len(genres), size=n_rows)
+    second = rng.integers(len(genres), size=n_rows)
+    return pd.DataFrame(
+        {
+            "AppID": np.arange(10, 10 + 10 * n_rows, 10),
+            "name": [f"Game {i}" for i in range(n_rows)],
+            "short_description": [f"A {DATASET_GENRES[genres[g]]} game!" for g in primary],
+            "header_image": [f"https://example.com/{i}.jpg" for i in range(n_rows)],
+            "categories": rng.choice(["Single-player", "Multi-player,Co-op", None], size=n_rows),
+            "genres": [genres[p] if p == s else f"{genres[p]},{genres[s]}" for p, s in zip(primary, second)],
+            "tags": [f"{genres[g]},Indie" for g in primary],
+            "reviews": rng.choice(["Great fun, loved it", "Boring and broken", None], size=n_rows),
+            "estimated_owners": rng.choice(["0 - 20000", "20000 - 50000", "50000 - 100000"], size=n_rows),
+            "price": rng.random(n_rows).round(2),
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def dataset_csv(tmp_path_factory):
+    """Path of a small raw dataset, including a column training never reads."""
+    path = tmp_path_factory.mktemp("dataset") / "games_may2024_full.csv"
+    make_dataset().to_csv(path, index=False)
+    return str(path)
@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from inference import InferenceQueueFull
+
+
+@pytest.fixture
+def client(app_module):
+    return TestClient(app_module.app)
+
+
+@pytest.fixture
+def state(app_module):
+    return app_module.model_state
+
+
+def library(state, start=0, size=5):
+    return [int(appid) for appid in state.catalog_appids[start : start + size]]
+
+
+def test_recommend_returns_k_games_outside_the_library(client, state):
+    owned = library(state)
+    response = client.post("/recommend/", json={"appids": owned, "k": 4})
+
+    assert response.status_code == 200
+    recommendations = response.json()["recommendations"]
+    assert len(recommendations) == 4
+    assert not {game["appid"] for game in recommendations} & set(owned)
+
+
+def test_recommend_by_name(client, state):
+    response = client.post("/recommend/", json={"game_names": [state.catalog_names[0].upper()]})
+
+    assert response.status_code == 200
+
+
+def test_unknown_library_is_not_found(client):
+    response = client.post("/recommend/", json={"game_names": ["No such game"]})
+
+    assert response.status_code == 404
+
+
+def test_overloaded_inference_pool_returns_503(client, state, app_module, monkeypatch):
+    async def full(*args):
+        raise InferenceQueueFull()
+
+    monkeypatch.setattr(app_module.inference_executor, "run", full)
+    response = client.post("/recommend/", json={"appids": library(state, start=100)})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(app_module.RETRY_AFTER_SECONDS)
+
+
+def test_health_reports_the_inference_pool(client):
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json()["inference"]["kind"] == "thread"
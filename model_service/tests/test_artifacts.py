@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from artifacts import (
+    ModelBundle,
+    StringColumn,
+    convert_legacy_model_dir,
+    current_version,
+    list_versions,
+    publish_legacy_model_dir,
+    write_bundle,
+)
+
+
+@pytest.fixture
+def bundle_dir(tmp_path):
+    bundle_dir = str(tmp_path / "bundle")
+    write_bundle(
+        bundle_dir,
+        arrays={"probs": np.arange(12, dtype=np.float32).reshape(4, 3)},
+        columns={"name": ["Portal 2", "Café Sim", None, ""]},
+        models={"model": {"weights": [1, 2, 3]}},
+        metadata={"n_games": 4},
+    )
+    return bundle_dir
+
+
+def test_string_column_round_trip():
+    column = StringColumn.from_values(["a", "Ünïcode", None, "", "last"])
+
+    assert len(column) == 5
+    assert list(column) == ["a", "Ünïcode", "", "", "last"]
+    assert column[1] == "Ünïcode"
+
+
+def test_bundle_round_trip(bundle_dir):
+    bundle = ModelBundle(bundle_dir)
+
+    assert bundle.manifest["n_games"] == 4
+    assert bundle.arrays["probs"].tolist() == np.arange(12).reshape(4, 3).tolist()
+    assert list(bundle.columns["name"]) == ["Portal 2", "Café Sim", "", ""]
+    assert bundle.model("model") == {"weights": [1, 2, 3]}
+    assert bundle.model("model") is bundle.model("model")
+
+
+def test_bundle_arrays_are_memory_mapped(bundle_dir):
+    mapped = ModelBundle(bundle_dir).arrays["probs"]
+    private = ModelBundle(bundle_dir, mmap_mode=None).arrays["probs"]
+
+    assert isinstance(mapped.base, np.memmap)
+    assert not mapped.flags.writeable
+    assert not isinstance(private.base, np.memmap)
+
+
+def test_bundle_rejects_truncated_files(bundle_dir):
+    with open(os.path.join(bundle_dir, "probs.npy"), "r+b") as f:
+        f.truncate(10)
+
+    with pytest.raises(ValueError, match="unexpected size"):
+        ModelBundle(bundle_dir)
+
+
+def test_bundle_verify_detects_changed_files(bundle_dir):
+    path = os.path.join(bundle_dir, "probs.npy")
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+
+    ModelBundle(bundle_dir)
+    with pytest.raises(ValueError, match="checksum"):
+        ModelBundle(bundle_dir, verify=True)
+
+
+def test_missing_manifest_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="manifest.json"):
+        ModelBundle(str(tmp_path))
+
+
+def test_write_bundle_replaces_an_existing_bundle(bundle_dir):
+    write_bundle(bundle_dir, arrays={"other": np.zeros(2)}, columns={}, models={})
+
+    bundle = ModelBundle(bundle_dir)
+    assert list(bundle.arrays) == ["other"]
+    assert not os.path.exists(os.path.join(bundle_dir, "probs.npy"))
+    assert sorted(os.listdir(os.path.dirname(bundle_dir))) == ["bundle"]
+
+
+@pytest.fixture
+def legacy_model_dir(tmp_path):
+    """A model directory in the CSV and compressed pickle layout of older train.py versions."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import LabelEncoder
+
+    df = pd.DataFrame(
+        {
+            "AppID": [10, 20, 30, 40],
+            "name": ["Shooter", "Puzzle", "Racer", "Shooter 2"],
+            "short_description": ["", "", "", ""],
+            "header_image": ["a", "b", "c", "d"],
+            "combined_features": ["guns action", "puzzle logic", "cars speed", "guns war"],
+            "genres": ["Action,Indie", "Casual", "Racing", "Action"],
+            "primary_genre": ["Action", "Casual", "Racing", "Action"],
+        }
+    )
+    tfidf = TfidfVectorizer().fit(df["combined_features"])
+    label_encoder = LabelEncoder().fit(df["primary_genre"])
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(
+        tfidf.transform(df["combined_features"]), label_encoder.transform(df["primary_genre"])
+    )
+    df.to_csv(tmp_path / "games_may2024_cleaned.csv", index=False)
+    joblib.dump(tfidf, tmp_path / "tfidf.pkl", compress=3)
+    joblib.dump(model, tmp_path / "random_forest.pkl", compress=3)
+    joblib.dump(label_encoder, tmp_path / "label_encoder.pkl", compress=3)
+    return str(tmp_path)
+
+
+def test_convert_legacy_model_dir(legacy_model_dir, tmp_path):
+    manifest = convert_legacy_model_dir(legacy_model_dir, str(tmp_path / "converted"))
+
+    bundle = ModelBundle(str(tmp_path / "converted"))
+    assert manifest["n_games"] == 4
+    assert manifest["genre_classes"] == ["Action", "Casual", "Racing"]
+    assert bundle.arrays["catalog_probs"].shape == (4, 3)
+    assert bundle.arrays["appids"].tolist() == [10, 20, 30, 40]
+    assert list(bundle.columns["name"]) == ["Shooter", "Puzzle", "Racer", "Shooter 2"]
+
+
+def test_concurrent_workers_convert_a_legacy_model_dir_once(legacy_model_dir):
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        served = pool.map(publish_legacy_model_dir, [legacy_model_dir] * 4)
+
+    versions = list_versions(legacy_model_dir)
+    assert len(versions) == 1
+    assert current_version(legacy_model_dir) == versions[0]
+    assert {version for version, _ in served} == {versions[0]}
+
+
+def test_explicit_conversion_publishes_a_new_version(legacy_model_dir):
+    first, _ = publish_legacy_model_dir(legacy_model_dir)
+    second, _ = publish_legacy_model_dir(legacy_model_dir, replace_current=True)
+
+    assert first != second
+    assert list_versions(legacy_model_dir) == sorted([first, second])
+    assert current_version(legacy_model_dir) == second
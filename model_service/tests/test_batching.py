@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher, create_micro_batcher
+from inference import InferenceExecutor
+
+batches = []
+
+
+def double_all(items):
+    batches.append(list(items))
+    return [ValueError(f"bad item {item}") if item < 0 else item * 2 for item in items]
+
+
+def fail_batch(items):
+    raise RuntimeError("batch failed")
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor(workers=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def clear_batches():
+    batches.clear()
+
+
+def run_batcher(batcher, items):
+    async def main():
+        try:
+            return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+        finally:
+            await batcher.close()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_a_batch(executor):
+    results = run_batcher(MicroBatcher(double_all, executor, max_wait_ms=50), [1, 2, 3])
+
+    assert results == [2, 4, 6]
+    assert batches == [[1, 2, 3]]
+
+
+def test_batches_are_capped_at_max_batch_size(executor):
+    results = run_batcher(MicroBatcher(double_all, executor, max_batch_size=2, max_wait_ms=50), [1, 2, 3, 4, 5])
+
+    assert results == [2, 4, 6, 8, 10]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_a_failed_item_only_fails_its_own_request(executor):
+    results = run_batcher(MicroBatcher(double_all, executor, max_wait_ms=50), [1, -1, 3])
+
+    assert results[0] == 2 and results[2] == 6
+    assert isinstance(results[1], ValueError)
+
+
+def test_a_failed_batch_fails_all_its_requests(executor):
+    results = run_batcher(MicroBatcher(fail_batch, executor, max_wait_ms=50), [1, 2])
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_batching_is_opt_in(monkeypatch, executor):
+    monkeypatch.delenv("BATCHING_ENABLED", raising=False)
+    assert create_micro_batcher(double_all, executor) is None
+
+    monkeypatch.setenv("BATCHING_ENABLED", "true")
+    monkeypatch.setenv("BATCH_MAX_SIZE", "4")
+    batcher = create_micro_batcher(double_all, executor)
+    assert batcher.max_batch_size == 4
+
+
+def test_batched_scoring_matches_single_requests(app_module):
+    state = app_module.model_state
+    requests = [
+        app_module.GameRequest(appids=[int(appid) for appid in state.catalog_appids[start : start + 3]], seed=start)
+        for start in (0, 10, 20)
+    ]
+    requests.append(app_module.GameRequest(game_names=["No such game"]))
+
+    batched = app_module.compute_recommendations_batch([(state.version, request, set()) for request in requests])
+
+    for request, (recommendations, _, _) in zip(requests, batched):
+        single, _, _ = app_module.compute_recommendations(state.version, request, set())
+        assert recommendations == single
+    assert batched[-1][0] is None
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+import dataset
+from dataset import DATASET_DTYPES, SpilledDataset, read_dataset, rows_per_chunk, spill_dataset
+
+
+def prepare(chunk):
+    return chunk[["AppID", "name"]], chunk["short_description"].str.upper()
+
+
+def test_only_the_used_columns_are_read(dataset_csv):
+    df = read_dataset(dataset_csv)
+
+    assert list(df.columns) == list(DATASET_DTYPES)
+    assert df["AppID"].dtype == "int32"
+    assert isinstance(df["estimated_owners"].dtype, pd.CategoricalDtype)
+    assert list(read_dataset(dataset_csv, ["AppID", "name"]).columns) == ["AppID", "name"]
+
+
+def test_rows_per_chunk_follows_the_budget(dataset_csv):
+    small, large = rows_per_chunk(dataset_csv, 1 << 20), rows_per_chunk(dataset_csv, 8 << 20)
+
+    assert small >= dataset.MIN_CHUNK_ROWS
+    assert large > small
+    assert rows_per_chunk(dataset_csv, 1) == dataset.MIN_CHUNK_ROWS
+
+
+def test_spilled_chunks_match_the_dataset(dataset_csv, tmp_path):
+    spilled = spill_dataset(dataset_csv, str(tmp_path / "spill"), 50, prepare)
+    df = read_dataset(dataset_csv)
+
+    assert (spilled.n_chunks, spilled.n_rows) == (3, len(df))
+    pd.testing.assert_frame_equal(spilled.frame(), df[["AppID", "name"]])
+    assert list(spilled.texts()) == df["short_description"].str.upper().tolist()
+    rows, texts = next(spilled.text_chunks(order=[2]))
+    assert rows == slice(100, 120)
+    assert texts == df["short_description"].str.upper().tolist()[100:]
+
+
+def test_complete_spills_are_reused(dataset_csv, tmp_path):
+    directory = str(tmp_path / "spill")
+    spill_dataset(dataset_csv, directory, 50, prepare)
+
+    def fail(chunk):
+        raise AssertionError("the dataset was spilled again")
+
+    assert spill_dataset(dataset_csv, directory, 50, fail).n_rows == 120
+
+
+def test_incomplete_spills_are_redone(dataset_csv, tmp_path):
+    directory = str(tmp_path / "spill")
+    spill_dataset(dataset_csv, directory, 50, prepare)
+    os.remove(os.path.join(directory, "done.json"))
+    with pytest.raises(FileNotFoundError):
+        SpilledDataset(directory)
+
+    assert spill_dataset(dataset_csv, directory, 100, prepare).n_chunks == 2
+    assert len(os.listdir(directory)) == 5
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from genre_filter import GenreFilter, build_genre_bitmaps, filters_digest, split_genres
+
+GENRE_LISTS = split_genres(
+    ["Action, Indie", "Casual", None, "Action", "RPG,Indie", "", "Racing", "Casual,Indie", "RPG"]
+)
+
+
+@pytest.fixture
+def genre_filter():
+    names, bitmaps = build_genre_bitmaps(GENRE_LISTS)
+    return GenreFilter(names, bitmaps, len(GENRE_LISTS))
+
+
+def test_split_genres():
+    assert GENRE_LISTS[:3] == [["Action", "Indie"], ["Casual"], []]
+
+
+def test_bitmaps_are_packed_per_genre():
+    names, bitmaps = build_genre_bitmaps(GENRE_LISTS, names=["Indie", "Sports"])
+
+    assert names == ["Indie", "Sports"]
+    assert bitmaps.shape == (2, 2)
+    assert np.unpackbits(bitmaps[0], count=len(GENRE_LISTS)).nonzero()[0].tolist() == [0, 4, 7]
+    assert not bitmaps[1].any()
+
+
+def test_exclusion_mask_combines_included_and_excluded_genres(genre_filter):
+    assert genre_filter.exclusion_mask() is None
+    assert np.flatnonzero(~genre_filter.exclusion_mask(["action", "RPG"])).tolist() == [0, 3, 4, 8]
+    assert np.flatnonzero(genre_filter.exclusion_mask(exclude_genres=["Indie"])).tolist() == [0, 4, 7]
+    assert np.flatnonzero(~genre_filter.exclusion_mask(["Indie"], ["RPG"])).tolist() == [0, 7]
+
+
+def test_unknown_genres_are_reported(genre_filter):
+    assert genre_filter.unknown(["indie", "Sports"]) == ["Sports"]
+
+
+def test_concatenated_filters_match_a_single_filter(genre_filter):
+    names = genre_filter.names
+    parts = [
+        GenreFilter(names, build_genre_bitmaps(lists, names)[1], len(lists))
+        for lists in (GENRE_LISTS[:5], GENRE_LISTS[5:])
+    ]
+
+    joined = GenreFilter.concatenate(parts)
+
+    assert joined.n_games == genre_filter.n_games
+    np.testing.assert_array_equal(
+        joined.exclusion_mask(["Indie"], ["RPG"]), genre_filter.exclusion_mask(["Indie"], ["RPG"])
+    )
+
+
+def test_filters_digest_ignores_order_and_case():
+    assert filters_digest([], []) == ""
+    assert filters_digest(["RPG", "action"], []) == filters_digest(["Action", "rpg"], [])
+    assert filters_digest(["RPG"], []) != filters_digest([], ["RPG"])
+
+
+def test_recommendations_respect_the_genre_filter(app_module):
+    state = app_module.model_state
+    genres = dict(zip(state.catalog_appids.tolist(), state.bundle.columns["primary_genre"]))
+    appids = [int(appid) for appid in state.catalog_appids[60:65]]
+    client = TestClient(app_module.app)
+
+    included = client.post("/recommend/", json={"appids": appids, "genres": ["action"], "k": 10})
+    excluded = client.post("/recommend/", json={"appids": appids, "exclude_genres": ["Action"], "k": 10})
+
+    assert {genres[game["appid"]] for game in included.json()["recommendations"]} == {"Action"}
+    assert "Action" not in {genres[game["appid"]] for game in excluded.json()["recommendations"]}
+    assert included.json()["cursor"] != excluded.json()["cursor"]
+
+
+def test_unknown_genres_are_rejected(app_module):
+    appids = [int(appid) for appid in app_module.model_state.catalog_appids[:3]]
+    response = TestClient(app_module.app).post("/recommend/", json={"appids": appids, "genres": ["Knitting"]})
+
+    assert response.status_code == 422
+    assert "Knitting" in response.json()["detail"]
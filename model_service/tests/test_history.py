@@ -0,0 +1,135 @@
+import os
+import subprocess
+import sys
+
+import fakeredis
+import pytest
+
+import history
+from history import MAX_RECENT_GAMES, InMemoryHistoryStore, RedisHistoryStore, games_digest
+
+COOLDOWN = 100
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(history.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, redis_client):
+    if request.param == "memory":
+        return InMemoryHistoryStore(cooldown=COOLDOWN)
+    return RedisHistoryStore(client=redis_client, cooldown=COOLDOWN)
+
+
+def test_recent_games_are_returned(store, clock):
+    store.add("user", [10, 20])
+    store.add("user", [30])
+
+    assert store.get_recent("user") == {10, 20, 30}
+    assert store.get_recent("other") == set()
+
+
+def test_games_expire_after_the_cooldown(store, clock):
+    store.add("user", [10])
+    clock.now += COOLDOWN / 2
+    store.add("user", [20])
+
+    clock.now += COOLDOWN / 2 + 1
+    assert store.get_recent("user") == {20}
+
+    clock.now += COOLDOWN
+    assert store.get_recent("user") == set()
+
+
+def test_only_the_latest_games_are_kept(store, clock):
+    for appid in range(MAX_RECENT_GAMES + 5):
+        clock.now += 1
+        store.add("user", [appid])
+
+    assert store.get_recent("user") == set(range(5, MAX_RECENT_GAMES + 5))
+
+
+def test_recommending_a_game_again_renews_it(store, clock):
+    for appid in range(MAX_RECENT_GAMES):
+        clock.now += 1
+        store.add("user", [appid])
+    clock.now += 1
+    store.add("user", [0])
+    clock.now += 1
+    store.add("user", [MAX_RECENT_GAMES])
+
+    recent = store.get_recent("user")
+    assert 0 in recent
+    assert 1 not in recent
+    assert len(recent) == MAX_RECENT_GAMES
+
+
+def test_redis_key_ttl_is_refreshed_on_add(redis_client):
+    store = RedisHistoryStore(client=redis_client, cooldown=COOLDOWN, key_prefix="test:")
+    store.add("user", [10])
+    assert 0 < redis_client.ttl("test:user") <= COOLDOWN
+
+    # Close to expiry, a new recommendation extends the whole key again
+    redis_client.expire("test:user", 5)
+    store.add("user", [20])
+    assert redis_client.ttl("test:user") > 5
+
+    store.add("user", [])
+    assert redis_client.zcard("test:user") == 2
+
+
+def test_redis_history_is_shared_between_stores(redis_client):
+    RedisHistoryStore(client=redis_client).add("user", [10])
+
+    assert RedisHistoryStore(client=redis_client).get_recent("user") == {10}
+
+
+def test_in_memory_store_evicts_least_recent_users(clock):
+    store = InMemoryHistoryStore(max_users=2, cooldown=COOLDOWN)
+    store.add("a", [1])
+    store.add("b", [2])
+    store.get_recent("a")
+    store.add("c", [3])
+
+    assert store.get_recent("a") == {1}
+    assert store.get_recent("b") == set()
+    assert store.get_recent("c") == {3}
+
+
+def test_games_digest_ignores_order():
+    assert games_digest(["b", "a"], [2, 1]) == games_digest(["a", "b"], [1, 2])
+    assert games_digest(["a"]) != games_digest(["a"], [1])
+
+
+def test_games_digest_is_identical_across_processes():
+    code = "from history import games_digest; print(games_digest(['Portal 2', 'Dota 2'], [620, 570]))"
+    digests = set()
+    for hash_seed in ["1", "2"]:
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env={**os.environ, "PYTHONHASHSEED": hash_seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        digests.add(result.stdout.strip())
+
+    assert digests == {games_digest(["Dota 2", "Portal 2"], [570, 620])}
@@ -0,0 +1,112 @@
+import asyncio
+import operator
+import threading
+import time
+
+import pytest
+
+from inference import InferenceExecutor, InferenceQueueFull, create_inference_executor
+
+
+def test_thread_pool_runs_off_the_event_loop():
+    executor = InferenceExecutor(workers=2)
+
+    async def main():
+        return await executor.run(threading.get_ident)
+
+    try:
+        assert asyncio.run(main()) != threading.get_ident()
+        assert executor.stats()["completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_process_pool_runs_module_level_functions():
+    executor = InferenceExecutor(kind="process", workers=1)
+    try:
+        assert asyncio.run(executor.run(operator.add, 2, 3)) == 5
+    finally:
+        executor.shutdown()
+
+
+def test_event_loop_stays_responsive_while_inference_runs():
+    executor = InferenceExecutor(workers=1)
+
+    async def main():
+        work = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        ticked = time.perf_counter() - start
+        await work
+        return ticked
+
+    try:
+        assert asyncio.run(main()) < 0.2
+    finally:
+        executor.shutdown()
+
+
+def test_requests_beyond_the_queue_are_rejected():
+    executor = InferenceExecutor(workers=1, queue_size=1)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        stats = executor.stats()
+        with pytest.raises(InferenceQueueFull):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(running, queued)
+        return stats
+
+    try:
+        busy = asyncio.run(main())
+        assert busy["pending"] == 2
+        assert busy["queue_depth"] == 1
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["pending"] == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_cancelled_requests_keep_their_slot_until_the_job_ends():
+    executor = InferenceExecutor(workers=1, queue_size=0)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        await asyncio.sleep(0.05)
+        # The job still occupies the only worker
+        with pytest.raises(InferenceQueueFull):
+            await asyncio.wait_for(executor.run(release.wait), 1)
+        release.set()
+        await asyncio.sleep(0.05)
+        return await executor.run(lambda: "done")
+
+    try:
+        assert asyncio.run(main()) == "done"
+        assert executor.stats()["pending"] == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_create_inference_executor_reads_the_environment(monkeypatch):
+    monkeypatch.setenv("INFERENCE_WORKERS", "3")
+    monkeypatch.setenv("INFERENCE_QUEUE_SIZE", "7")
+    executor = create_inference_executor()
+    try:
+        assert (executor.kind, executor.workers, executor.queue_size) == ("thread", 3, 7)
+    finally:
+        executor.shutdown()
+
+    monkeypatch.setenv("INFERENCE_EXECUTOR", "fibers")
+    with pytest.raises(ValueError):
+        create_inference_executor()
@@ -0,0 +1,102 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from artifacts import current_version, list_segments, parse_segmented_version, segmented_version, version_dir
+from ingest import ingest
+from model_state import ModelState
+
+
+@pytest.fixture
+def registry(model_dir, tmp_path):
+    """Private copy of the registry, so segments never reach the app under test."""
+    copy = str(tmp_path / "model")
+    shutil.copytree(model_dir, copy)
+    return copy
+
+
+@pytest.fixture
+def base(registry):
+    version = current_version(registry)
+    return version, ModelState(version_dir(registry, version), version)
+
+
+def write_rows(path, appids, names):
+    pd.DataFrame(
+        {
+            "AppID": appids,
+            "name": names,
+            "short_description": [f"About {name}" for name in names],
+            "header_image": [f"https://example.com/{appid}.jpg" for appid in appids],
+            "categories": "Single-player",
+            "genres": "Action,Indie",
+            "tags": "Shooter,Fast",
+        }
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+def test_segmented_versions_round_trip():
+    assert segmented_version("20240501-120000", 0) == "20240501-120000"
+    assert parse_segmented_version(segmented_version("20240501-120000", 2)) == ("20240501-120000", 2)
+    assert parse_segmented_version("20240501-120000") == ("20240501-120000", 0)
+
+
+def test_ingested_games_are_served_with_the_version(registry, base, tmp_path):
+    version, previous = base
+    replaced = int(previous.catalog_appids[7])
+    csv = write_rows(tmp_path / "new.csv", [9_000_001, 9_000_002, replaced], ["Brand New", "Second New", "Renamed"])
+
+    segment_dir, n_rows = ingest(registry, csv, n_jobs=1)
+
+    assert n_rows == 3
+    assert list_segments(version_dir(registry, version)) == [segment_dir]
+    state = ModelState(version_dir(registry, version), version)
+    state.validate()
+    n_games = len(previous.catalog_appids)
+    assert state.version == segmented_version(version, 1)
+    assert len(state.catalog) == n_games + 3
+    assert state.catalog_lookup.rows_for_names(["brand new"]).tolist() == [n_games]
+    # The re-ingested game resolves to its new row only, by AppID and by name
+    assert state.catalog_lookup.rows_for_appids([replaced]).tolist() == [n_games + 2]
+    assert state.catalog_lookup.rows_for_names(["Renamed"]).tolist() == [n_games + 2]
+    assert not len(state.catalog_lookup.rows_for_names([previous.catalog_names[7]]))
+    assert state.retired[7] and state.retired.sum() == 1
+    assert state.genre_filter.n_games == n_games + 3
+
+
+def test_unchanged_rows_are_skipped(registry, tmp_path):
+    csv = write_rows(tmp_path / "new.csv", [9_000_001], ["Brand New"])
+    ingest(registry, csv, n_jobs=1)
+
+    assert ingest(registry, csv, n_jobs=1) is None
+
+
+def test_extend_only_loads_new_segments(registry, base, tmp_path):
+    version, previous = base
+    ingest(registry, write_rows(tmp_path / "first.csv", [9_000_001], ["First"]), n_jobs=1)
+    loaded = ModelState(version_dir(registry, version), version)
+    ingest(registry, write_rows(tmp_path / "second.csv", [9_000_002, 9_000_003], ["Second", "Third"]), n_jobs=1)
+
+    extended = loaded.extend()
+
+    assert extended.version == segmented_version(version, 2)
+    assert extended.segments[0] is loaded.segments[0]
+    assert len(extended.catalog) == len(previous.catalog) + 3
+    # The state it was extended from keeps serving its own rows
+    assert len(loaded.catalog) == len(previous.catalog) + 1
+    assert extended.extend() is extended
+    rows = np.arange(len(previous.catalog))
+    np.testing.assert_array_equal(extended.catalog.rows(rows), previous.catalog.rows(rows))
+
+
+def test_n_segments_loads_an_earlier_view(registry, base, tmp_path):
+    version, previous = base
+    ingest(registry, write_rows(tmp_path / "new.csv", [9_000_001], ["First"]), n_jobs=1)
+
+    state = ModelState(version_dir(registry, version), version, n_segments=0)
+
+    assert state.version == version
+    assert len(state.catalog) == len(previous.catalog)
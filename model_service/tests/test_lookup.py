@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from lookup import CatalogLookup, normalize_name
+
+
+@pytest.fixture
+def lookup():
+    names = ["Portal 2", "Half-Life", "Dota 2", "Portal 2", "Stardew  Valley"]
+    appids = np.array([620, 70, 570, 621, 413150])
+    return CatalogLookup.build(names, appids)
+
+
+def test_normalize_name_ignores_case_and_extra_whitespace():
+    assert normalize_name("  Stardew   VALLEY ") == "stardew valley"
+    assert normalize_name("Straße") == normalize_name("STRASSE")
+
+
+def test_rows_for_names(lookup):
+    assert lookup.rows_for_names(["half-life", "DOTA 2"]).tolist() == [1, 2]
+    assert lookup.rows_for_names(["stardew valley"]).tolist() == [4]
+    assert lookup.rows_for_names(["Unknown game"]).tolist() == []
+    assert lookup.rows_for_names([]).tolist() == []
+
+
+def test_rows_for_names_returns_duplicate_catalog_entries(lookup):
+    assert lookup.rows_for_names(["Portal 2", "portal 2"]).tolist() == [0, 3]
+
+
+def test_rows_for_appids(lookup):
+    assert lookup.rows_for_appids([413150, 70, 999]).tolist() == [1, 4]
+    assert lookup.rows_for_appids([]).tolist() == []
+
+
+def test_lookup_survives_a_round_trip_through_its_arrays(lookup):
+    restored = CatalogLookup(**lookup.to_arrays())
+
+    assert restored.rows_for_names(["Portal 2"]).tolist() == [0, 3]
+    assert restored.rows_for_appids([570]).tolist() == [2]
@@ -0,0 +1,88 @@
+from fastapi.testclient import TestClient
+
+from metrics import Histogram, MetricsRegistry, StageTimer, server_timing_header
+
+
+def test_registry_renders_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests by status", ["status"])
+    load = registry.gauge("load", "Current load")
+    requests.inc(status=200)
+    requests.inc(2, status=200)
+    load.set(0.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests by status",
+        "# TYPE requests_total counter",
+        'requests_total{status="200"} 3',
+        "# HELP load Current load",
+        "# TYPE load gauge",
+        "load 0.5",
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert histogram.render()[2:] == [
+        'latency_bucket{le="0.1"} 1',
+        'latency_bucket{le="1.0"} 3',
+        'latency_bucket{le="+Inf"} 4',
+        "latency_sum 4.25",
+        "latency_count 4",
+    ]
+
+
+def test_collectors_run_before_each_render():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("scrapes", "Number of scrapes")
+    scrapes = []
+    registry.on_collect(lambda: (scrapes.append(1), gauge.set(len(scrapes))))
+
+    registry.render()
+    assert "scrapes 2" in registry.render()
+
+
+def test_stage_timer_accumulates_stages():
+    timer = StageTimer()
+    with timer.stage("profile"):
+        pass
+    timer.add("profile", 0.5)
+    timer.record("library_size", 3)
+
+    assert timer.stages["profile"] >= 0.5
+    assert timer.values == {"library_size": 3}
+    assert server_timing_header({"profile": 0.0012, "total": 0.5}) == "profile;dur=1.200, total;dur=500.000"
+
+
+def test_metrics_endpoint_counts_recommend_requests(app_module):
+    client = TestClient(app_module.app)
+    appids = [int(appid) for appid in app_module.model_state.catalog_appids[:3]]
+    client.post("/recommend/", json={"appids": appids})
+    client.post("/recommend/", json={"game_names": ["No such game"]})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'gyg_recommend_requests_total{status="200"}' in body
+    assert 'gyg_recommend_requests_total{status="404"}' in body
+    assert 'gyg_recommend_stage_duration_seconds_count{stage="select"}' in body
+    assert f'gyg_model_version_info{{version="{app_module.model_state.version}"}} 1' in body
+    assert 'gyg_process_memory_bytes{type="rss"}' in body
+
+
+def test_server_timing_header_is_opt_in(app_module, monkeypatch):
+    client = TestClient(app_module.app)
+    appids = [int(appid) for appid in app_module.model_state.catalog_appids[3:6]]
+
+    assert "Server-Timing" not in client.post("/recommend/", json={"appids": appids}).headers
+
+    monkeypatch.setattr(app_module, "SERVER_TIMING", True)
+    header = client.post("/recommend/", json={"appids": appids}).headers["Server-Timing"]
+    stages = dict(part.split(";dur=") for part in header.split(", "))
+    assert {"select", "total"} <= set(stages)
+    assert all(float(duration) >= 0 for duration in stages.values())
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from models import (
+    INCREMENTAL_BACKENDS,
+    MODEL_BACKENDS,
+    distill,
+    new_incremental_model,
+    predict_genre_proba,
+    train_genre_model,
+    train_random_forest,
+)
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    """Three genres, each with its own block of words plus some shared noise."""
+    rng = np.random.default_rng(0)
+    labels = np.repeat(np.arange(3), 40)
+    dense = rng.random((len(labels), 30)) * 0.2
+    for genre in range(3):
+        dense[labels == genre, genre * 10 : genre * 10 + 5] += 1
+    return sp.csr_matrix(dense), labels
+
+
+@pytest.mark.parametrize("backend", MODEL_BACKENDS)
+def test_backends_learn_the_genres(dataset, backend):
+    features, labels = dataset
+    params = {"n_estimators": 20, "n_jobs": 1} if backend == "random_forest" else {}
+    model = train_genre_model(backend, features, labels, **params)
+
+    probs = model.predict_proba(features)
+    assert probs.shape == (len(labels), 3)
+    np.testing.assert_allclose(probs.sum(axis=1), 1, rtol=1e-6)
+    assert np.mean(probs.argmax(axis=1) == labels) > 0.95
+
+
+def test_distilled_student_follows_its_teacher(dataset):
+    features, labels = dataset
+    teacher = train_random_forest(features, labels, n_estimators=20, n_jobs=1)
+    student = distill(teacher, features)
+
+    assert list(student.classes_) == list(teacher.classes_)
+    agreement = np.mean(student.predict(features) == teacher.predict(features))
+    assert agreement > 0.95
+
+
+@pytest.mark.parametrize("backend", INCREMENTAL_BACKENDS)
+def test_incremental_backends_fit_chunk_by_chunk(dataset, backend):
+    features, labels = dataset
+    model = new_incremental_model(backend)
+    order = np.random.default_rng(1).permutation(len(labels))
+    for chunk in np.array_split(order, 4):
+        model.partial_fit(features[chunk], labels[chunk], classes=np.arange(3))
+
+    assert np.mean(model.predict(features) == labels) > 0.9
+
+
+def test_unknown_backends_are_rejected(dataset):
+    with pytest.raises(ValueError):
+        train_genre_model("xgboost", *dataset)
+    with pytest.raises(ValueError):
+        new_incremental_model("random_forest")
+
+
+def test_probabilities_cover_genres_the_model_never_saw(dataset):
+    features, labels = dataset
+    seen = labels != 1
+    model = train_genre_model("logistic", features[seen], labels[seen])
+
+    probs = predict_genre_proba(model, features, n_classes=4)
+    assert probs.dtype == np.float32
+    assert probs.shape == (len(labels), 4)
+    assert not probs[:, [1, 3]].any()
+    np.testing.assert_allclose(probs.sum(axis=1), 1, rtol=1e-5)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import neighbors
+from neighbors import build_neighbor_graph, search_neighbors, update_neighbor_graph
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).dirichlet(np.ones(6), size=60).astype(np.float32)
+
+
+def brute_force(vectors, n_neighbors, exclude=()):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarities = unit @ unit.T
+    np.fill_diagonal(similarities, -np.inf)
+    similarities[:, list(exclude)] = -np.inf
+    return np.argsort(-similarities, axis=1, kind="stable")[:, :n_neighbors]
+
+
+def test_graph_holds_the_most_similar_games_best_first(vectors):
+    graph = build_neighbor_graph(vectors, n_neighbors=5, n_jobs=1)
+
+    assert graph["neighbor_rows"].dtype == np.int32
+    assert graph["neighbor_scores"].dtype == np.float16
+    np.testing.assert_array_equal(graph["neighbor_rows"], brute_force(vectors, 5))
+    assert np.all(np.diff(graph["neighbor_scores"].astype(np.float32), axis=1) <= 0)
+
+
+def test_chunked_search_matches_a_single_block(vectors, monkeypatch):
+    expected = build_neighbor_graph(vectors, n_neighbors=5, n_jobs=1)
+    monkeypatch.setattr(neighbors, "CHUNK_ELEMENTS", len(vectors) * 7)
+    chunked = build_neighbor_graph(vectors, n_neighbors=5, n_jobs=3)
+
+    np.testing.assert_array_equal(chunked["neighbor_rows"], expected["neighbor_rows"])
+
+
+def test_small_catalogs_pad_the_graph(vectors):
+    graph = build_neighbor_graph(vectors[:3], n_neighbors=5, n_jobs=1)
+
+    assert graph["neighbor_rows"].shape == (3, 5)
+    assert np.all(graph["neighbor_rows"][:, 2:] == -1)
+    assert np.all(graph["neighbor_scores"][:, 2:] == 0)
+
+
+def test_search_neighbors_skips_excluded_rows(vectors):
+    exclude_mask = np.zeros(len(vectors), dtype=bool)
+    exclude_mask[[1, 2, 3]] = True
+
+    graph = search_neighbors(vectors, [0, 10], n_neighbors=5, n_jobs=1, exclude_mask=exclude_mask)
+
+    np.testing.assert_array_equal(graph["neighbor_rows"], brute_force(vectors, 5, exclude=[1, 2, 3])[[0, 10]])
+
+
+def test_updated_graph_matches_a_full_build(vectors):
+    appids = np.arange(100, 100 + len(vectors))
+    previous = {
+        "appids": appids[:50],
+        "catalog_probs": vectors[:50],
+        **build_neighbor_graph(vectors[:50], n_neighbors=5, n_jobs=1),
+    }
+    # Ten games appended, one changed and one removed
+    changed = vectors.copy()
+    changed[7] = changed[7][::-1]
+    keep = np.arange(len(vectors)) != 20
+
+    updated = update_neighbor_graph(changed[keep], appids[keep], previous, n_neighbors=5, n_jobs=1)
+
+    full = build_neighbor_graph(changed[keep], n_neighbors=5, n_jobs=1)
+    np.testing.assert_array_equal(updated["neighbor_rows"], full["neighbor_rows"])
+    np.testing.assert_array_equal(updated["neighbor_scores"], full["neighbor_scores"])
+
+
+@pytest.fixture
+def graph_state(app_module, monkeypatch):
+    state = app_module.model_state
+    graph = build_neighbor_graph(state.catalog.rows(np.arange(len(state.catalog))), n_neighbors=20, n_jobs=1)
+    monkeypatch.setattr(state, "neighbor_parts", [(0, graph["neighbor_rows"], graph["neighbor_scores"])])
+    return state
+
+
+def test_similar_returns_the_precomputed_neighbours(app_module, graph_state):
+    appid = int(graph_state.catalog_appids[5])
+    response = TestClient(app_module.app).get(f"/similar/{appid}", params={"k": 4})
+
+    assert response.status_code == 200
+    assert response.headers["X-Model-Version"] == graph_state.version
+    similar = response.json()["similar"]
+    rows, _ = graph_state.neighbors(5, 4)
+    assert [game["appid"] for game in similar] == [int(graph_state.catalog_appids[row]) for row in rows]
+    assert appid not in {game["appid"] for game in similar}
+    scores = [game["similarity"] for game in similar]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_similar_rejects_unknown_games_and_missing_graphs(app_module, monkeypatch):
+    client = TestClient(app_module.app)
+    assert client.get("/similar/999999999").status_code == 404
+    assert client.get(f"/similar/{int(app_module.model_state.catalog_appids[0])}", params={"k": 0}).status_code == 422
+
+    monkeypatch.setattr(app_module.model_state, "neighbor_parts", [])
+    response = client.get(f"/similar/{int(app_module.model_state.catalog_appids[0])}")
+    assert response.status_code == 404
+    assert "neighbour graph" in response.json()["detail"]
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from dataset import spill_dataset
+from models import INCREMENTAL_BACKENDS, predict_genre_proba
+from out_of_core import hashing_vectorizer, predict_in_chunks, train_incremental
+from preprocessing import combine_features, primary_genres
+
+
+def prepare(chunk):
+    rows = chunk.assign(primary_genre=primary_genres(chunk["genres"]))[["AppID", "primary_genre"]]
+    return rows, combine_features(chunk)
+
+
+@pytest.fixture(scope="module")
+def spilled(dataset_csv, tmp_path_factory):
+    return spill_dataset(dataset_csv, str(tmp_path_factory.mktemp("spill")), 40, prepare)
+
+
+@pytest.fixture(scope="module")
+def labels(spilled):
+    genres = spilled.frame()["primary_genre"]
+    classes = sorted(genres.unique())
+    return np.searchsorted(classes, genres), len(classes)
+
+
+@pytest.mark.parametrize("backend", INCREMENTAL_BACKENDS)
+def test_incremental_backends_learn_the_genres(spilled, labels, backend):
+    genre_labels, n_classes = labels
+    vectorizer = hashing_vectorizer(n_features=1 << 12)
+    model = train_incremental(backend, vectorizer, spilled, genre_labels, n_classes, epochs=3)
+
+    probs = predict_in_chunks(model, vectorizer, spilled, n_classes)
+
+    assert probs.shape == (120, n_classes)
+    assert np.mean(probs.argmax(axis=1) == genre_labels) > 0.9
+
+
+def test_chunked_prediction_matches_a_single_pass(spilled, labels):
+    genre_labels, n_classes = labels
+    vectorizer = hashing_vectorizer(n_features=1 << 12)
+    model = train_incremental("sgd", vectorizer, spilled, genre_labels, n_classes, epochs=1)
+
+    expected = predict_genre_proba(model, vectorizer.transform(list(spilled.texts())), n_classes)
+    np.testing.assert_allclose(predict_in_chunks(model, vectorizer, spilled, n_classes), expected, rtol=1e-6)
+
+
+def test_training_is_reproducible(spilled, labels):
+    genre_labels, n_classes = labels
+    vectorizer = hashing_vectorizer(n_features=1 << 12)
+    first = train_incremental("sgd", vectorizer, spilled, genre_labels, n_classes, epochs=2, random_state=3)
+    second = train_incremental("sgd", vectorizer, spilled, genre_labels, n_classes, epochs=2, random_state=3)
+
+    np.testing.assert_array_equal(first.coef_, second.coef_)
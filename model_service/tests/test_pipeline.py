@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+
+from pipeline import StageRunner, file_digest
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+def stage(calls, name, value):
+    def compute():
+        calls.append(name)
+        return value
+
+    return compute
+
+
+def run_stages(checkpoint_dir, calls, dataset="data-v1", params=None):
+    runner = StageRunner(checkpoint_dir)
+    runner.run("hash", stage(calls, "hash", dataset))
+    first = runner.run("first", stage(calls, "first", [1, 2]), inputs=[dataset], params=params)
+    second = runner.run("second", stage(calls, "second", {"total": sum(first)}), inputs=["first"])
+    return runner, second
+
+
+def test_stages_are_loaded_when_their_inputs_are_unchanged(tmp_path, calls):
+    run_stages(str(tmp_path), calls)
+    runner, result = run_stages(str(tmp_path), calls)
+
+    assert result == {"total": 3}
+    # Stages without inputs always run
+    assert calls == ["hash", "first", "second", "hash"]
+    assert runner.stages["second"]["cached"] is True
+    assert runner.stages["hash"]["key"] is None
+
+
+def test_changed_inputs_rerun_every_later_stage(tmp_path, calls):
+    run_stages(str(tmp_path), calls)
+    calls.clear()
+
+    run_stages(str(tmp_path), calls, dataset="data-v2")
+    assert calls == ["hash", "first", "second"]
+    calls.clear()
+
+    run_stages(str(tmp_path), calls, dataset="data-v2", params={"max_features": 10})
+    assert calls == ["hash", "first", "second"]
+
+
+def test_old_checkpoints_are_pruned(tmp_path, calls):
+    for version in range(4):
+        run_stages(str(tmp_path), calls, dataset=f"data-v{version}")
+
+    assert len(os.listdir(tmp_path / "first")) == 2
+
+
+def test_unreadable_checkpoints_are_recomputed(tmp_path, calls):
+    run_stages(str(tmp_path), calls)
+    for name in os.listdir(tmp_path / "second"):
+        (tmp_path / "second" / name).write_bytes(b"not a pickle")
+    calls.clear()
+
+    _, result = run_stages(str(tmp_path), calls)
+
+    assert result == {"total": 3}
+    assert calls == ["hash", "second"]
+
+
+def test_without_a_checkpoint_dir_every_stage_runs(calls):
+    run_stages(None, calls)
+    run_stages(None, calls)
+
+    assert calls == ["hash", "first", "second"] * 2
+
+
+def test_run_report(tmp_path, calls):
+    runner, _ = run_stages(str(tmp_path), calls)
+    path = str(tmp_path / "runs" / "report.json")
+
+    report = runner.write_report(path, version="v1")
+
+    with open(path) as f:
+        assert json.load(f) == report
+    assert report["version"] == "v1"
+    assert list(report["stages"]) == ["hash", "first", "second"]
+    assert set(report["stages"]["first"]) == {"seconds", "cached", "key", "peak_rss_mb"}
+
+
+def test_file_digest_follows_the_content(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,2\n")
+    digest = file_digest(str(path))
+
+    assert digest == file_digest(str(path))
+    path.write_text("a,b\n1,3\n")
+    assert digest != file_digest(str(path))
@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from pool_cache import CandidatePool, CandidatePoolCache, create_pool_cache, parse_pool_key, pool_key
+
+
+def make_pool(size=10):
+    return CandidatePool(np.arange(size), np.linspace(1, 0, size, dtype=np.float32))
+
+
+@pytest.fixture
+def client(app_module):
+    return TestClient(app_module.app)
+
+
+@pytest.fixture
+def appids(app_module):
+    return [int(appid) for appid in app_module.model_state.catalog_appids[40:45]]
+
+
+def test_pool_keys_round_trip():
+    key = pool_key("20240501-120000", "abc", "def")
+
+    assert parse_pool_key(key) == ("20240501-120000", "abc", "def")
+    assert parse_pool_key(pool_key("v1", "abc")) == ("v1", "abc", "")
+    assert parse_pool_key("garbage") == ("", "", "")
+
+
+def test_cache_evicts_the_least_recently_used_pool():
+    cache = CandidatePoolCache(max_entries=2)
+    cache.put("a", make_pool())
+    cache.put("b", make_pool())
+    cache.get("a")
+    cache.put("c", make_pool())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats() == {"entries": 2, "bytes": 2 * make_pool().nbytes, "hits": 3, "misses": 1}
+
+
+def test_cache_expires_pools(monkeypatch):
+    cache = CandidatePoolCache(ttl=10)
+    cache.put("a", make_pool())
+    now = time.time()
+    monkeypatch.setattr("pool_cache.time.time", lambda: now + 11)
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_create_pool_cache_reads_the_environment(monkeypatch):
+    monkeypatch.delenv("POOL_CACHE_SIZE", raising=False)
+    assert create_pool_cache().max_entries == 1000
+
+    monkeypatch.setenv("POOL_CACHE_SIZE", "0")
+    assert create_pool_cache() is None
+
+
+def test_request_without_games_or_cursor_is_not_found(client):
+    assert client.post("/recommend/", json={}).status_code == 404
+
+
+@pytest.mark.parametrize("cursor", ["garbage", pool_key("old-version", "abc"), pool_key("{version}", "abc")])
+def test_unknown_cursor_alone_has_expired(client, app_module, cursor):
+    cursor = cursor.format(version=app_module.model_state.version)
+
+    assert client.post("/recommend/", json={"cursor": cursor}).status_code == 410
+
+
+def test_cursor_pages_through_the_cached_pool(client, app_module, appids):
+    first = client.post("/recommend/", json={"appids": appids, "user_id": "pager", "k": 3}).json()
+    cursor = first["cursor"]
+    assert cursor.startswith(f"{app_module.model_state.version}:")
+
+    second = client.post("/recommend/", json={"cursor": cursor, "user_id": "pager", "k": 3})
+
+    assert second.status_code == 200
+    assert second.json()["cursor"] == cursor
+    shown = {game["appid"] for game in first["recommendations"]}
+    assert not shown & {game["appid"] for game in second.json()["recommendations"]}
+
+
+def test_cursor_with_games_rebuilds_the_pool_on_another_worker(client, app_module, appids, monkeypatch):
+    cursor = client.post("/recommend/", json={"appids": appids}).json()["cursor"]
+    # A worker that never saw the library
+    other_worker_cache = CandidatePoolCache()
+    monkeypatch.setattr(app_module, "pool_cache", other_worker_cache)
+
+    assert client.post("/recommend/", json={"cursor": cursor}).status_code == 410
+    response = client.post("/recommend/", json={"cursor": cursor, "appids": appids})
+
+    assert response.status_code == 200
+    assert response.json()["cursor"] == cursor
+    assert other_worker_cache.get(cursor) is not None
@@ -0,0 +1,55 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import combine_features, estimated_owners, primary_genres, review_sentiment
+
+ROWS = pd.DataFrame(
+    {
+        "short_description": ["Fast & furious — racing™!", None, "Puzzles; riddles: 100% fun?", "Café"],
+        "categories": ["Single-player", "Multi-player,Co-op", None, "Single-player"],
+        "genres": ["Racing,Indie", "Action", None, " RPG , Strategy"],
+        "tags": ["Cars,Speed", None, "Logic", "Story-Rich"],
+        "reviews": ["Great fun, loved it", None, "Boring and broken", ""],
+        "estimated_owners": ["0 - 20000", "20000 - 50000", None, "lots"],
+    }
+)
+
+
+def reference_features(df):
+    """Row-by-row preprocessing as train.py originally did it."""
+    text = df["short_description"].fillna("")
+    for column in ["categories", "genres", "tags"]:
+        text = text + " " + df[column].fillna("")
+    return text.apply(lambda x: re.sub(r"[^a-zA-Z0-9\s.,!?\';:-]", "", x))
+
+
+def test_combined_features_match_the_row_by_row_version():
+    pd.testing.assert_series_equal(combine_features(ROWS), reference_features(ROWS), check_names=False)
+
+
+def test_categorical_columns_give_the_same_features():
+    categorical = ROWS.astype({"categories": "category", "genres": "category"})
+
+    pd.testing.assert_series_equal(combine_features(categorical), combine_features(ROWS))
+
+
+def test_primary_genre_is_the_first_listed_genre():
+    assert primary_genres(ROWS["genres"]).tolist() == ["Racing", "Action", "Unknown", "RPG"]
+
+
+def test_estimated_owners_are_range_midpoints():
+    owners = estimated_owners(ROWS["estimated_owners"].astype("category"))
+
+    assert owners.dtype == np.float64
+    assert owners.tolist() == [10000.0, 35000.0, 0.0, 0.0]
+
+
+def test_review_sentiment_is_the_same_in_a_process_pool():
+    reviews = ROWS["reviews"].tolist() * 3
+    serial = review_sentiment(reviews, n_jobs=1)
+
+    np.testing.assert_array_equal(review_sentiment(reviews, n_jobs=2, chunk_size=4), serial)
+    assert serial[0] > 0 > serial[2]
+    assert serial[1] == serial[3] == 0
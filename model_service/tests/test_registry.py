@@ -0,0 +1,143 @@
+import asyncio
+import os
+import re
+import shutil
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from artifacts import (
+    current_version,
+    list_versions,
+    new_version_name,
+    publish_version,
+    resolve_bundle_dir,
+    version_dir,
+    write_bundle,
+)
+from model_state import ModelState
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", TOKEN)
+    return TestClient(app_module.app)
+
+
+@pytest.fixture
+def copy_version(app_module, model_dir):
+    """Copy the served version under new names, and switch back to it afterwards."""
+    original = app_module.model_state.version
+    copies = []
+
+    def copy(name):
+        shutil.copytree(version_dir(model_dir, original), version_dir(model_dir, name))
+        copies.append(name)
+        return version_dir(model_dir, name)
+
+    yield copy
+    asyncio.run(app_module.reload_model(original))
+    for name in copies:
+        shutil.rmtree(version_dir(model_dir, name))
+        app_module.failed_versions.discard(name)
+    assert app_module.model_state.version == original
+
+
+def test_new_version_names_sort_by_time_and_are_unique():
+    assert re.fullmatch(r"\d{8}-\d{6}-[0-9a-f]{6}", new_version_name())
+    assert new_version_name() != new_version_name()
+
+
+def test_registry_lists_and_publishes_complete_versions(tmp_path):
+    model_dir = str(tmp_path)
+    assert list_versions(model_dir) == []
+    assert resolve_bundle_dir(model_dir) == (None, None)
+
+    write_bundle(version_dir(model_dir, "v1"), arrays={}, columns={}, models={})
+    os.makedirs(version_dir(model_dir, "v2"))
+    assert list_versions(model_dir) == ["v1"]
+
+    with pytest.raises(ValueError):
+        publish_version(model_dir, "v2")
+    publish_version(model_dir, "v1")
+    assert current_version(model_dir) == "v1"
+    assert resolve_bundle_dir(model_dir) == ("v1", version_dir(model_dir, "v1"))
+
+
+def test_unversioned_bundle_is_served_without_a_registry(tmp_path):
+    write_bundle(str(tmp_path / "bundle"), arrays={}, columns={}, models={})
+
+    assert resolve_bundle_dir(str(tmp_path)) == ("bundle", str(tmp_path / "bundle"))
+
+
+def test_validate_rejects_inconsistent_bundles(model_dir, app_module, tmp_path):
+    bundle_dir = str(tmp_path / "broken")
+    shutil.copytree(version_dir(model_dir, app_module.model_state.base_version), bundle_dir)
+    appids = np.load(os.path.join(bundle_dir, "appids.npy"))
+    state = ModelState(bundle_dir, "broken")
+    state.catalog_appids = appids[:-1]
+
+    with pytest.raises(ValueError, match="appids has"):
+        state.validate()
+
+
+def test_responses_report_the_model_version(client, app_module):
+    appids = [int(appid) for appid in app_module.model_state.catalog_appids[:3]]
+    response = client.post("/recommend/", json={"appids": appids})
+
+    assert response.json()["model_version"] == app_module.model_state.version
+    assert response.headers["X-Model-Version"] == app_module.model_state.version
+
+
+def test_reload_requires_the_admin_token(client, app_module, monkeypatch):
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert client.post("/admin/reload").status_code == 401
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", None)
+    assert client.post("/admin/reload", headers={"X-Admin-Token": TOKEN}).status_code == 403
+
+
+def test_reload_rejects_unknown_versions(client):
+    response = client.post("/admin/reload", json={"version": "missing"}, headers={"X-Admin-Token": TOKEN})
+
+    assert response.status_code == 404
+
+
+def test_reload_switches_versions(client, app_module, model_dir, copy_version):
+    previous = app_module.model_state.version
+    copy_version("zz-next")
+
+    response = client.post("/admin/reload", json={"version": "zz-next"}, headers={"X-Admin-Token": TOKEN})
+
+    assert response.status_code == 200
+    assert response.json() == {"model_version": "zz-next", "previous_version": previous, "changed": True}
+    assert app_module.model_state.version == "zz-next"
+    # Published for the other workers
+    assert current_version(model_dir) == "zz-next"
+    # The previous version stays loaded for requests still holding it
+    assert app_module.get_model_state(previous).version == previous
+
+
+def test_watcher_follows_the_published_version(app_module, model_dir, copy_version):
+    copy_version("zz-published")
+    publish_version(model_dir, "zz-published")
+
+    assert asyncio.run(app_module.reload_model()) is True
+    assert app_module.model_state.version == "zz-published"
+    assert asyncio.run(app_module.reload_model()) is False
+
+
+def test_failed_validation_keeps_the_current_version(client, app_module, copy_version):
+    previous = app_module.model_state.version
+    bundle_dir = copy_version("zz-corrupt")
+    with open(os.path.join(bundle_dir, "catalog_probs.npy"), "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+
+    response = client.post("/admin/reload", json={"version": "zz-corrupt"}, headers={"X-Admin-Token": TOKEN})
+
+    assert response.status_code == 422
+    assert app_module.model_state.version == previous
+    assert "zz-corrupt" in app_module.failed_versions
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from retrieval import IVFIndex, exact_top_k, normalize_rows
+
+
+@pytest.fixture
+def vectors():
+    # Four well separated groups of 100 rows
+    rng = np.random.default_rng(0)
+    centers = np.eye(4, 8) * 5
+    return np.vstack([center + rng.normal(scale=0.3, size=(100, 8)) for center in centers]).astype(np.float32)
+
+
+def test_exact_top_k_returns_best_rows_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    assert exact_top_k(scores, 3).tolist() == [1, 3, 2]
+
+
+def test_exact_top_k_skips_excluded_rows():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    exclude_mask = np.array([False, True, False, True, False])
+    assert exact_top_k(scores, 2, exclude_mask).tolist() == [2, 4]
+    # Never more rows than are left
+    assert exact_top_k(scores, 10, exclude_mask).tolist() == [2, 4, 0]
+    assert len(exact_top_k(scores, 3, np.ones(5, dtype=bool))) == 0
+
+
+def test_ivf_probing_every_cluster_matches_exact(vectors):
+    index = IVFIndex(vectors, n_lists=4)
+    query = vectors[7]
+    rows, scores = index.search(query, 20, n_probe=4)
+
+    exact = exact_top_k(normalize_rows(vectors) @ normalize_rows(query[None])[0], 20)
+    assert rows.tolist() == exact.tolist()
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_ivf_probes_more_clusters_when_rows_are_excluded(vectors):
+    index = IVFIndex(vectors, n_lists=4, n_probe=1)
+    query = vectors[0]
+    # Rule out all but 5 rows of the query's own group
+    exclude_mask = np.zeros(len(vectors), dtype=bool)
+    exclude_mask[5:100] = True
+
+    rows, _ = index.search(query, 30, exclude_mask)
+
+    assert len(rows) == 30
+    assert not exclude_mask[rows].any()
+    assert set(range(5)) <= set(rows.tolist())
+
+
+def test_ivf_returns_every_allowed_row_when_fewer_than_k_are_left(vectors):
+    index = IVFIndex(vectors, n_lists=4, n_probe=1)
+    exclude_mask = np.ones(len(vectors), dtype=bool)
+    exclude_mask[[3, 150, 399]] = False
+
+    rows, _ = index.search(vectors[0], 10, exclude_mask)
+
+    assert sorted(rows.tolist()) == [3, 150, 399]
+
+
+def test_ivf_extend_indexes_appended_rows(vectors):
+    index = IVFIndex(vectors[:300], n_lists=4)
+    extended = index.extend(vectors[300:])
+
+    rows, _ = extended.search(vectors[350], 5)
+
+    assert len(extended.vectors) == len(vectors)
+    assert 350 in rows.tolist()
+    assert all(row >= 300 for row in rows.tolist())
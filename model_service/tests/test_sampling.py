@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from sampling import mmr_rerank, sample_diverse, weighted_sample
+
+
+def test_weighted_sample_draws_distinct_items():
+    rng = np.random.default_rng(0)
+    drawn = weighted_sample(np.array([1.0, 2.0, 3.0, 0.0, 5.0]), 4, rng)
+
+    assert sorted(drawn.tolist()) == [0, 1, 2, 4]
+    assert len(weighted_sample(np.ones(3), 10, rng)) == 3
+
+
+def test_weighted_sample_follows_the_weights():
+    rng = np.random.default_rng(0)
+    first = [weighted_sample(np.array([1.0, 3.0]), 1, rng)[0] for _ in range(4000)]
+
+    assert abs(np.mean(first) - 0.75) < 0.03
+
+
+def test_weighted_sample_is_reproducible_with_a_seed():
+    weights = np.random.default_rng(1).random(100)
+    first = weighted_sample(weights, 10, np.random.default_rng(7))
+    second = weighted_sample(weights, 10, np.random.default_rng(7))
+
+    assert first.tolist() == second.tolist()
+
+
+def test_mmr_rerank_trades_relevance_for_novelty():
+    # Items 0 and 1 are near duplicates, item 2 points elsewhere
+    vectors = np.array([[1.0, 0.0], [0.99, 0.14], [0.0, 1.0]], dtype=np.float32)
+    relevance = np.array([1.0, 0.9, 0.5], dtype=np.float32)
+
+    assert mmr_rerank(vectors, relevance, 2, diversity=0.0).tolist() == [0, 1]
+    assert mmr_rerank(vectors, relevance, 2, diversity=0.7).tolist() == [0, 2]
+
+
+def test_sample_diverse_without_diversity_is_a_weighted_sample():
+    weights = np.random.default_rng(1).random(50)
+    vectors = np.eye(50, dtype=np.float32)
+
+    diverse = sample_diverse(weights, vectors, 5, np.random.default_rng(3), diversity=0.0)
+    plain = weighted_sample(weights, 5, np.random.default_rng(3))
+
+    assert diverse.tolist() == plain.tolist()
+
+
+def test_select_recommendations_skips_vectors_without_diversity(app_module):
+    class Catalog:
+        def rows(self, rows):
+            raise AssertionError("genre vectors decoded without diversity")
+
+    state = SimpleNamespace(catalog=Catalog(), catalog_norms=np.ones(100, dtype=np.float32))
+    candidate_rows = np.arange(100)
+    similarities = np.linspace(1.0, 0.1, 100)
+
+    selected = app_module.select_recommendations(
+        state, candidate_rows, similarities, k=5, rng=np.random.default_rng(0), diversity=0.0
+    )
+
+    assert len(set(selected.tolist())) == 5
+
+
+def test_select_recommendations_with_diversity_uses_vectors(app_module):
+    state = app_module.model_state
+    candidate_rows = np.arange(50)
+    similarities = np.linspace(1.0, 0.1, 50)
+
+    selected = app_module.select_recommendations(
+        state, candidate_rows, similarities, k=5, rng=np.random.default_rng(0), diversity=0.5
+    )
+
+    assert len(set(selected.tolist())) == 5
+    assert set(selected.tolist()) <= set(candidate_rows.tolist())
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import models
+import search
+from search import choose, fold_features, mark_pareto
+
+
+def setting(id, accuracy, latency, size, pareto=None):
+    result = {"id": id, "accuracy": accuracy, "predict_ms_per_1k": latency, "model_bytes": size}
+    if pareto is not None:
+        result["pareto"] = pareto
+    return result
+
+
+def test_fold_tfidf_only_sees_the_training_rows():
+    texts = pd.Series(["shooter guns", "puzzle logic", "racing cars", "secret heldout word"])
+
+    train_features, test_features = fold_features(texts, np.array([0, 1, 2]), np.array([3]), {})
+
+    assert train_features.shape == (3, 6)
+    assert test_features.shape == (1, 6)
+    assert test_features.nnz == 0
+
+
+def test_pareto_front():
+    results = [setting(0, 0.9, 10, 100), setting(1, 0.8, 5, 100), setting(2, 0.8, 10, 200), setting(3, 0.9, 10, 100)]
+    mark_pareto(results)
+
+    assert [result["pareto"] for result in results] == [True, True, False, True]
+
+
+def test_choose_the_most_accurate_setting_within_the_limits():
+    report = {
+        "settings": [
+            setting(0, 0.95, 40, 5e6, pareto=True),
+            setting(1, 0.9, 10, 1e6, pareto=True),
+            setting(2, 0.92, 50, 9e6, pareto=False),
+        ]
+    }
+
+    assert choose(report, "best")["id"] == 0
+    assert choose(report, "best", max_latency_ms=20)["id"] == 1
+    assert choose(report, "2")["id"] == 2
+    with pytest.raises(ValueError):
+        choose(report, "best", max_size_mb=0.5)
+    with pytest.raises(ValueError):
+        choose(report, "7")
+
+
+def test_search_reports_every_setting(dataset_csv):
+    report = search.search("logistic", {"C": [0.1, 10.0]}, folds=3, n_jobs=1, csv_path=dataset_csv)
+
+    assert (report["backend"], report["games"], report["folds"]) == ("logistic", 120, 3)
+    assert sorted(result["params"]["C"] for result in report["settings"]) == [0.1, 10.0]
+    accuracies = [result["accuracy"] for result in report["settings"]]
+    assert accuracies == sorted(accuracies, reverse=True)
+    assert accuracies[0] > 0.9
+    assert any(result["pareto"] for result in report["settings"])
+
+
+def test_forests_fit_on_one_core_during_the_search(dataset_csv, monkeypatch):
+    forests = []
+    train_random_forest = models.train_random_forest
+
+    def spy(features, labels, random_state=42, **params):
+        forests.append(params)
+        return train_random_forest(features, labels, random_state, **{**params, "n_estimators": 5})
+
+    monkeypatch.setattr(models, "train_random_forest", spy)
+    search.search("distilled", {"C": [1.0]}, folds=2, n_jobs=1, csv_path=dataset_csv)
+    search.search("random_forest", {"max_depth": [5]}, folds=2, n_jobs=1, csv_path=dataset_csv)
+
+    assert len(forests) == 4
+    assert all(params["n_jobs"] == 1 for params in forests)
@@ -0,0 +1,104 @@
+import itertools
+import json
+import os
+
+import numpy as np
+import pytest
+
+import train
+from artifacts import ModelBundle, current_version, list_versions, version_dir
+from dataset import SpilledDataset
+from model_state import ModelState
+
+
+@pytest.fixture
+def run_train(tmp_path, dataset_csv, monkeypatch):
+    """Run train.main on the small dataset, returning the published version."""
+    model_dir = str(tmp_path / "model")
+    monkeypatch.setattr(train, "MODEL_DIR", model_dir)
+    monkeypatch.setattr(train, "DATASET", dataset_csv)
+    monkeypatch.setattr(train, "N_NEIGHBORS", 5)
+    monkeypatch.setattr(train, "TRAIN_N_JOBS", 1)
+    # Runs within the same second would otherwise sort by their random suffix
+    names = (f"20240501-{n:06d}" for n in itertools.count())
+    monkeypatch.setattr(train, "new_version_name", lambda: next(names))
+
+    def run(model_backend="logistic", **settings):
+        for name, value in settings.items():
+            monkeypatch.setattr(train, name, value)
+        train.main(model_backend)
+        version = current_version(model_dir)
+        with open(os.path.join(model_dir, "runs", f"{version}.json")) as f:
+            report = json.load(f)
+        return ModelState(version_dir(model_dir, version), version), report
+
+    run.model_dir = model_dir
+    return run
+
+
+def test_training_publishes_a_servable_version(run_train):
+    state, report = run_train()
+
+    state.validate()
+    assert len(state.catalog) == 120
+    assert state.genre_classes == ["Action", "Puzzle", "Racing", "Strategy"]
+    assert sorted(state.genre_filter.names) == ["Action", "Puzzle", "Racing", "Strategy"]
+    assert state.neighbor_parts[0][1].shape == (120, 5)
+    assert state.bundle.manifest["model_backend"] == "logistic"
+    assert report["n_games"] == 120
+    assert not any(stage["cached"] for stage in report["stages"].values())
+    # The genre model learns the primary genre from the description
+    primary = np.array(state.bundle.columns["primary_genre"])
+    predicted = np.array(state.genre_classes)[state.catalog.rows(np.arange(120)).argmax(axis=1)]
+    assert np.mean(predicted == primary) > 0.9
+
+
+def test_rerun_reuses_the_checkpoints(run_train):
+    first, _ = run_train()
+    second, report = run_train()
+
+    stages = report["stages"]
+    assert all(stages[name]["cached"] for name in ["preprocess", "features", "train", "predict", "neighbors"])
+    assert not stages["hash"]["cached"]
+    assert list_versions(run_train.model_dir) == [first.version, second.version]
+    np.testing.assert_array_equal(first.catalog.rows(np.arange(120)), second.catalog.rows(np.arange(120)))
+
+
+def test_changed_backend_retrains(run_train):
+    run_train()
+    state, report = run_train("random_forest", RANDOM_FOREST_PARAMS={**train.RANDOM_FOREST_PARAMS, "n_jobs": 1})
+
+    assert report["stages"]["features"]["cached"]
+    assert not report["stages"]["train"]["cached"]
+    assert type(ModelBundle(state.bundle_dir).model("model")).__name__ == "RandomForestClassifier"
+
+
+def test_memory_budget_trains_the_same_model(run_train, monkeypatch):
+    in_memory, _ = run_train()
+    monkeypatch.setattr(train, "rows_per_chunk", lambda path, budget_bytes: 50)
+
+    chunked, report = run_train(TRAIN_MEMORY_BUDGET_MB=1)
+
+    assert report["memory_budget_mb"] == 1
+    (spill_dir,) = os.listdir(os.path.join(run_train.model_dir, "spill"))
+    assert SpilledDataset(os.path.join(run_train.model_dir, "spill", spill_dir)).n_chunks == 3
+    assert list(chunked.catalog_appids) == list(in_memory.catalog_appids)
+    rows = np.arange(120)
+    np.testing.assert_allclose(chunked.catalog.rows(rows), in_memory.catalog.rows(rows), atol=1e-6)
+
+
+def test_out_of_core_mode_publishes_a_servable_version(run_train, monkeypatch):
+    monkeypatch.setattr(train, "rows_per_chunk", lambda path, budget_bytes: 50)
+
+    state, report = run_train(None, TRAIN_MODE="out_of_core", MODEL_BACKEND="sgd", OUT_OF_CORE_EPOCHS=3)
+
+    state.validate()
+    assert report["train_mode"] == "out_of_core"
+    assert report["memory_budget_mb"] == train.OUT_OF_CORE_MEMORY_BUDGET_MB
+    assert state.bundle.manifest["model_backend"] == "sgd"
+    # The hashing vectorizer is stored as the TF-IDF, so ingest.py and the service use it unchanged
+    features = state.bundle.model("tfidf").transform(["shooter guns explosions combat"])
+    assert features.shape[1] == train.HASHING_PARAMS["n_features"]
+    primary = np.array(state.bundle.columns["primary_genre"])
+    predicted = np.array(state.genre_classes)[state.catalog.rows(np.arange(120)).argmax(axis=1)]
+    assert np.mean(predicted == primary) > 0.9
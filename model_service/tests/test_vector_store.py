@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from vector_store import (
+    PRECISIONS,
+    ConcatenatedVectors,
+    DenseVectors,
+    VectorStore,
+    compact_arrays,
+    encode_vectors,
+    load_vectors,
+)
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).dirichlet(np.ones(8), size=50).astype(np.float32)
+
+
+@pytest.fixture
+def profiles(vectors):
+    return vectors[:3] * 2
+
+
+def test_vector_store_is_abstract():
+    with pytest.raises(TypeError):
+        VectorStore(8)
+
+
+@pytest.mark.parametrize("precision,tolerance", [("float32", 1e-6), ("float16", 1e-3), ("int8", 1e-2)])
+def test_compact_stores_score_close_to_float32(vectors, profiles, precision, tolerance):
+    store = encode_vectors(vectors, precision)
+
+    assert store.precision == precision
+    assert len(store) == len(vectors)
+    np.testing.assert_allclose(store.rows(np.arange(len(vectors))), vectors, atol=tolerance)
+    np.testing.assert_allclose(store.dot(profiles), profiles @ vectors.T, atol=tolerance * 2)
+    np.testing.assert_allclose(store.norms, np.linalg.norm(vectors, axis=1), atol=tolerance)
+
+
+def test_sparse_store_keeps_the_top_genres_and_spreads_the_rest(vectors, profiles):
+    store = encode_vectors(vectors, "sparse", top_n=3)
+    decoded = store.rows(np.arange(len(vectors)))
+
+    top = np.argsort(-vectors, axis=1)[:, :3]
+    np.testing.assert_allclose(
+        np.take_along_axis(decoded, top, axis=1), np.take_along_axis(vectors, top, axis=1), atol=1e-3
+    )
+    np.testing.assert_allclose(decoded.sum(axis=1), 1, atol=1e-2)
+    np.testing.assert_allclose(store.dot(profiles), profiles @ decoded.T, atol=1e-4)
+
+
+def test_chunked_scoring_matches_a_single_chunk(vectors, profiles, monkeypatch):
+    store = encode_vectors(vectors, "int8")
+    expected = store.dot(profiles)
+    monkeypatch.setattr("vector_store.SCORE_CHUNK_ROWS", 7)
+
+    np.testing.assert_allclose(store.dot(profiles), expected, rtol=1e-6)
+
+
+def test_compact_arrays_load_without_reencoding(vectors):
+    arrays = {"catalog_probs": vectors, **compact_arrays(vectors)}
+
+    for precision in PRECISIONS:
+        store = load_vectors(arrays, precision)
+        assert store.precision == precision
+        for name, array in store.to_arrays().items():
+            assert array is arrays[name]
+
+
+def test_unknown_precision_is_rejected(vectors):
+    with pytest.raises(ValueError):
+        encode_vectors(vectors, "float8")
+
+
+@pytest.mark.parametrize("precision", PRECISIONS)
+def test_concatenated_stores_match_a_single_store(vectors, profiles, precision):
+    whole = encode_vectors(vectors, precision)
+    head = ConcatenatedVectors([encode_vectors(vectors[:20], precision), encode_vectors(vectors[20:30], precision)])
+    parts = ConcatenatedVectors([head, encode_vectors(vectors[30:], precision)])
+
+    assert len(parts.parts) == 3
+    assert len(parts) == len(vectors)
+    rows = np.array([49, 0, 25, 19, 20])
+    np.testing.assert_allclose(parts.rows(rows), whole.rows(rows), atol=1e-6)
+    np.testing.assert_allclose(parts.dot(profiles), whole.dot(profiles), atol=1e-5)
+    np.testing.assert_allclose(parts.norms, whole.norms, atol=1e-6)
+    restored = load_vectors({"catalog_probs": vectors, **parts.to_arrays()}, precision)
+    np.testing.assert_allclose(restored.rows(rows), whole.rows(rows), atol=1e-6)
+    assert parts.nbytes == whole.nbytes
+
+
+def test_float16_store_halves_the_memory(vectors):
+    assert DenseVectors(vectors.astype(np.float16)).nbytes * 2 == DenseVectors(vectors).nbytes
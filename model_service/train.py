@@ -1,132 +1,400 @@
-import re
+import numpy as np
 import pandas as pd
-import joblib
 import os
 import logging
-import time
+import shutil
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
-from textblob import TextBlob
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()],
+from artifacts import ModelBundle, new_version_name, publish_version, resolve_bundle_dir, version_dir, write_bundle
+from dataset import read_dataset, rows_per_chunk, spill_dataset
+from genre_filter import build_genre_bitmaps, split_genres
+from lookup import CatalogLookup
+from models import (
+    INCREMENTAL_BACKENDS,
+    LOGISTIC_PARAMS,
+    MODEL_BACKENDS,
+    NAIVE_BAYES_PARAMS,
+    RANDOM_FOREST_PARAMS,
+    SGD_PARAMS,
+    predict_genre_proba,
+    train_genre_model,
 )
+from neighbors import DEFAULT_NEIGHBORS, build_neighbor_graph, update_neighbor_graph
+from out_of_core import DEFAULT_EPOCHS, HASHING_PARAMS, hashing_vectorizer, predict_in_chunks, train_incremental
+from pipeline import StageRunner, file_digest
+from preprocessing import combine_features, estimated_owners, primary_genres, review_sentiment
+from vector_store import compact_arrays
+
 logger = logging.getLogger(__name__)
 
 MODEL_DIR = "./model"
-os.makedirs(MODEL_DIR, exist_ok=True)
-logger.info(f"Model directory created/verified at {MODEL_DIR}")
-
-logger.info("Loading dataset...")
-start_time = time.time()
-df = pd.read_csv(f"{MODEL_DIR}/games_may2024_full.csv")
-logger.info(
-    f"Dataset loaded with {len(df)} games in {time.time() - start_time:.2f} seconds"
-)
+DATASET = f"{MODEL_DIR}/games_may2024_full.csv"
+# batch fits the TF-IDF and the genre model in memory; out_of_core hashes the text and
+# fits an incremental genre model chunk by chunk, see out_of_core.py
+TRAIN_MODES = ("batch", "out_of_core")
+TRAIN_MODE = os.getenv("TRAIN_MODE", "batch")
+if TRAIN_MODE not in TRAIN_MODES:
+    raise ValueError(f"TRAIN_MODE must be one of {TRAIN_MODES}, got {TRAIN_MODE}")
+BACKENDS = INCREMENTAL_BACKENDS if TRAIN_MODE == "out_of_core" else MODEL_BACKENDS
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", BACKENDS[0])
+if MODEL_BACKEND not in BACKENDS:
+    raise ValueError(f"MODEL_BACKEND must be one of {BACKENDS} with TRAIN_MODE={TRAIN_MODE}, got {MODEL_BACKEND}")
+# Neighbours stored per game for /similar/, 0 skips the graph
+N_NEIGHBORS = int(os.getenv("N_NEIGHBORS", str(DEFAULT_NEIGHBORS)))
+# Update the graph of the current version instead of rebuilding it from scratch
+NEIGHBORS_INCREMENTAL = os.getenv("NEIGHBORS_INCREMENTAL", "1").lower() in ("1", "true", "yes")
+# Checkpoint every stage under MODEL_DIR/checkpoints and skip stages whose inputs are unchanged
+TRAIN_CHECKPOINTS = os.getenv("TRAIN_CHECKPOINTS", "1").lower() in ("1", "true", "yes")
+# Processes for the sentiment pass and threads for the neighbour search, defaults to all cores
+TRAIN_N_JOBS = int(os.getenv("TRAIN_N_JOBS", "0")) or os.cpu_count() or 1
+# Memory in MB for reading and preprocessing the dataset; 0 loads it whole, otherwise it
+# is streamed in chunks that fit the budget and spilled to MODEL_DIR/spill
+TRAIN_MEMORY_BUDGET_MB = int(os.getenv("TRAIN_MEMORY_BUDGET_MB", "0"))
+# The out_of_core mode always streams, with this budget when none is set
+OUT_OF_CORE_MEMORY_BUDGET_MB = 256
+OUT_OF_CORE_EPOCHS = int(os.getenv("OUT_OF_CORE_EPOCHS", str(DEFAULT_EPOCHS)))
 
+TFIDF_PARAMS = {"stop_words": "english", "max_features": 1000}
+RANDOM_STATE = 42
+# Raw columns kept once the dataset is preprocessed
+KEPT_COLUMNS = ["AppID", "name", "short_description", "header_image", "genres"]
 
-def analyze_review_sentiment(review_text):
-    if isinstance(review_text, str):
-        blob = TextBlob(review_text)
-        return blob.sentiment.polarity
-    return 0
 
+def preprocess(df):
+    """
+    Derive the columns training needs from the raw dataset.
 
-def parse_estimated_owners(owner_range):
-    try:
-        lower, upper = owner_range.split(" - ")
-        return (int(lower) + int(upper)) / 2
-    except ValueError:
-        return 0
+    Args:
+        df (pandas.DataFrame): The dataset
 
+    Returns:
+        pandas.DataFrame: combined_features, review_sentiment, estimated_owners_processed
+            and primary_genre of each game
+    """
+    logger.info("Creating combined features from descriptions, tags, and genres...")
+    combined_features = combine_features(df)
 
-logger.info("Starting data preprocessing...")
-start_time = time.time()
+    logger.info(f"Analyzing review sentiment with {TRAIN_N_JOBS} processes...")
+    sentiment = review_sentiment(df["reviews"], n_jobs=TRAIN_N_JOBS)
 
-logger.info("Creating combined features from descriptions, tags, and genres...")
-df["combined_features"] = (
-    df["short_description"].fillna("")
-    + " "
-    + df["categories"].fillna("")
-    + " "
-    + df["genres"].fillna("")
-    + " "
-    + df["tags"].fillna("")
-)
+    logger.info("Processing estimated owners...")
+    owners = estimated_owners(df["estimated_owners"])
 
-logger.info("Cleaning text in combined features...")
-df["combined_features"] = df["combined_features"].apply(
-    lambda x: re.sub(r"[^a-zA-Z0-9\s.,!?\';:-]", "", x)
-)
+    logger.info("Extracting primary genre for each game...")
+    primary_genre = primary_genres(df["genres"])
 
-logger.info("Analyzing review sentiment...")
-df["review_sentiment"] = df["reviews"].apply(analyze_review_sentiment)
-logger.info("Processing estimated owners...")
-df["estimated_owners_processed"] = df["estimated_owners"].apply(parse_estimated_owners)
+    return pd.DataFrame(
+        {
+            "combined_features": combined_features,
+            "review_sentiment": sentiment,
+            "estimated_owners_processed": owners,
+            "primary_genre": primary_genre,
+        },
+        index=df.index,
+    )
 
-logger.info(f"Data preprocessing completed in {time.time() - start_time:.2f} seconds")
 
-logger.info("Starting feature extraction with TF-IDF...")
-start_time = time.time()
-tfidf = TfidfVectorizer(stop_words="english", max_features=1000)
-tfidf_matrix = tfidf.fit_transform(df["combined_features"])
-logger.info(
-    f"TF-IDF vectorization completed in {time.time() - start_time:.2f} seconds. Matrix shape: {tfidf_matrix.shape}"
-)
+def prepare_chunk(chunk):
+    """
+    Preprocess one chunk of the streamed dataset, see dataset.spill_dataset.
 
-logger.info("Extracting primary genre for each game...")
-df["primary_genre"] = (
-    df["genres"].fillna("").apply(lambda x: x.split(",")[0].strip() if x else "Unknown")
-)
-genre_counts = df["primary_genre"].value_counts()
-logger.info(
-    f"Found {len(genre_counts)} unique primary genres. Top 5: {genre_counts.head().to_dict()}"
-)
+    Args:
+        chunk (pandas.DataFrame): Raw rows
+
+    Returns:
+        tuple: (rows, texts) with the kept and derived columns, and the combined text
+    """
+    derived = preprocess(chunk)
+    return chunk[KEPT_COLUMNS].join(derived.drop(columns="combined_features")), derived["combined_features"]
+
+
+def spill(dataset_hash, budget_mb):
+    """
+    Stream the dataset through preprocessing into MODEL_DIR/spill/<dataset hash>.
+
+    Args:
+        dataset_hash (str): Content hash of the dataset
+        budget_mb (int): Memory budget of a chunk in MB
+
+    Returns:
+        dataset.SpilledDataset: The preprocessed dataset on disk
+    """
+    spill_root = os.path.join(MODEL_DIR, "spill")
+    directory = os.path.join(spill_root, dataset_hash[:16])
+    # Only the spill of the current dataset is kept
+    if os.path.isdir(spill_root):
+        for name in os.listdir(spill_root):
+            if name != os.path.basename(directory):
+                shutil.rmtree(os.path.join(spill_root, name), ignore_errors=True)
+
+    chunk_rows = rows_per_chunk(DATASET, budget_mb << 20)
+    logger.info(f"Streaming the dataset in chunks of {chunk_rows} rows ({budget_mb} MB budget)")
+    return spill_dataset(DATASET, directory, chunk_rows, prepare_chunk)
+
+
+def extract_features(df, documents=None):
+    """
+    Fit the TF-IDF on the combined text and encode the primary genres.
+
+    Args:
+        df (pandas.DataFrame): Preprocessed dataset
+        documents (callable): Returns a fresh iterator over the combined text of each game,
+            used instead of df["combined_features"] for a spilled dataset
+
+    Returns:
+        tuple: (tfidf, tfidf_matrix, label_encoder, genre_labels)
+    """
+    tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+    if documents is None:
+        tfidf_matrix = tfidf.fit_transform(df["combined_features"])
+    else:
+        # Two passes over the text on disk instead of holding all of it
+        tfidf_matrix = tfidf.fit(documents()).transform(documents())
+    logger.info(f"TF-IDF matrix shape: {tfidf_matrix.shape}")
+
+    label_encoder, genre_labels = encode_genres(df["primary_genre"])
+    return tfidf, tfidf_matrix, label_encoder, genre_labels
+
+
+def encode_genres(primary_genre):
+    """
+    Args:
+        primary_genre (pandas.Series): Primary genre of each game
+
+    Returns:
+        tuple: (label_encoder, genre_labels)
+    """
+    label_encoder = LabelEncoder()
+    return label_encoder, label_encoder.fit_transform(primary_genre)
+
+
+def fit_in_memory(runner, df, documents=None, model_backend=MODEL_BACKEND, model_params=None):
+    """
+    Fit the TF-IDF and the genre model on the whole dataset and score the catalog.
+
+    Args:
+        runner (pipeline.StageRunner): Runs the features, train and predict stages
+        df (pandas.DataFrame): Preprocessed dataset
+        documents (callable): Streams the combined text of a spilled dataset, see extract_features
+        model_backend (str): One of MODEL_BACKENDS
+        model_params (dict): Overrides of the backend's default parameters
+
+    Returns:
+        tuple: (tfidf, genre_model, label_encoder, catalog_probs)
+    """
+    tfidf, tfidf_matrix, label_encoder, genre_labels = runner.run(
+        "features", lambda: extract_features(df, documents), inputs=["preprocess"], params=TFIDF_PARAMS
+    )
+
+    logger.info(f"Training {model_backend} genre model...")
+    model_params = model_params or {}
+    genre_model = runner.run(
+        "train",
+        lambda: train_genre_model(
+            model_backend, tfidf_matrix, genre_labels, random_state=RANDOM_STATE, **model_params
+        ),
+        inputs=["features"],
+        params={
+            "backend": model_backend,
+            "random_state": RANDOM_STATE,
+            "random_forest": RANDOM_FOREST_PARAMS,
+            "logistic": LOGISTIC_PARAMS,
+            **({"overrides": model_params} if model_params else {}),
+        },
+    )
+
+    logger.info("Precomputing genre probabilities for the whole catalog...")
+    catalog_probs = runner.run(
+        "predict",
+        lambda: predict_genre_proba(genre_model, tfidf_matrix, len(label_encoder.classes_)),
+        inputs=["train"],
+    )
+    return tfidf, genre_model, label_encoder, catalog_probs
+
+
+def fit_out_of_core(runner, df, spilled):
+    """
+    Fit an incremental genre model on hashed features, one chunk of the spilled dataset
+    at a time, and score the catalog the same way.
+
+    Args:
+        runner (pipeline.StageRunner): Runs the features, train and predict stages
+        df (pandas.DataFrame): Preprocessed per-game columns
+        spilled (dataset.SpilledDataset): The preprocessed dataset on disk
+
+    Returns:
+        tuple: (vectorizer, genre_model, label_encoder, catalog_probs)
+    """
+    vectorizer = hashing_vectorizer()
+    label_encoder, genre_labels = runner.run(
+        "features",
+        lambda: encode_genres(df["primary_genre"]),
+        inputs=["preprocess"],
+        params={"mode": TRAIN_MODE},
+    )
+    n_classes = len(label_encoder.classes_)
+
+    logger.info(f"Training {MODEL_BACKEND} genre model over {OUT_OF_CORE_EPOCHS} epochs...")
+    genre_model = runner.run(
+        "train",
+        lambda: train_incremental(
+            MODEL_BACKEND, vectorizer, spilled, genre_labels, n_classes, OUT_OF_CORE_EPOCHS, RANDOM_STATE
+        ),
+        inputs=["features"],
+        params={
+            "backend": MODEL_BACKEND,
+            "random_state": RANDOM_STATE,
+            "epochs": OUT_OF_CORE_EPOCHS,
+            "hashing": HASHING_PARAMS,
+            "sgd": SGD_PARAMS,
+            "naive_bayes": NAIVE_BAYES_PARAMS,
+        },
+    )
+
+    logger.info("Precomputing genre probabilities for the whole catalog...")
+    catalog_probs = runner.run(
+        "predict", lambda: predict_in_chunks(genre_model, vectorizer, spilled, n_classes), inputs=["train"]
+    )
+    return vectorizer, genre_model, label_encoder, catalog_probs
+
+
+def build_neighbors(catalog_probs, appids):
+    """
+    Build the neighbour graph, updating the one of the current version when possible.
+
+    Args:
+        catalog_probs (numpy.ndarray): Genre probabilities of the catalog
+        appids (numpy.ndarray): AppID of each catalog row
+
+    Returns:
+        dict: neighbor_rows and neighbor_scores arrays
+    """
+    previous_version, previous_dir = resolve_bundle_dir(MODEL_DIR)
+    previous_arrays = ModelBundle(previous_dir).arrays if NEIGHBORS_INCREMENTAL and previous_dir else {}
+    if "neighbor_rows" in previous_arrays:
+        logger.info(f"Updating the neighbour graph of version {previous_version}")
+        return update_neighbor_graph(catalog_probs, appids, previous_arrays, N_NEIGHBORS, n_jobs=TRAIN_N_JOBS)
+    return build_neighbor_graph(catalog_probs, N_NEIGHBORS, n_jobs=TRAIN_N_JOBS)
+
+
+def main(model_backend=None, model_params=None):
+    """
+    Train and publish a new model version.
+
+    Args:
+        model_backend (str): Batch backend to train instead of MODEL_BACKEND
+        model_params (dict): Overrides of the backend's default parameters, see search.py
+    """
+    if model_backend is not None and TRAIN_MODE != "batch":
+        raise ValueError("A model backend can only be chosen with TRAIN_MODE=batch")
+    model_backend = model_backend or MODEL_BACKEND
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler()],
+    )
+    model_version = new_version_name()
+    bundle_dir = version_dir(MODEL_DIR, model_version)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    logger.info(f"Model directory created/verified at {MODEL_DIR}")
+
+    runner = StageRunner(os.path.join(MODEL_DIR, "checkpoints") if TRAIN_CHECKPOINTS else None)
+
+    # Stages are keyed by the dataset's content, so editing the CSV reruns everything after it
+    dataset_hash = runner.run("hash", lambda: file_digest(DATASET))
+    budget_mb = TRAIN_MEMORY_BUDGET_MB or (OUT_OF_CORE_MEMORY_BUDGET_MB if TRAIN_MODE == "out_of_core" else 0)
+    spilled, documents = None, None
+    if budget_mb > 0:
+        # The spill directory is the checkpoint of this stage
+        spilled = runner.run("preprocess", lambda: spill(dataset_hash, budget_mb), inputs=[dataset_hash], save=False)
+        df, documents = spilled.frame(), spilled.texts
+    else:
+        df = runner.run("load", lambda: read_dataset(DATASET))
+        derived = runner.run("preprocess", lambda: preprocess(df), inputs=[dataset_hash])
+        df = df[KEPT_COLUMNS].join(derived)
+    logger.info(f"Dataset loaded with {len(df)} games")
+    genre_counts = df["primary_genre"].value_counts()
+    logger.info(f"Found {len(genre_counts)} unique primary genres. Top 5: {genre_counts.head().to_dict()}")
+
+    if TRAIN_MODE == "out_of_core":
+        vectorizer, genre_model, label_encoder, catalog_probs = fit_out_of_core(runner, df, spilled)
+    else:
+        vectorizer, genre_model, label_encoder, catalog_probs = fit_in_memory(
+            runner, df, documents, model_backend, model_params
+        )
+    if spilled is not None and not TRAIN_CHECKPOINTS:
+        shutil.rmtree(spilled.directory, ignore_errors=True)
+
+    logger.info("Building name and AppID lookup indexes...")
+    appids = df["AppID"].to_numpy(dtype=np.int64)
+    catalog_lookup = runner.run("lookup", lambda: CatalogLookup.build(df["name"].astype(str), appids))
+
+    logger.info("Building genre bitmaps...")
+    genre_names, genre_bitmaps = runner.run("genre_bitmaps", lambda: build_genre_bitmaps(split_genres(df["genres"])))
+    logger.info(f"Built bitmaps for {len(genre_names)} genres")
+
+    neighbor_arrays = {}
+    if N_NEIGHBORS > 0:
+        logger.info(f"Building the {N_NEIGHBORS}-nearest-neighbour graph...")
+        neighbor_arrays = runner.run(
+            "neighbors",
+            lambda: build_neighbors(catalog_probs, appids),
+            inputs=["predict", dataset_hash],
+            params={"n_neighbors": N_NEIGHBORS},
+        )
+
+    logger.info("Saving artifact bundle...")
+    manifest = runner.run(
+        "bundle",
+        lambda: write_bundle(
+            bundle_dir,
+            arrays={
+                "catalog_probs": catalog_probs,
+                **compact_arrays(catalog_probs),
+                "appids": appids,
+                **catalog_lookup.to_arrays(),
+                **neighbor_arrays,
+                "genre_bitmaps": genre_bitmaps,
+            },
+            columns={column: df[column] for column in ["name", "short_description", "header_image", "primary_genre"]},
+            models={"tfidf": vectorizer, "model": genre_model, "label_encoder": label_encoder},
+            metadata={
+                "version": model_version,
+                "model_backend": model_backend,
+                "model_params": model_params or {},
+                "train_mode": TRAIN_MODE,
+                "n_games": len(df),
+                "n_neighbors": N_NEIGHBORS,
+                "genre_classes": label_encoder.classes_.tolist(),
+                "genre_names": genre_names,
+            },
+        ),
+    )
+    bundle_bytes = sum(info["bytes"] for info in manifest["files"].values())
+    logger.info(f"Bundle with {len(manifest['files'])} files ({bundle_bytes / 1e6:.1f} MB) saved to {bundle_dir}")
+
+    # Point the registry at the new version; running services pick it up on reload
+    publish_version(MODEL_DIR, model_version)
+    logger.info(f"Published model version {model_version}")
+
+    report_path = os.path.join(MODEL_DIR, "runs", f"{model_version}.json")
+    runner.write_report(
+        report_path,
+        version=model_version,
+        model_backend=model_backend,
+        model_params=model_params or {},
+        train_mode=TRAIN_MODE,
+        n_games=len(df),
+        n_jobs=TRAIN_N_JOBS,
+        memory_budget_mb=budget_mb,
+        bundle_bytes=bundle_bytes,
+    )
+    logger.info(f"Run report written to {report_path}")
+
+    logger.info("Model training pipeline completed successfully")
+    print(f"Model training complete. Model version {model_version} saved to {bundle_dir}.")
 
-logger.info("Encoding genre labels...")
-label_encoder = LabelEncoder()
-genre_labels = label_encoder.fit_transform(df["primary_genre"])
-
-logger.info("Training RandomForest classifier...")
-start_time = time.time()
-rf_model = RandomForestClassifier(
-    n_estimators=200,  # More trees
-    max_depth=20,  # Deeper trees
-    min_samples_split=5,  # Prevent overfitting
-    min_samples_leaf=2,  # Prevent overfitting
-    random_state=42,
-)
-rf_model.fit(tfidf_matrix, genre_labels)
-logger.info(f"Model training completed in {time.time() - start_time:.2f} seconds")
-
-logger.info("Preparing slim dataset for recommendations...")
-essential_columns = [
-    "name",
-    "AppID",
-    "short_description",
-    "header_image",
-    "combined_features",
-    "primary_genre",
-]
-df_slim = df[essential_columns]
-logger.info(
-    f"Slim dataset created with {len(df_slim)} rows and {len(essential_columns)} columns"
-)
 
-logger.info("Saving models and dataset...")
-start_time = time.time()
-joblib.dump(tfidf, f"{MODEL_DIR}/tfidf.pkl", compress=9)
-logger.info("TF-IDF vectorizer saved")
-joblib.dump(rf_model, f"{MODEL_DIR}/random_forest.pkl", compress=9)
-logger.info("RandomForest model saved")
-joblib.dump(label_encoder, f"{MODEL_DIR}/label_encoder.pkl", compress=9)
-logger.info("Label encoder saved")
-df_slim.to_csv(f"{MODEL_DIR}/games_may2024_cleaned.csv", index=False)
-logger.info("Slim dataset saved to CSV")
-logger.info(f"All models and data saved in {time.time() - start_time:.2f} seconds")
-
-logger.info("Model training pipeline completed successfully")
-print("Model training complete. TF-IDF and RandomForest classifier saved.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Catalog genre-probability vectors in full or reduced precision.
+
+Every store scores a user profile against the whole catalog directly on its
+compact form, converting one chunk of rows at a time, so the full-precision
+matrix never has to be resident:
+
+    float32   the matrix as trained
+    float16   half-precision copy, half the memory
+    int8      rows quantized to int8 with one float32 scale per row
+    sparse    only the top-n genres of each game, as uint8 indices and float16 values;
+              the remaining probability mass is spread evenly over the other genres
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+PRECISIONS = ("float32", "float16", "int8", "sparse")
+DEFAULT_TOP_N = 3
+COMPACT_PRECISIONS = ("float16", "int8", "sparse")
+
+# Rows converted to float32 at a time while scoring; bounds the temporary memory
+SCORE_CHUNK_ROWS = 65536
+
+
+class VectorStore(ABC):
+    """Scores profiles against catalog vectors held in some compact form."""
+
+    precision = None
+    # Axis of the bundle arrays that runs over catalog rows
+    row_axis = 0
+
+    def __init__(self, n_dims):
+        self.n_dims = n_dims
+        self.norms = None
+
+    @abstractmethod
+    def __len__(self):
+        """Number of catalog rows."""
+
+    @abstractmethod
+    def rows(self, rows):
+        """
+        Decode catalog rows to float32.
+
+        Args:
+            rows (numpy.ndarray): Catalog rows
+
+        Returns:
+            numpy.ndarray: Matrix of shape (len(rows), n_dims)
+        """
+
+    def dot(self, profiles):
+        """
+        Dot product of every catalog row with each profile.
+
+        Args:
+            profiles (numpy.ndarray): float32 matrix of shape (n_profiles, n_dims)
+
+        Returns:
+            numpy.ndarray: float32 matrix of shape (n_profiles, n_games)
+        """
+        scores = np.empty((len(profiles), len(self)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_CHUNK_ROWS):
+            stop = min(start + SCORE_CHUNK_ROWS, len(self))
+            scores[:, start:stop] = self._dot_chunk(start, stop, profiles)
+        return scores
+
+    def _dot_chunk(self, start, stop, profiles):
+        return profiles @ self.rows(np.arange(start, stop)).T
+
+    @abstractmethod
+    def to_arrays(self):
+        """
+        Arrays to store in the artifact bundle, so workers can memory-map this form directly.
+
+        Returns:
+            dict: Arrays by bundle name
+        """
+
+    @property
+    def nbytes(self):
+        """Memory taken by the vectors, not counting the per-row norms."""
+        return sum(array.nbytes for array in self.to_arrays().values())
+
+    def _compute_norms(self):
+        norms = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCORE_CHUNK_ROWS):
+            stop = min(start + SCORE_CHUNK_ROWS, len(self))
+            norms[start:stop] = np.linalg.norm(self.rows(np.arange(start, stop)), axis=1)
+        self.norms = norms
+
+
+class DenseVectors(VectorStore):
+    """Dense float32 or float16 matrix."""
+
+    def __init__(self, vectors):
+        super().__init__(vectors.shape[1])
+        self.vectors = vectors
+        self.precision = str(vectors.dtype)
+        self._compute_norms()
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def rows(self, rows):
+        return self.vectors[rows].astype(np.float32, copy=False)
+
+    def dot(self, profiles):
+        if self.vectors.dtype == np.float32:
+            # Already in BLAS precision, no need to convert chunks
+            return profiles @ self.vectors.T
+        return super().dot(profiles)
+
+    def _dot_chunk(self, start, stop, profiles):
+        return profiles @ self.vectors[start:stop].astype(np.float32).T
+
+    def to_arrays(self):
+        name = "catalog_probs" if self.precision == "float32" else "catalog_probs_float16"
+        return {name: self.vectors}
+
+
+class Int8Vectors(VectorStore):
+    """Rows quantized to int8, each with its own float32 scale."""
+
+    precision = "int8"
+
+    def __init__(self, quantized, scales):
+        super().__init__(quantized.shape[1])
+        self.quantized = quantized
+        self.scales = scales
+        self._compute_norms()
+
+    @classmethod
+    def encode(cls, vectors):
+        """
+        Quantize float vectors so each row's largest absolute value maps to 127.
+
+        Args:
+            vectors (numpy.ndarray): Matrix of shape (n_games, n_dims)
+
+        Returns:
+            Int8Vectors: The quantized store
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127
+        safe_scales = np.where(scales > 0, scales, 1.0)
+        quantized = np.clip(np.rint(vectors / safe_scales[:, None]), -127, 127).astype(np.int8)
+        return cls(quantized, scales.astype(np.float32))
+
+    def __len__(self):
+        return len(self.quantized)
+
+    def rows(self, rows):
+        return self.quantized[rows].astype(np.float32) * self.scales[rows, None]
+
+    def _dot_chunk(self, start, stop, profiles):
+        return (profiles @ self.quantized[start:stop].astype(np.float32).T) * self.scales[start:stop]
+
+    def to_arrays(self):
+        return {"catalog_probs_int8": self.quantized, "catalog_probs_int8_scales": self.scales}
+
+
+class SparseTopNVectors(VectorStore):
+    """
+    Only the n largest genre probabilities of each game. Since each row of predict_proba
+    sums to 1, the dropped mass is known without storing it and is spread evenly over
+    the other genres, which keeps cosine rankings far closer than treating it as zero.
+
+    Indices and values are stored genre-slot major, shape (top_n, n_games), so scoring
+    works on contiguous columns.
+    """
+
+    precision = "sparse"
+    row_axis = 1
+
+    def __init__(self, indices, values, n_dims):
+        super().__init__(n_dims)
+        self.indices = indices
+        self.values = values
+        self._compute_norms()
+
+    @classmethod
+    def encode(cls, vectors, top_n):
+        """
+        Keep the top_n genres of every game.
+
+        Args:
+            vectors (numpy.ndarray): Matrix of shape (n_games, n_dims)
+            top_n (int): Genres kept per game
+
+        Returns:
+            SparseTopNVectors: The sparse store
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n_dims = vectors.shape[1]
+        top_n = min(top_n, n_dims)
+        index_dtype = np.uint8 if n_dims <= 256 else np.uint16
+        indices = np.argpartition(-vectors, top_n - 1, axis=1)[:, :top_n]
+        values = np.take_along_axis(vectors, indices, axis=1)
+        return cls(
+            np.ascontiguousarray(indices.T, dtype=index_dtype),
+            np.ascontiguousarray(values.T, dtype=np.float16),
+            n_dims,
+        )
+
+    @property
+    def top_n(self):
+        return self.indices.shape[0]
+
+    def __len__(self):
+        return self.indices.shape[1]
+
+    def _tail(self, values):
+        """Probability assumed for each genre outside a game's top n."""
+        n_tail = self.n_dims - self.top_n
+        if n_tail == 0:
+            return np.zeros(values.shape[1], dtype=np.float32)
+        return np.maximum(1 - values.sum(axis=0), 0) / n_tail
+
+    def rows(self, rows):
+        values = self.values[:, rows].astype(np.float32)
+        decoded = np.repeat(self._tail(values)[:, None], self.n_dims, axis=1)
+        np.put_along_axis(decoded, self.indices[:, rows].T.astype(np.intp), values.T, axis=1)
+        return decoded
+
+    def _dot_chunk(self, start, stop, profiles):
+        values = self.values[:, start:stop].astype(np.float32)
+        tail = self._tail(values)
+        scores = np.empty((len(profiles), stop - start), dtype=np.float32)
+        for row, profile in enumerate(profiles):
+            # Every genre contributes tail * profile, the top n genres their difference to it
+            score = tail * profile.sum()
+            for slot in range(self.top_n):
+                score += np.take(profile, self.indices[slot, start:stop]) * (values[slot] - tail)
+            scores[row] = score
+        return scores
+
+    def to_arrays(self):
+        return {"catalog_top_indices": self.indices, "catalog_top_values": self.values}
+
+
+class ConcatenatedVectors(VectorStore):
+    """
+    Several stores scored one after the other, such as a bundle and its appended
+    segments, so appending rows never copies the stores already loaded.
+    """
+
+    def __init__(self, parts):
+        """
+        Args:
+            parts (list): Stores of the same precision and dimensions, in catalog order;
+                concatenated stores are flattened into their parts
+        """
+        super().__init__(parts[0].n_dims)
+        self.parts = [
+            part for store in parts for part in (store.parts if isinstance(store, ConcatenatedVectors) else [store])
+        ]
+        self.precision = self.parts[0].precision
+        self.offsets = np.cumsum([0] + [len(part) for part in self.parts])
+        self.norms = np.concatenate([part.norms for part in self.parts])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def rows(self, rows):
+        rows = np.asarray(rows)
+        part_of = np.searchsorted(self.offsets, rows, side="right") - 1
+        decoded = np.empty((len(rows), self.n_dims), dtype=np.float32)
+        for part in np.unique(part_of):
+            selected = part_of == part
+            decoded[selected] = self.parts[part].rows(rows[selected] - self.offsets[part])
+        return decoded
+
+    def dot(self, profiles):
+        return np.hstack([part.dot(profiles) for part in self.parts])
+
+    def to_arrays(self):
+        arrays = [part.to_arrays() for part in self.parts]
+        return {
+            name: np.concatenate([part_arrays[name] for part_arrays in arrays], axis=self.parts[0].row_axis)
+            for name in arrays[0]
+        }
+
+    @property
+    def nbytes(self):
+        return sum(part.nbytes for part in self.parts)
+
+
+def encode_vectors(vectors, precision, top_n=DEFAULT_TOP_N):
+    """
+    Build a store of the given precision from full-precision vectors.
+
+    Args:
+        vectors (numpy.ndarray): float32 matrix of shape (n_games, n_dims)
+        precision (str): One of PRECISIONS
+        top_n (int): Genres kept per game by the sparse store
+
+    Returns:
+        VectorStore: The store
+    """
+    if precision == "float32":
+        return DenseVectors(np.asarray(vectors, dtype=np.float32))
+    if precision == "float16":
+        return DenseVectors(np.asarray(vectors, dtype=np.float16))
+    if precision == "int8":
+        return Int8Vectors.encode(vectors)
+    if precision == "sparse":
+        return SparseTopNVectors.encode(vectors, top_n)
+    raise ValueError(f"Unknown catalog precision: {precision}")
+
+
+def compact_arrays(vectors, top_n=DEFAULT_TOP_N):
+    """
+    Encode full-precision vectors in every compact form, for writing to a bundle.
+
+    Args:
+        vectors (numpy.ndarray): float32 matrix of shape (n_games, n_dims)
+        top_n (int): Genres kept per game by the sparse form
+
+    Returns:
+        dict: Arrays by bundle name
+    """
+    arrays = {}
+    for precision in COMPACT_PRECISIONS:
+        arrays.update(encode_vectors(vectors, precision, top_n).to_arrays())
+    return arrays
+
+
+def load_vectors(arrays, precision, top_n=DEFAULT_TOP_N):
+    """
+    Open a store from bundle arrays, using the stored compact form when the bundle
+    has one and encoding it from catalog_probs otherwise.
+
+    Args:
+        arrays (dict): Arrays of the artifact bundle
+        precision (str): One of PRECISIONS
+        top_n (int): Genres kept per game by the sparse store
+
+    Returns:
+        VectorStore: The store
+    """
+    if precision == "float32":
+        return DenseVectors(arrays["catalog_probs"])
+    if precision == "float16" and "catalog_probs_float16" in arrays:
+        return DenseVectors(arrays["catalog_probs_float16"])
+    if precision == "int8" and "catalog_probs_int8" in arrays:
+        return Int8Vectors(arrays["catalog_probs_int8"], arrays["catalog_probs_int8_scales"])
+    if precision == "sparse" and "catalog_top_indices" in arrays and arrays["catalog_top_indices"].shape[0] == top_n:
+        return SparseTopNVectors(
+            arrays["catalog_top_indices"], arrays["catalog_top_values"], arrays["catalog_probs"].shape[1]
+        )
+    return encode_vectors(arrays["catalog_probs"], precision, top_n)